@@ -0,0 +1,91 @@
+"""Store queries.query_vector as packed little-endian floats instead of JSON
+
+Revision ID: 0001_binary_query_vector
+Revises:
+Create Date: 2026-10-17
+
+"""
+import json
+import os
+
+from alembic import context, op
+import numpy as np
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "0001_binary_query_vector"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+# Same setting as models.QUERY_VECTOR_DTYPE
+DTYPE = np.dtype(os.getenv("QUERY_VECTOR_DTYPE", "float32")).newbyteorder("<")
+BATCH_ROWS = 5000
+
+
+def _vector_column_type():
+    """Type of queries.query_vector, or None when the table does not exist yet"""
+    inspector = sa.inspect(op.get_bind())
+    if "queries" not in inspector.get_table_names():
+        return None
+    return next(column["type"] for column in inspector.get_columns("queries") if column["name"] == "query_vector")
+
+
+def _convert(source: str, target: str, encode):
+    """Rewrite every row's ``source`` column into ``target``, BATCH_ROWS rows at a time by id"""
+    connection = op.get_bind()
+    queries = sa.table("queries", sa.column("id", sa.Integer), sa.column(source), sa.column(target))
+    last_id = 0
+    while True:
+        rows = connection.execute(
+            sa.select(queries.c.id, queries.c[source])
+            .where(queries.c.id > last_id)
+            .order_by(queries.c.id)
+            .limit(BATCH_ROWS)
+        ).all()
+        if not rows:
+            return
+        connection.execute(
+            queries.update().where(queries.c.id == sa.bindparam("row_id")).values({target: sa.bindparam("value")}),
+            [{"row_id": row_id, "value": encode(value)} for row_id, value in rows],
+        )
+        last_id = rows[-1][0]
+
+
+def _swap_columns(old: str, new: str, column_type: sa.types.TypeEngine):
+    # MySQL's CHANGE COLUMN restates the type, so Alembic needs existing_type
+    with op.batch_alter_table("queries") as batch:
+        batch.drop_column(old)
+        batch.alter_column(new, new_column_name=old, existing_type=column_type, nullable=False)
+
+
+def upgrade() -> None:
+    column_type = _vector_column_type()
+    # Databases created by Base.metadata.create_all already have the binary column
+    if column_type is None or isinstance(column_type, sa.LargeBinary):
+        return
+    if context.is_offline_mode():
+        raise RuntimeError("Converting stored vectors needs a database connection; run without --sql")
+
+    op.add_column("queries", sa.Column("query_vector_packed", sa.LargeBinary(), nullable=True))
+    _convert(
+        "query_vector", "query_vector_packed",
+        lambda value: np.asarray(json.loads(value) if isinstance(value, (str, bytes)) else value, dtype=DTYPE).tobytes(),
+    )
+    _swap_columns("query_vector", "query_vector_packed", sa.LargeBinary())
+
+
+def downgrade() -> None:
+    column_type = _vector_column_type()
+    if column_type is None or not isinstance(column_type, sa.LargeBinary):
+        return
+    if context.is_offline_mode():
+        raise RuntimeError("Converting stored vectors needs a database connection; run without --sql")
+
+    op.add_column("queries", sa.Column("query_vector_json", sa.JSON(), nullable=True))
+    _convert(
+        "query_vector", "query_vector_json",
+        lambda value: json.dumps(np.frombuffer(value, dtype=DTYPE).tolist()),
+    )
+    _swap_columns("query_vector", "query_vector_json", sa.JSON())
@@ -0,0 +1,35 @@
+"""Composite (created_at, id) index for keyset pagination of GET /queries/
+
+Revision ID: 0002_created_at_id_index
+Revises: 0001_binary_query_vector
+Create Date: 2026-10-17
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "0002_created_at_id_index"
+down_revision = "0001_binary_query_vector"
+branch_labels = None
+depends_on = None
+
+INDEX_NAME = "ix_queries_created_at_id"
+
+
+def _has_index() -> bool:
+    inspector = sa.inspect(op.get_bind())
+    if "queries" not in inspector.get_table_names():
+        return True
+    return any(index["name"] == INDEX_NAME for index in inspector.get_indexes("queries"))
+
+
+def upgrade() -> None:
+    # Databases created by Base.metadata.create_all already have it
+    if not _has_index():
+        op.create_index(INDEX_NAME, "queries", ["created_at", "id"])
+
+
+def downgrade() -> None:
+    op.drop_index(INDEX_NAME, table_name="queries")
@@ -0,0 +1,41 @@
+"""hexagram_stats table: hexagram counts per day, week and month
+
+Revision ID: 0003_hexagram_stats
+Revises: 0002_created_at_id_index
+Create Date: 2026-10-17
+
+Existing rows are not counted here; run backfill_hexagram_stats.py afterwards.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "0003_hexagram_stats"
+down_revision = "0002_created_at_id_index"
+branch_labels = None
+depends_on = None
+
+TABLE_NAME = "hexagram_stats"
+
+
+def _has_table() -> bool:
+    return TABLE_NAME in sa.inspect(op.get_bind()).get_table_names()
+
+
+def upgrade() -> None:
+    # Databases created by Base.metadata.create_all already have it
+    if not _has_table():
+        op.create_table(
+            TABLE_NAME,
+            sa.Column("period", sa.String(5), primary_key=True),
+            sa.Column("bucket_start", sa.Date(), primary_key=True),
+            sa.Column("hexagram_id", sa.SmallInteger(), primary_key=True),
+            sa.Column("top1_count", sa.Integer(), nullable=False),
+            sa.Column("top6_count", sa.Integer(), nullable=False),
+            sa.Column("score_sum", sa.Float(), nullable=False),
+        )
+
+
+def downgrade() -> None:
+    op.drop_table(TABLE_NAME)
@@ -0,0 +1,31 @@
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+import os
+from database import DATABASE_URL
+
+# Async drivers for the sync URLs used by database.py
+ASYNC_DRIVERS = {
+    "sqlite": "sqlite+aiosqlite",
+    "sqlite+pysqlite": "sqlite+aiosqlite",
+    "mysql": "mysql+aiomysql",
+    "mysql+pymysql": "mysql+aiomysql",
+}
+
+def async_database_url(url: str) -> str:
+    """The same database with its async driver (e.g. mysql+pymysql -> mysql+aiomysql)"""
+    parsed = make_url(url)
+    drivername = ASYNC_DRIVERS.get(parsed.drivername, parsed.drivername)
+    return parsed.set(drivername=drivername).render_as_string(hide_password=False)
+
+# ASYNC_DATABASE_URL overrides the derived URL (e.g. to use asyncmy instead of aiomysql)
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL") or async_database_url(DATABASE_URL or "sqlite:///./test.db")
+
+async_engine = create_async_engine(ASYNC_DATABASE_URL)
+
+# Objects stay loaded after commit: lazy reloads are not possible on an async session
+AsyncSessionLocal = async_sessionmaker(async_engine, expire_on_commit=False)
+
+# Dependency
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
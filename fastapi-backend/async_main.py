@@ -0,0 +1,190 @@
+"""
+Async variant of the API: ``uvicorn async_main:app``.
+
+Same routes and responses as ``main:app``, but database access goes through
+SQLAlchemy's async engine (aiosqlite locally, aiomysql for MySQL), so a
+request waiting on the database holds no thread. Embedding and scoring run
+in their own ``SCORING_WORKERS`` thread pool; reads only await the database
+and never queue behind scoring work. The embedding warm-up, the query index
+and the routes that don't touch the database are shared with ``main``.
+"""
+from fastapi import FastAPI, HTTPException, Depends, Query, Request
+from fastapi.middleware.cors import CORSMiddleware
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from datetime import date
+from functools import partial
+from typing import List, Optional, Tuple
+import asyncio
+import contextvars
+import os
+import models
+import schemas
+import main
+from async_database import async_engine, get_async_db
+from hexagram_stats import read_stats, record_queries
+from main import get_embedding_service, search_similar, similar_results
+from pagination import InvalidCursor, page_statement, split_page
+from profiling import ProfiledRoute, profiled
+from responses import FastJSONResponse, load_projection, project_query, query_page_response, query_projection
+from services.iching_embeddings import ICHingEmbeddingService
+from services.metrics import metrics
+
+# Threads for process_query and similar-search scoring (numpy releases the GIL in the matrix products)
+SCORING_WORKERS = int(os.getenv("SCORING_WORKERS", str(min(4, os.cpu_count() or 1))))
+scoring_executor = ThreadPoolExecutor(max_workers=SCORING_WORKERS, thread_name_prefix="scoring")
+
+async def run_scoring(fn, *args):
+    """Run CPU-bound embedding work on the scoring pool (profiled with the request, if it is)"""
+    context = contextvars.copy_context()
+    return await asyncio.get_running_loop().run_in_executor(scoring_executor,
+                                                            partial(context.run, profiled, fn, *args))
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    async with main.lifespan(app):
+        yield
+    scoring_executor.shutdown(wait=False)
+    await async_engine.dispose()
+
+app = FastAPI(
+    title="I Ching Query API",
+    description="API for I Ching query processing with hexagram analysis (async)",
+    version="1.0.0",
+    lifespan=lifespan
+)
+app.router.route_class = ProfiledRoute
+
+app.add_middleware(
+    CORSMiddleware,
+    allow_origins=["http://localhost:3000", "http://react-frontend:3000"],
+    allow_credentials=True,
+    allow_methods=["*"],
+    allow_headers=["*"],
+)
+
+# Routes without database access, and the streaming import and export (which open
+# their own sessions), are the sync app's own
+SHARED_ROUTES = {"/", "/ready", "/queries/import", "/queries/export", "/cache/queries", "/metrics", "/admin/profiles",
+                 "/admin/profiles/{profile_id}", "/hexagrams/"}
+app.router.routes.extend(route for route in main.app.routes if getattr(route, "path", None) in SHARED_ROUTES)
+
+@app.post("/queries/", response_model=None, response_class=FastJSONResponse,
+          responses={200: {"model": schemas.QueryProjection}}, tags=["Queries"])
+async def create_query(query: schemas.QueryCreate, db: AsyncSession = Depends(get_async_db),
+                       fields: Tuple[str, ...] = Depends(query_projection),
+                       embedding_service: ICHingEmbeddingService = Depends(get_embedding_service)):
+    query_vector, hexagram_set = await run_scoring(embedding_service.process_query, query.query)
+
+    db_query = models.Query(
+        query=query.query,
+        query_vector=query_vector,
+        hexagram_set=hexagram_set
+    )
+    with metrics.time("db_commit"):
+        if main.query_writer is not None:
+            # Inserted, committed and indexed by the group-commit thread
+            db_query = await asyncio.wrap_future(main.query_writer.submit(db_query))
+        else:
+            db.add(db_query)
+            await db.flush()
+            await db.run_sync(record_queries, [db_query])
+            await db.commit()
+            await db.refresh(db_query)
+    if main.query_writer is None:
+        main.index_queries([db_query.id], [query_vector], [hexagram_set])
+
+    return FastJSONResponse(project_query(db_query, fields))
+
+@app.post("/queries/batch", response_model=None, response_class=FastJSONResponse,
+          responses={200: {"model": List[schemas.QueryProjection]}}, tags=["Queries"])
+async def create_queries_batch(batch: schemas.QueryBatchCreate, db: AsyncSession = Depends(get_async_db),
+                               fields: Tuple[str, ...] = Depends(query_projection),
+                               embedding_service: ICHingEmbeddingService = Depends(get_embedding_service)):
+    """Embed, score and store many queries in one pass; results are in input order"""
+    texts = [item.query for item in batch.queries]
+    results = await run_scoring(embedding_service.process_queries, texts)
+
+    db_queries = [
+        models.Query(query=text, query_vector=query_vector, hexagram_set=hexagram_set)
+        for text, (query_vector, hexagram_set) in zip(texts, results)
+    ]
+    with metrics.time("db_commit"):
+        db.add_all(db_queries)
+        await db.flush()
+        ids = [db_query.id for db_query in db_queries]
+        await db.run_sync(record_queries, db_queries)
+        await db.commit()
+    main.index_queries(ids, [query_vector for query_vector, _ in results],
+                       [hexagram_set for _, hexagram_set in results])
+
+    # Reload the stored values (vectors as stored, not the float64 lists) into the
+    # same objects as main does after its commit, 500 ids per SELECT
+    for start in range(0, len(ids), 500):
+        reload = (select(models.Query).where(models.Query.id.in_(ids[start:start + 500]))
+                  .execution_options(populate_existing=True))
+        (await db.scalars(reload)).all()
+    return FastJSONResponse([project_query(db_query, fields) for db_query in db_queries])
+
+@app.get("/queries/", response_model=None, response_class=FastJSONResponse,
+         responses={200: {"model": List[schemas.QueryProjection]}}, tags=["Queries"])
+async def read_queries(request: Request, limit: int = Query(100, ge=1, le=1000),
+                       cursor: Optional[str] = None, order: str = Query("asc", pattern="^(asc|desc)$"),
+                       skip: int = Query(0, ge=0), fields: Tuple[str, ...] = Depends(query_projection),
+                       db: AsyncSession = Depends(get_async_db)):
+    """Queries ordered by (created_at, id), paged like main.read_queries"""
+    try:
+        statement, order = page_statement(limit, cursor, order, skip, options=[load_projection(fields)])
+    except InvalidCursor as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    with metrics.time("db_query"):
+        rows = (await db.scalars(statement)).all()
+    queries, next_cursor = split_page(rows, limit, order)
+    return query_page_response(request, queries, fields, next_cursor)
+
+@app.get("/queries/{query_id}", response_model=None, response_class=FastJSONResponse,
+         responses={200: {"model": schemas.QueryProjection}}, tags=["Queries"])
+async def read_query(query_id: int, fields: Tuple[str, ...] = Depends(query_projection),
+                     db: AsyncSession = Depends(get_async_db)):
+    with metrics.time("db_query"):
+        query = await db.scalar(
+            select(models.Query).options(load_projection(fields)).where(models.Query.id == query_id)
+        )
+    if query is None:
+        raise HTTPException(status_code=404, detail="Query not found")
+    return FastJSONResponse(project_query(query, fields))
+
+@app.get("/queries/search/similar", response_class=FastJSONResponse,
+         responses={200: {"model": List[schemas.SimilarQuery]}}, tags=["Queries"])
+async def find_similar_queries(query: str, limit: int = Query(10, ge=1, le=100),
+                               nprobe: Optional[int] = None, exact: bool = False,
+                               min_shared_hexagrams: int = Query(0, ge=0, le=6),
+                               hexagram_ids: Optional[List[int]] = Query(None),
+                               db: AsyncSession = Depends(get_async_db),
+                               embedding_service: ICHingEmbeddingService = Depends(get_embedding_service)):
+    """Find queries with similar vector embeddings (parameters as in main.find_similar_queries)"""
+    matches = await run_scoring(search_similar, embedding_service, query, limit, nprobe, exact,
+                                min_shared_hexagrams, hexagram_ids)
+    with metrics.time("db_fetch"):
+        rows = (await db.scalars(
+            select(models.Query).where(models.Query.id.in_([query_id for query_id, _ in matches]))
+        )).all()
+    return similar_results(matches, rows)
+
+@app.get("/hexagrams/stats", response_model=schemas.HexagramStatsResponse, response_model_exclude_none=True,
+         tags=["Hexagrams"])
+async def get_hexagram_stats(period: str = Query("day", pattern="^(day|week|month)$"),
+                             start: Optional[date] = None, end: Optional[date] = None,
+                             hexagram_id: Optional[int] = Query(None, ge=1, le=64), series: bool = False,
+                             db: AsyncSession = Depends(get_async_db)):
+    """Hexagram counts per day, week or month (parameters as in main.get_hexagram_stats)"""
+    if start is not None and end is not None and end <= start:
+        raise HTTPException(status_code=400, detail="end must be after start")
+    with metrics.time("db_query"):
+        return await db.run_sync(read_stats, period, start, end, hexagram_id=hexagram_id, series=series)
+
+if __name__ == "__main__":
+    import uvicorn
+    uvicorn.run(app, host="0.0.0.0", port=8000)
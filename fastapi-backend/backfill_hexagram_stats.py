@@ -0,0 +1,30 @@
+#!/usr/bin/env python3
+"""
+Build the hexagram_stats table from the stored queries (after the 0003
+migration, or to recount it). The table is rebuilt in one transaction;
+inserts made meanwhile wait for it and are counted.
+
+    python3 backfill_hexagram_stats.py
+"""
+import argparse
+import time
+import models
+from database import Base, SessionLocal, engine
+from hexagram_stats import rebuild
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rebuild the hexagram frequency table from the queries table")
+    parser.add_argument("--batch-rows", type=int, default=10000, help="Rows read per batch")
+    args = parser.parse_args()
+
+    Base.metadata.create_all(bind=engine, tables=[models.HexagramStat.__table__])
+    db = SessionLocal()
+    try:
+        started = time.perf_counter()
+        rows = rebuild(db, args.batch_rows)
+        seconds = time.perf_counter() - started
+        buckets = db.query(models.HexagramStat).count()
+    finally:
+        db.close()
+    print(f"Counted {rows} queries into {buckets} hexagram_stats rows in {seconds:.1f}s "
+          f"({rows / seconds if seconds else 0:.0f} rows/s)")
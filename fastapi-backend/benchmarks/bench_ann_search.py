@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Similar-query search: recall@k and latency of the IVF index vs exact search.
+
+Stored vectors are built the way the service builds query vectors: the
+mean of 3-8 word vectors, words drawn from a Zipf-distributed vocabulary
+so common words are shared between queries. Search vectors come from the
+same distribution. Exact results come from the flat
+QueryVectorIndex. Run from fastapi-backend/:
+
+    python3 -m benchmarks.bench_ann_search --rows 100000 1000000
+"""
+import argparse
+import json
+import time
+
+import numpy as np
+
+from services.ivf_index import IVFIndex
+from services.vector_index import QueryVectorIndex
+
+def query_like_vectors(rng, word_vectors, count, zipf):
+    lengths = rng.integers(3, 9, size=count)
+    words = (rng.zipf(zipf, size=lengths.sum()) - 1) % len(word_vectors)
+    starts = np.concatenate([[0], np.cumsum(lengths)[:-1]])
+    return np.add.reduceat(word_vectors[words], starts, axis=0) / lengths[:, None].astype(np.float32)
+
+def timed_searches(index, searches, limit, **kwargs):
+    times, results = [], []
+    for vector in searches:
+        start = time.perf_counter()
+        results.append(index.search(vector, limit, **kwargs))
+        times.append(time.perf_counter() - start)
+    return np.array(times) * 1000, results
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, nargs="+", default=[100000, 500000])
+    parser.add_argument("--nprobe", type=int, nargs="+", default=[1, 4, 8, 16, 32, 64])
+    parser.add_argument("--searches", type=int, default=200)
+    parser.add_argument("--limit", type=int, default=10)
+    parser.add_argument("--vocab", type=int, default=50000)
+    parser.add_argument("--zipf", type=float, default=1.3)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    dim = 300
+    word_vectors = rng.standard_normal((args.vocab, dim)).astype(np.float32) * 0.4
+
+    results = {}
+    for n_rows in sorted(args.rows):
+        vectors = np.concatenate([
+            query_like_vectors(rng, word_vectors, min(100000, n_rows - start), args.zipf)
+            for start in range(0, n_rows, 100000)
+        ])
+        ids = np.arange(1, n_rows + 1)
+        searches = query_like_vectors(rng, word_vectors, args.searches, args.zipf)
+
+        exact_index = QueryVectorIndex(dim, capacity=n_rows)
+        exact_index.add_normalized(ids, vectors / np.linalg.norm(vectors, axis=1, keepdims=True))
+        exact_ms, exact_results = timed_searches(exact_index, searches, args.limit)
+        truth = [{query_id for query_id, _ in matches} for matches in exact_results]
+        del exact_index
+
+        start = time.perf_counter()
+        ivf = IVFIndex.build(ids, vectors)
+        build_seconds = time.perf_counter() - start
+        del vectors
+
+        by_nprobe = {}
+        for nprobe in args.nprobe:
+            ivf_ms, ivf_results = timed_searches(ivf, searches, args.limit, nprobe=nprobe)
+            recall = np.mean([
+                len(expected & {query_id for query_id, _ in matches}) / len(expected)
+                for expected, matches in zip(truth, ivf_results)
+            ])
+            by_nprobe[str(nprobe)] = {
+                "recall_at_k": float(recall),
+                "p50_ms": float(np.percentile(ivf_ms, 50)),
+                "p99_ms": float(np.percentile(ivf_ms, 99)),
+            }
+
+        results[str(n_rows)] = {
+            "exact": {"p50_ms": float(np.percentile(exact_ms, 50)), "p99_ms": float(np.percentile(exact_ms, 99))},
+            "ivf_lists": ivf.n_lists,
+            "ivf_build_seconds": build_seconds,
+            "ivf_mb": ivf.nbytes / 1e6,
+            "ivf": by_nprobe,
+        }
+        del ivf
+
+    print(json.dumps({"limit": args.limit, "searches": args.searches, "results": results}, indent=2))
+
+if __name__ == "__main__":
+    main()
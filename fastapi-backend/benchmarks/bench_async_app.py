@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+Sync (main:app) vs async (async_main:app) under concurrent mixed load.
+
+Each app is started with uvicorn in a subprocess against a synthetic GloVe
+file and its own copy of a pre-populated SQLite database. Clients then send
+a fixed mix of POST /queries/ (embedding + commit), GET /queries/{id},
+GET /queries/ and similar search for ``--duration`` seconds at each
+concurrency level. Reports req/s and per-route p50/p99 latency. Run from
+fastapi-backend/:
+
+    python3 -m benchmarks.bench_async_app --concurrency 1 16 64
+"""
+import argparse
+import asyncio
+import json
+import os
+import shutil
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+from benchmarks.bench_startup import free_port, status_of
+from benchmarks.queries import QUERIES, query_words
+from benchmarks.synthetic import bench_workdir, populate_queries
+
+APPS = {"sync": "main:app", "async": "async_main:app"}
+MIX = {"create": 0.2, "read": 0.4, "list": 0.3, "similar": 0.1}
+
+def start_server(app, env, root, workdir, timeout=300):
+    port = free_port()
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", app, "--app-dir", root, "--port", str(port), "--log-level", "warning"],
+        cwd=workdir, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    base = f"http://127.0.0.1:{port}"
+    start = time.perf_counter()
+    while status_of(base + "/ready") != 200:
+        if proc.poll() is not None or time.perf_counter() - start > timeout:
+            proc.kill()
+            raise RuntimeError(f"{app} did not become ready")
+        time.sleep(0.1)
+    return proc, base
+
+async def drive(base, concurrency, duration, rows, seed=0):
+    import httpx
+
+    latencies = {route: [] for route in MIX}
+    routes, weights = list(MIX), np.array(list(MIX.values()))
+    deadline = time.perf_counter() + duration
+
+    async def client_loop(client, rng):
+        while time.perf_counter() < deadline:
+            route = routes[rng.choice(len(routes), p=weights)]
+            question = QUERIES[rng.integers(len(QUERIES))]
+            start = time.perf_counter()
+            if route == "create":
+                response = await client.post("/queries/", json={"query": question}, params={"include_vector": "false"})
+            elif route == "read":
+                response = await client.get(f"/queries/{rng.integers(1, rows + 1)}")
+            elif route == "list":
+                response = await client.get("/queries/", params={"limit": 20, "order": "desc", "include_vector": "false"})
+            else:
+                response = await client.get("/queries/search/similar", params={"query": question, "limit": 10})
+            response.raise_for_status()
+            latencies[route].append(time.perf_counter() - start)
+
+    limits = httpx.Limits(max_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base, limits=limits, timeout=60) as client:
+        start = time.perf_counter()
+        await asyncio.gather(*(client_loop(client, np.random.default_rng(seed + i)) for i in range(concurrency)))
+        elapsed = time.perf_counter() - start
+
+    total = sum(len(times) for times in latencies.values())
+    return {
+        "requests_per_second": total / elapsed,
+        "routes": {
+            route: {
+                "count": len(times),
+                "p50_ms": 1000 * float(np.percentile(times, 50)),
+                "p99_ms": 1000 * float(np.percentile(times, 99)),
+            }
+            for route, times in latencies.items() if times
+        },
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=20000)
+    parser.add_argument("--vocab-size", type=int, default=50000)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 16, 64])
+    parser.add_argument("--duration", type=float, default=10)
+    parser.add_argument("--scoring-workers", type=int, default=None)
+    args = parser.parse_args()
+
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    from services.iching_embeddings import HEXAGRAMS
+    # Populate one database (bench.db), then give each app a copy of it
+    with bench_workdir("async-bench-", vocab_size=args.vocab_size, database=True, build_store=True,
+                       extra_words=query_words() + [h[2].lower() for h in HEXAGRAMS]) as workdir:
+        glove_path = workdir.glove_path
+        import models
+        from database import Base, SessionLocal, engine
+
+        Base.metadata.create_all(bind=engine)
+        db = SessionLocal()
+        populate_queries(db, args.rows)
+        db.close()
+        engine.dispose()
+
+        results = {}
+        for name, app in APPS.items():
+            results[name] = {}
+            for concurrency in args.concurrency:
+                db_path = os.path.join(workdir.path, f"{name}-{concurrency}.db")
+                shutil.copy(workdir.db_path, db_path)
+                env = dict(os.environ, GLOVE_PATH=glove_path, EMBEDDING_WARMUP="blocking",
+                           DATABASE_URL=f"sqlite:///{db_path}",
+                           ANN_INDEX_DIR=os.path.join(workdir.path, "no-ann-index"))
+                env.pop("ASYNC_DATABASE_URL", None)
+                if args.scoring_workers:
+                    env["SCORING_WORKERS"] = str(args.scoring_workers)
+                proc, base = start_server(app, env, root, workdir.path)
+                try:
+                    results[name][str(concurrency)] = asyncio.run(drive(base, concurrency, args.duration, args.rows))
+                finally:
+                    proc.terminate()
+                    proc.wait()
+
+        print(json.dumps({
+            "rows": args.rows,
+            "duration_seconds": args.duration,
+            "mix": MIX,
+            "cpus": os.cpu_count(),
+            "results": results,
+        }, indent=2))
+
+if __name__ == "__main__":
+    main()
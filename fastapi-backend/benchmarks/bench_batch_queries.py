@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+Throughput of POST /queries/batch vs one POST /queries/ per question.
+
+Runs the app in-process (FastAPI TestClient) against a temp SQLite database
+and a synthetic GloVe file, with the result cache disabled so every question
+is embedded. Run from fastapi-backend/:
+
+    python3 -m benchmarks.bench_batch_queries --queries 1000 --batch-size 100
+"""
+import argparse
+import json
+import os
+import time
+
+import numpy as np
+
+from benchmarks.synthetic import bench_workdir
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--vocab-size", type=int, default=50000)
+    parser.add_argument("--queries", type=int, default=1000)
+    parser.add_argument("--batch-size", type=int, default=100)
+    args = parser.parse_args()
+
+    with bench_workdir("batch-bench-", vocab_size=args.vocab_size, database=True) as workdir:
+        os.environ.update(GLOVE_PATH=workdir.glove_path, QUERY_CACHE_SIZE="0")
+
+        from fastapi.testclient import TestClient
+        import main as app_module
+
+        rng = np.random.default_rng(0)
+        questions = [
+            " ".join(f"w{i}" for i in rng.integers(args.vocab_size, size=rng.integers(4, 16)))
+            for _ in range(args.queries)
+        ]
+
+        with TestClient(app_module.app) as client:
+            app_module.embedding_warmup.wait()
+
+            start = time.perf_counter()
+            for question in questions:
+                response = client.post("/queries/", json={"query": question})
+                response.raise_for_status()
+            single = time.perf_counter() - start
+
+            start = time.perf_counter()
+            for offset in range(0, len(questions), args.batch_size):
+                chunk = questions[offset:offset + args.batch_size]
+                response = client.post("/queries/batch", json={"queries": [{"query": q} for q in chunk]})
+                response.raise_for_status()
+                assert [r["query"] for r in response.json()] == chunk
+            batch = time.perf_counter() - start
+
+        print(json.dumps({
+            "queries": args.queries,
+            "batch_size": args.batch_size,
+            "single_qps": args.queries / single,
+            "batch_qps": args.queries / batch,
+            "speedup": single / batch,
+        }, indent=2))
+
+if __name__ == "__main__":
+    main()
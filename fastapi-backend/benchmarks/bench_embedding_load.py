@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Compare start-up cost of the legacy pickled dict cache with the memory-mapped store.
+
+Each loader runs in a fresh interpreter so load time and RSS are not skewed
+by the other. Run from fastapi-backend/:
+
+    python3 -m benchmarks.bench_embedding_load --vocab-size 400000
+"""
+import argparse
+import json
+import os
+import pickle
+import subprocess
+import sys
+
+from benchmarks.synthetic import bench_workdir, read_glove_text
+
+LOADERS = {
+    "pickle": (
+        "import pickle\n"
+        "with open(PATH + '.cache.pkl', 'rb') as f:\n"
+        "    emb = pickle.load(f)\n"
+        "n = len(emb)\n"
+    ),
+    "memmap": (
+        "from services.embedding_store import EmbeddingStore\n"
+        "emb = EmbeddingStore.load(PATH)\n"
+        "n = len(emb)\n"
+    ),
+}
+
+RUNNER = """
+import json, sys, time
+sys.path.insert(0, {root!r})
+from benchmarks.synthetic import current_rss_mb
+PATH = {path!r}
+base = current_rss_mb()
+start = time.perf_counter()
+{body}
+elapsed = time.perf_counter() - start
+print(json.dumps({{"load_seconds": elapsed, "rss_mb": current_rss_mb(), "rss_delta_mb": current_rss_mb() - base, "words": n}}))
+"""
+
+def run_loader(name, glove_path, root):
+    code = RUNNER.format(root=root, path=glove_path, body=LOADERS[name])
+    out = subprocess.run([sys.executable, "-c", code], check=True, capture_output=True, text=True)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--vocab-size", type=int, default=100000)
+    parser.add_argument("--dim", type=int, default=300)
+    parser.add_argument("--workdir", default=None)
+    args = parser.parse_args()
+
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    # An explicit --workdir keeps the files (and reuses them on the next run)
+    with bench_workdir("glove-bench-", vocab_size=args.vocab_size, dim=args.dim, path=args.workdir,
+                       glove_name=f"synthetic.{args.vocab_size}.{args.dim}d.txt") as workdir:
+        glove_path = workdir.glove_path
+
+        store = read_glove_text(glove_path)
+        with open(glove_path + ".cache.pkl", "wb") as f:
+            pickle.dump({w: store[w].copy() for w in store.words}, f)
+        store.save(glove_path)
+
+        results = {name: run_loader(name, glove_path, root) for name in LOADERS}
+        print(json.dumps({"vocab_size": args.vocab_size, "dim": args.dim, "results": results}, indent=2))
+
+if __name__ == "__main__":
+    main()
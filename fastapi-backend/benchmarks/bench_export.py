@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Throughput and peak memory of the streaming export, against paging GET /queries/.
+
+For each table size (one SQLite database grown through ``--rows``),
+export_queries.py is run as a child process for each format/vector
+combination, writing to a file. The report gives rows/s, MB written and the
+child's peak RSS (VmHWM, as printed by the CLI). The old way to pull the
+history is also timed: 100-row offset pages of ORM objects, serialized like
+the endpoint does. It is measured over ``--page-rows`` rows at the start of the table and
+again at its end, where every page first scans past the whole offset.
+Run from fastapi-backend/:
+
+    python3 -m benchmarks.bench_export --rows 100000 1000000
+"""
+import argparse
+import json
+import os
+import re
+import subprocess
+import sys
+import time
+
+from benchmarks.synthetic import bench_workdir, populate_queries
+
+VARIANTS = [("ndjson", "none"), ("ndjson", "base64"), ("ndjson", "list"), ("csv", "none"), ("csv", "base64")]
+
+def run_export(root, workdir, export_format, vector):
+    output = os.path.join(workdir, f"export.{export_format}")
+    start = time.perf_counter()
+    proc = subprocess.run([sys.executable, "export_queries.py", "--format", export_format, "--vector", vector,
+                           "--output", output], cwd=root, capture_output=True, text=True)
+    seconds = time.perf_counter() - start
+    summary = proc.stderr.strip().splitlines()[-1]
+    if proc.returncode != 0:
+        raise RuntimeError(summary)
+    size = os.path.getsize(output)
+    os.remove(output)
+    peak_rss_mb = float(re.search(r"peak RSS (\d+) MB", summary).group(1))
+    return {"seconds": seconds, "mb": size / 1e6, "peak_rss_mb": peak_rss_mb}
+
+def paged_rows_per_second(db, offset, n_rows, page=100):
+    import models
+    from responses import FastJSONResponse, QUERY_FIELDS, project_query
+
+    start = time.perf_counter()
+    for skip in range(offset, offset + n_rows, page):
+        rows = db.query(models.Query).order_by(models.Query.id).offset(skip).limit(page).all()
+        FastJSONResponse([project_query(row, QUERY_FIELDS) for row in rows])
+    db.expunge_all()
+    return n_rows / (time.perf_counter() - start)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, nargs="+", default=[100000, 1000000])
+    parser.add_argument("--page-rows", type=int, default=20000, help="Rows pulled through offset paging")
+    args = parser.parse_args()
+
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    with bench_workdir("export-bench-", database=True) as workdir:
+
+        import models
+        from database import Base, SessionLocal, engine
+        Base.metadata.create_all(bind=engine)
+
+        # Interpreter plus the export module's imports, exporting nothing
+        import_rss_mb = float(subprocess.run(
+            [sys.executable, "-c", "import export, export_queries; print(export_queries.peak_rss_mb())"],
+            cwd=root, capture_output=True, text=True, check=True).stdout.split()[-1])
+
+        results = {}
+        for n_rows in sorted(args.rows):
+            db = SessionLocal()
+            populate_queries(db, n_rows)
+            exports = {}
+            for export_format, vector in VARIANTS:
+                run = run_export(root, workdir.path, export_format, vector)
+                exports[f"{export_format}-{vector}"] = {
+                    "rows_per_second": n_rows / run["seconds"],
+                    "seconds": run["seconds"],
+                    "mb": run["mb"],
+                    "peak_rss_mb": run["peak_rss_mb"],
+                }
+            page_rows = min(args.page_rows, n_rows)
+            results[str(n_rows)] = {
+                "export": exports,
+                "offset_paging_rows_per_second": {
+                    "start_of_table": paged_rows_per_second(db, 0, page_rows),
+                    "end_of_table": paged_rows_per_second(db, n_rows - page_rows, page_rows),
+                },
+            }
+            db.close()
+
+        print(json.dumps({"cpus": os.cpu_count(), "import_rss_mb": import_rss_mb, "results": results}, indent=2))
+
+if __name__ == "__main__":
+    main()
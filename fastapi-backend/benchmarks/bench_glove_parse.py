@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+"""
+Compare building the embedding store from GloVe text: serial vs parallel parser.
+
+The serial path is the original one-line-at-a-time parse; the parallel path
+splits the file into byte ranges and bulk-parses them across a process pool.
+Run from fastapi-backend/:
+
+    python3 -m benchmarks.bench_glove_parse --vocab-size 400000 --workers 8
+"""
+import argparse
+import json
+import os
+import time
+
+import numpy as np
+
+from benchmarks.synthetic import bench_workdir, read_glove_text
+from services.glove_parser import parse_glove_parallel
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--vocab-size", type=int, default=100000)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, os.cpu_count() or 1])
+    parser.add_argument("--limit", type=int, default=None, help="Only parse the first N words")
+    args = parser.parse_args()
+
+    with bench_workdir("glove-bench-", vocab_size=args.vocab_size) as workdir:
+        glove_path = workdir.glove_path
+
+        results = {}
+        start = time.perf_counter()
+        reference = read_glove_text(glove_path, vocab_size=args.limit)
+        reference.save(glove_path)
+        results["serial"] = {"seconds": time.perf_counter() - start}
+
+        for workers in dict.fromkeys(args.workers):
+            start = time.perf_counter()
+            store = parse_glove_parallel(glove_path, vocab_size=args.limit, workers=workers)
+            elapsed = time.perf_counter() - start
+            identical = store.words == reference.words and np.array_equal(store.vectors, reference.vectors)
+            results[f"parallel_{workers}"] = {"seconds": elapsed, "identical_to_serial": bool(identical)}
+
+        print(json.dumps({"vocab_size": args.vocab_size, "limit": args.limit,
+                          "file_mb": os.path.getsize(glove_path) / 1e6, "results": results}, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+POST /queries/ write path: per-request commits vs group commit.
+
+Concurrent client threads each insert rows the way create_query does,
+either with their own add/commit/refresh (immediate) or through a
+GroupCommitWriter in "commit" and "flush" durability. Embedding is left
+out (vectors and hexagram sets are precomputed) so only the database write
+is measured. Reports rows/s, transactions/s and p50/p99 latency per client
+count against a temp SQLite file. Run from fastapi-backend/:
+
+    python3 -m benchmarks.bench_group_commit --clients 1 8 64
+"""
+import argparse
+import json
+import threading
+import time
+
+import numpy as np
+
+from benchmarks.synthetic import bench_workdir
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--clients", type=int, nargs="+", default=[1, 8, 64])
+    parser.add_argument("--duration", type=float, default=5)
+    parser.add_argument("--max-rows", type=int, default=64)
+    parser.add_argument("--max-delay-ms", type=float, default=0)
+    args = parser.parse_args()
+
+    with bench_workdir("group-commit-bench-", database=True):
+
+        import models
+        from database import Base, SessionLocal, engine
+        from group_commit import GroupCommitWriter
+        from services.iching_embeddings import HEXAGRAMS
+
+        Base.metadata.create_all(bind=engine)
+        rng = np.random.default_rng(0)
+        vectors = rng.standard_normal((256, 300)).astype(np.float32)
+        hexagram_set = [
+            {"hexagram_id": h[0], "hexagram_name": h[1], "hexagram_unicode": h[3], "score": 1 / 6}
+            for h in HEXAGRAMS[:6]
+        ]
+
+        def new_row(i):
+            return models.Query(query=f"question {i}", query_vector=vectors[i % len(vectors)], hexagram_set=hexagram_set)
+
+        def immediate(row):
+            db = SessionLocal()
+            try:
+                db.add(row)
+                db.commit()
+                db.refresh(row)
+            finally:
+                db.close()
+            return row
+
+        def run(clients, write):
+            latencies = [[] for _ in range(clients)]
+            deadline = time.perf_counter() + args.duration
+
+            def client(k):
+                i = 0
+                while time.perf_counter() < deadline:
+                    start = time.perf_counter()
+                    row = write(new_row(i))
+                    assert row.id is not None and row.created_at is not None
+                    latencies[k].append(time.perf_counter() - start)
+                    i += 1
+
+            threads = [threading.Thread(target=client, args=(k,)) for k in range(clients)]
+            start = time.perf_counter()
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            elapsed = time.perf_counter() - start
+            times = np.concatenate([np.array(t) for t in latencies])
+            return {
+                "rows_per_second": len(times) / elapsed,
+                "p50_ms": 1000 * float(np.percentile(times, 50)),
+                "p99_ms": 1000 * float(np.percentile(times, 99)),
+            }, len(times), elapsed
+
+        results = {}
+        for clients in args.clients:
+            row = {}
+            result, rows, elapsed = run(clients, immediate)
+            result["commits_per_second"] = rows / elapsed
+            row["immediate"] = result
+            for durability in ("commit", "flush"):
+                writer = GroupCommitWriter(SessionLocal, max_rows=args.max_rows, max_delay_ms=args.max_delay_ms,
+                                           durability=durability)
+                writer.start()
+                result, _, elapsed = run(clients, lambda r: writer.submit(r).result())
+                writer.stop()
+                result["commits_per_second"] = writer.batches / elapsed
+                result["rows_per_commit"] = writer.stats()["rows_per_batch"]
+                row[f"group_{durability}"] = result
+            results[str(clients)] = row
+
+        print(json.dumps({
+            "duration_seconds": args.duration,
+            "max_rows": args.max_rows,
+            "max_delay_ms": args.max_delay_ms,
+            "results": results,
+        }, indent=2))
+
+if __name__ == "__main__":
+    main()
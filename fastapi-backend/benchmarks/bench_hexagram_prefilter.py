@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Similar-query search with the hexagram inverted index vs a full scan.
+
+Stored and search vectors are query-like (see bench_ann_search); hexagram
+sets are each vector's top 6 of 64 synthetic hexagram vectors, chosen the
+way the service scores them. Reports candidate-set size, p50/p99 latency
+and recall@k against the unfiltered full scan for each min_shared value,
+and for a hexagram_ids filter against scoring every row and masking.
+Run from fastapi-backend/:
+
+    python3 -m benchmarks.bench_hexagram_prefilter --rows 100000 500000
+"""
+import argparse
+import json
+import time
+
+import numpy as np
+
+from benchmarks.bench_ann_search import query_like_vectors
+from services.vector_index import QueryVectorIndex
+
+def top_hexagrams(vectors, hexagram_matrix, top_k=6):
+    scores = (vectors / np.linalg.norm(vectors, axis=1, keepdims=True)) @ hexagram_matrix.T
+    return (np.argsort(-scores, axis=1)[:, :top_k] + 1).astype(np.uint8)
+
+def percentiles(times):
+    times = np.array(times) * 1000
+    return {"p50_ms": float(np.percentile(times, 50)), "p99_ms": float(np.percentile(times, 99))}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, nargs="+", default=[100000, 500000])
+    parser.add_argument("--min-shared", type=int, nargs="+", default=[1, 2, 3, 4])
+    parser.add_argument("--searches", type=int, default=200)
+    parser.add_argument("--limit", type=int, default=10)
+    parser.add_argument("--vocab", type=int, default=50000)
+    parser.add_argument("--zipf", type=float, default=1.3)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    dim = 300
+    word_vectors = rng.standard_normal((args.vocab, dim)).astype(np.float32) * 0.4
+    # Hexagram vectors: means of a few keyword vectors, like the service builds them
+    hexagram_matrix = query_like_vectors(rng, word_vectors, 64, args.zipf)
+    hexagram_matrix /= np.linalg.norm(hexagram_matrix, axis=1, keepdims=True)
+
+    results = {}
+    for n_rows in sorted(args.rows):
+        index = QueryVectorIndex(dim, capacity=n_rows)
+        for start in range(0, n_rows, 100000):
+            vectors = query_like_vectors(rng, word_vectors, min(100000, n_rows - start), args.zipf)
+            index.add_normalized(
+                np.arange(start + 1, start + len(vectors) + 1),
+                vectors / np.linalg.norm(vectors, axis=1, keepdims=True),
+                top_hexagrams(vectors, hexagram_matrix),
+            )
+        searches = query_like_vectors(rng, word_vectors, args.searches, args.zipf)
+        search_hexagrams = top_hexagrams(searches, hexagram_matrix).tolist()
+
+        full_times, truth = [], []
+        for vector in searches:
+            start = time.perf_counter()
+            truth.append({query_id for query_id, _ in index.search(vector, args.limit)})
+            full_times.append(time.perf_counter() - start)
+        row = {"full_scan": {**percentiles(full_times), "candidates": n_rows}}
+
+        for min_shared in args.min_shared:
+            times, recalls, sizes = [], [], []
+            for vector, hexagrams, expected in zip(searches, search_hexagrams, truth):
+                sizes.append(len(index.candidates(n_rows, hexagrams, min_shared)))
+                start = time.perf_counter()
+                matches = index.search(vector, args.limit, query_hexagrams=hexagrams, min_shared=min_shared)
+                times.append(time.perf_counter() - start)
+                recalls.append(len(expected & {query_id for query_id, _ in matches}) / len(expected))
+            row[f"min_shared_{min_shared}"] = {
+                **percentiles(times),
+                "candidates": float(np.mean(sizes)),
+                "recall_at_k": float(np.mean(recalls)),
+            }
+
+        # hexagram_ids filter (the search's own top hexagram) vs scoring every row and masking after
+        hexagrams_of = index.hexagram_snapshot()
+        matrix, ids = index.snapshot()
+        filtered_times, scan_times, sizes, agree = [], [], [], 0
+        for vector, hexagrams in zip(searches, search_hexagrams):
+            required = hexagrams[:1]
+            sizes.append(len(index.candidates(n_rows, required_hexagrams=required)))
+            start = time.perf_counter()
+            matches = index.search(vector, args.limit, required_hexagrams=required)
+            filtered_times.append(time.perf_counter() - start)
+
+            start = time.perf_counter()
+            scores = matrix @ (vector / np.linalg.norm(vector)).astype(np.float32)
+            scores[~(hexagrams_of == required[0]).any(axis=1)] = -np.inf
+            top = np.argsort(-scores, kind="stable")[:args.limit]
+            expected = [float(scores[i]) for i in top if np.isfinite(scores[i])]
+            scan_times.append(time.perf_counter() - start)
+            # Compare scores: duplicate stored vectors tie, and float32 rounding may order them differently
+            agree += len(expected) == len(matches) and np.allclose(expected, [score for _, score in matches], atol=1e-6)
+        row["hexagram_ids_filter"] = {
+            **percentiles(filtered_times),
+            "candidates": float(np.mean(sizes)),
+            "full_scan_then_mask": percentiles(scan_times),
+            "same_top_scores": agree / len(searches),
+        }
+        results[str(n_rows)] = row
+
+    print(json.dumps({"limit": args.limit, "searches": args.searches, "results": results}, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Per-query hexagram scoring: 64-iteration loop vs pre-normalized matrix + argpartition.
+
+The legacy path is the original ``_calculate_hexagram_set``. Both paths are
+run on the same query vectors and their outputs compared. Run from
+fastapi-backend/:
+
+    python3 -m benchmarks.bench_hexagram_scoring --queries 2000
+"""
+import argparse
+import json
+import timeit
+
+import numpy as np
+
+from benchmarks.synthetic import bench_workdir
+from services.iching_embeddings import HEXAGRAM_KEYWORDS, ICHingEmbeddingService
+
+def legacy_calculate_hexagram_set(service, query_vector, top_k=6):
+    similarities = []
+    query_norm = np.linalg.norm(query_vector)
+    if query_norm > 0:
+        query_vector = query_vector / query_norm
+    for hex_id, hex_vector in service.hexagram_vectors.items():
+        hex_norm = np.linalg.norm(hex_vector)
+        hex_vector_norm = hex_vector / hex_norm if hex_norm > 0 else hex_vector
+        similarity = np.dot(query_vector, hex_vector_norm)
+        hex_data = next(h for h in service.hexagrams if h[0] == hex_id)
+        similarities.append({
+            "hexagram_id": hex_id,
+            "hexagram_name": hex_data[1],
+            "hexagram_unicode": hex_data[3],
+            "score": float(similarity)
+        })
+    similarities.sort(key=lambda x: x["score"], reverse=True)
+    if similarities:
+        scores = np.array([s["score"] for s in similarities[:top_k]])
+        exp_scores = np.exp(scores * 2)
+        normalized_scores = exp_scores / np.sum(exp_scores)
+        for i, score in enumerate(normalized_scores):
+            similarities[i]["score"] = float(score)
+    return similarities[:top_k]
+
+def compare(legacy, current):
+    same_ids = [h["hexagram_id"] for h in legacy] == [h["hexagram_id"] for h in current]
+    max_diff = max((abs(a["score"] - b["score"]) for a, b in zip(legacy, current)), default=0.0)
+    return same_ids, max_diff, legacy == current
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--vocab-size", type=int, default=50000)
+    parser.add_argument("--queries", type=int, default=2000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    keywords = [word for words in HEXAGRAM_KEYWORDS.values() for word in words]
+    with bench_workdir("glove-bench-", vocab_size=args.vocab_size, extra_words=keywords) as workdir:
+        glove_path = workdir.glove_path
+        service = ICHingEmbeddingService(glove_path)
+
+        # Query vectors built the way process_query builds them
+        rng = np.random.default_rng(0)
+        vectors = [
+            service._embed_tokens(words, service.glove_embeddings.lookup_ids(words))
+            for words in ([f"w{i}" for i in rng.integers(args.vocab_size, size=rng.integers(1, 20))]
+                          for _ in range(args.queries))
+        ]
+        vectors.append(np.zeros(service.vector_dim))
+
+        checks = [compare(legacy_calculate_hexagram_set(service, v), service._calculate_hexagram_set(v)) for v in vectors]
+
+        def per_query_us(fn):
+            timer = timeit.Timer(lambda: [fn(v) for v in vectors])
+            return min(timer.repeat(repeat=args.repeat, number=1)) / len(vectors) * 1e6
+
+        legacy = per_query_us(lambda v: legacy_calculate_hexagram_set(service, v))
+        current = per_query_us(service._calculate_hexagram_set)
+        print(json.dumps({
+            "queries": len(vectors),
+            "legacy_us": legacy,
+            "matrix_us": current,
+            "speedup": legacy / current,
+            "same_top6_ids": sum(c[0] for c in checks) / len(checks),
+            "exactly_equal": sum(c[2] for c in checks) / len(checks),
+            "max_score_diff": max(c[1] for c in checks),
+        }, indent=2))
+
+if __name__ == "__main__":
+    main()
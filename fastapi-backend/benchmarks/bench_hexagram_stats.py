@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+GET /hexagrams/stats against scanning the queries table, and the insert-side cost.
+
+For each table size (one SQLite database grown through ``--rows``, created_at
+spread over two years), the backfill is timed, then three range questions
+are answered both from hexagram_stats (through the endpoint) and by reading
+and counting every matching row, the only way before the table existed: the last 30
+days, one year by week, and the whole history by month. The cost of keeping
+the table up to date is measured on ``POST /queries/`` and a 100-query
+``POST /queries/batch``, with and without the stats upsert.
+Run from fastapi-backend/:
+
+    python3 -m benchmarks.bench_hexagram_stats --rows 100000 1000000
+"""
+import argparse
+import json
+import os
+import time
+
+import numpy as np
+
+from benchmarks.queries import QUERIES, query_words
+from benchmarks.synthetic import bench_workdir, populate_queries
+
+HISTORY_SECONDS = 2 * 365 * 86400
+HISTORY_START = "2024-01-01"
+
+def median_ms(fn, repeats):
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return 1000 * float(np.median(times))
+
+def scan_stats(db, period, start, end):
+    """The same totals, counted from the queries rows"""
+    import models
+    from hexagram_stats import stat_increments
+
+    rows = db.execute(
+        models.Query.__table__.select()
+        .with_only_columns(models.Query.created_at, models.Query.hexagram_set)
+        .where(models.Query.created_at >= start, models.Query.created_at < end),
+        execution_options={"yield_per": 10000},
+    )
+    totals = {}
+    for partition in rows.partitions():
+        for (bucket_period, _, hexagram_id), counts in stat_increments(partition).items():
+            if bucket_period == period:
+                total = totals.setdefault(hexagram_id, [0, 0, 0.0])
+                for i in range(3):
+                    total[i] += counts[i]
+    return totals
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, nargs="+", default=[100000, 1000000])
+    parser.add_argument("--vocab-size", type=int, default=50000)
+    parser.add_argument("--repeats", type=int, default=20)
+    args = parser.parse_args()
+
+    from services.iching_embeddings import HEXAGRAMS
+    with bench_workdir("hexagram-stats-bench-", vocab_size=args.vocab_size, database=True, build_store=True,
+                       extra_words=query_words() + [h[2].lower() for h in HEXAGRAMS]) as workdir:
+        os.environ.update(GLOVE_PATH=workdir.glove_path, EMBEDDING_WARMUP="blocking",
+                          ANN_INDEX_DIR=os.path.join(workdir.path, "no-ann-index"))
+        from datetime import date, datetime
+        from sqlalchemy import text
+        from fastapi.testclient import TestClient
+
+        import main as app_module
+        import hexagram_stats
+        from database import SessionLocal
+
+        # Bucket-aligned, so that the scan counts the same rows
+        ranges = {
+            "last_30_days": ("day", date(2025, 12, 1), date(2025, 12, 31)),
+            "one_year_by_week": ("week", date(2024, 12, 30), date(2025, 12, 29)),  # Mondays
+            "all_by_month": ("month", date(2024, 1, 1), date(2026, 1, 1)),
+        }
+        results = {}
+        for n_rows in sorted(args.rows):
+            db = SessionLocal()
+            populate_queries(db, n_rows)
+            db.execute(text(f"UPDATE queries SET created_at = datetime('{HISTORY_START}', "
+                            f"'+' || (id * {HISTORY_SECONDS // n_rows}) || ' seconds')"))
+            db.commit()
+            started = time.perf_counter()
+            hexagram_stats.rebuild(db)
+            backfill_seconds = time.perf_counter() - started
+            stats_rows = db.execute(text("SELECT COUNT(*) FROM hexagram_stats")).scalar()
+
+            queries = {}
+            with TestClient(app_module.app) as client:
+                for name, (period, start, end) in ranges.items():
+                    params = {"period": period, "start": start.isoformat(), "end": end.isoformat()}
+                    endpoint = client.get("/hexagrams/stats", params=params).json()
+                    scanned = scan_stats(db, period, datetime.combine(start, datetime.min.time()),
+                                         datetime.combine(end, datetime.min.time()))
+                    assert {entry["hexagram_id"]: entry["top6_count"] for entry in endpoint["hexagrams"]} == \
+                        {hexagram_id: counts[1] for hexagram_id, counts in scanned.items()}
+                    queries[name] = {
+                        "endpoint_ms": median_ms(lambda: client.get("/hexagrams/stats", params=params), args.repeats),
+                        "scan_ms": median_ms(lambda: scan_stats(db, period, datetime.combine(start, datetime.min.time()),
+                                                                datetime.combine(end, datetime.min.time())),
+                                             max(1, args.repeats // 10)),
+                    }
+                db.close()
+
+                created = iter(range(10 ** 9))
+                inserts = {}
+                for mode in ("with_stats", "without_stats"):
+                    if mode == "without_stats":
+                        app_module.record_queries = lambda db, rows: None
+                    inserts[mode] = {
+                        "create_query_ms": median_ms(lambda: client.post(
+                            "/queries/", json={"query": f"{QUERIES[1]} {next(created)}"}).raise_for_status(),
+                            args.repeats * 5),
+                        "batch_100_ms": median_ms(lambda: client.post("/queries/batch", json={"queries": [
+                            {"query": f"{QUERIES[i % len(QUERIES)]} {next(created)}"} for i in range(100)
+                        ]}).raise_for_status(), args.repeats),
+                    }
+                app_module.record_queries = hexagram_stats.record_queries
+
+            results[str(n_rows)] = {"backfill_seconds": backfill_seconds, "stats_rows": stats_rows,
+                                    "ranges": queries, "inserts": inserts}
+
+        print(json.dumps({"repeats": args.repeats, "cpus": os.cpu_count(), "results": results}, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Overhead of the per-stage metrics on the query pipeline.
+
+Times one stage timer and one counter increment on their own, then
+``process_query`` (cache misses), ``POST /queries/`` and similar search
+through the ASGI app with the registry enabled and disabled in turn
+(alternating rounds, so drift hits both sides alike), and the cost of
+rendering ``GET /metrics``. Run from fastapi-backend/:
+
+    python3 -m benchmarks.bench_metrics --rows 10000
+"""
+import argparse
+import json
+import os
+import time
+
+import numpy as np
+
+from benchmarks.queries import QUERIES, query_words
+from benchmarks.synthetic import bench_workdir, populate_queries
+
+def per_call_us(fn, repeats):
+    start = time.perf_counter()
+    for _ in range(repeats):
+        fn()
+    return 1e6 * (time.perf_counter() - start) / repeats
+
+def compare_enabled(metrics, fn, repeats, rounds):
+    """Median microseconds per call with metrics on and off"""
+    timings = {True: [], False: []}
+    for _ in range(rounds):
+        for enabled in (True, False):
+            metrics.enabled = enabled
+            timings[enabled].append(per_call_us(fn, repeats))
+    metrics.enabled = True
+    on, off = float(np.median(timings[True])), float(np.median(timings[False]))
+    return {"enabled_us": on, "disabled_us": off, "overhead_us": on - off, "overhead_percent": 100 * (on - off) / off}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--vocab-size", type=int, default=50000)
+    parser.add_argument("--repeats", type=int, default=200)
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+
+    from services.iching_embeddings import HEXAGRAMS
+    with bench_workdir("metrics-bench-", vocab_size=args.vocab_size, database=True,
+                       extra_words=query_words() + [h[2].lower() for h in HEXAGRAMS]) as workdir:
+        os.environ.update(GLOVE_PATH=workdir.glove_path, ANN_INDEX_DIR=os.path.join(workdir.path, "no-ann-index"),
+                          EMBEDDING_WARMUP="blocking")
+
+        from fastapi.testclient import TestClient
+        import main as app_module
+        from database import SessionLocal
+        from services.metrics import metrics
+
+        db = SessionLocal()
+        populate_queries(db, args.rows)
+        db.close()
+
+        results = {
+            "timer_us": per_call_us(lambda: metrics.time("bench").__enter__().__exit__(None, None, None), 100000),
+            "counter_us": per_call_us(lambda: metrics.inc("queries_total"), 100000),
+        }
+        with TestClient(app_module.app) as client:
+            service = app_module.embedding_warmup.service
+            rng = np.random.default_rng(0)
+            words = np.array(service.glove_embeddings.words[:args.vocab_size])
+            misses = iter([" ".join(rng.choice(words, 8)) for _ in range(2 * args.rounds * args.repeats + 1)])
+            results["process_query_miss"] = compare_enabled(
+                metrics, lambda: service.process_query(next(misses)), args.repeats, args.rounds)
+
+            created = iter(range(10 ** 9))
+            results["create_query"] = compare_enabled(
+                metrics, lambda: client.post("/queries/", json={"query": f"{QUERIES[1]} {next(created)}"}),
+                args.repeats // 4, args.rounds)
+            questions = iter(QUERIES * (2 * args.rounds * args.repeats))
+            results["similar_search"] = compare_enabled(
+                metrics, lambda: client.get("/queries/search/similar", params={"query": next(questions), "limit": 10}),
+                args.repeats // 4, args.rounds)
+            results["render_metrics_us"] = per_call_us(lambda: client.get("/metrics"), 50)
+            results["metrics_body_bytes"] = len(client.get("/metrics").content)
+
+        print(json.dumps({"rows": args.rows, "vocab_size": args.vocab_size, "cpus": os.cpu_count(),
+                          "results": results}, indent=2))
+
+if __name__ == "__main__":
+    main()
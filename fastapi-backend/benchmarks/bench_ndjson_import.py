@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Server memory during NDJSON bulk imports of increasing size.
+
+Starts uvicorn in a subprocess (temp SQLite database, synthetic GloVe file),
+streams each upload to POST /queries/import with httpx while sampling the
+server's RSS, and reads the NDJSON results as they arrive. Peak RSS should not
+grow with the number of lines. Run from fastapi-backend/:
+
+    python3 -m benchmarks.bench_ndjson_import --lines 10000 100000
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+
+import httpx
+import numpy as np
+
+from benchmarks.bench_startup import free_port, status_of
+from benchmarks.synthetic import bench_workdir
+
+def process_rss_mb(pid):
+    with open(f"/proc/{pid}/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+def upload(n_lines, vocab_size, seed=0):
+    rng = np.random.default_rng(seed)
+    for _ in range(n_lines // 100):
+        yield "".join(
+            json.dumps({"query": " ".join(f"w{i}" for i in rng.integers(vocab_size, size=8))}) + "\n"
+            for _ in range(100)
+        ).encode()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--vocab-size", type=int, default=50000)
+    parser.add_argument("--lines", type=int, nargs="+", default=[10000, 50000])
+    args = parser.parse_args()
+
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    with bench_workdir("import-bench-", vocab_size=args.vocab_size, build_store=True) as workdir:
+        glove_path = workdir.glove_path
+
+
+        port = free_port()
+        env = dict(os.environ, GLOVE_PATH=glove_path, QUERY_CACHE_SIZE="0",
+                   DATABASE_URL=f"sqlite:///{workdir.db_path}")
+        server = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "main:app", "--app-dir", root, "--port", str(port),
+             "--log-level", "warning"],
+            cwd=workdir.path, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        )
+        base = f"http://127.0.0.1:{port}"
+        results = {}
+        try:
+            while status_of(base + "/ready") != 200:
+                time.sleep(0.1)
+
+            for n_lines in args.lines:
+                samples = []
+                done = threading.Event()
+
+                def sample():
+                    while not done.is_set():
+                        samples.append(process_rss_mb(server.pid))
+                        time.sleep(0.05)
+
+                sampler = threading.Thread(target=sample)
+                baseline = process_rss_mb(server.pid)
+                sampler.start()
+                start = time.perf_counter()
+                imported = errors = 0
+                with httpx.Client(timeout=None) as client:
+                    body = upload(n_lines, args.vocab_size)
+                    with client.stream("POST", base + "/queries/import", content=body) as response:
+                        for line in response.iter_lines():
+                            if line:
+                                if "error" in json.loads(line):
+                                    errors += 1
+                                else:
+                                    imported += 1
+                elapsed = time.perf_counter() - start
+                done.set()
+                sampler.join()
+                results[str(n_lines)] = {
+                    "imported": imported,
+                    "errors": errors,
+                    "lines_per_second": n_lines / elapsed,
+                    "rss_before_mb": baseline,
+                    "rss_peak_mb": max(samples + [baseline]),
+                }
+        finally:
+            server.terminate()
+            server.wait()
+
+        print(json.dumps({"results": results}, indent=2))
+
+if __name__ == "__main__":
+    main()
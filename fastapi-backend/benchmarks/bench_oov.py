@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+OOV-heavy query latency: random fallback vectors vs hashed subword vectors.
+
+``legacy`` draws ``np.random.randn`` per unknown word (the old behaviour,
+different on every call); ``subword_cold`` clears the per-word cache before
+every query, ``subword_warm`` repeats queries whose words are already cached.
+Run from fastapi-backend/:
+
+    python3 -m benchmarks.bench_oov --tokens 5 50 500 --oov-rate 0.8
+"""
+import argparse
+import json
+import string
+import time
+import timeit
+
+import numpy as np
+
+from benchmarks.synthetic import bench_workdir
+from services.iching_embeddings import HEXAGRAM_KEYWORDS, ICHingEmbeddingService
+
+def legacy_embed(service, words):
+    vectors = [
+        service.glove_embeddings[w] if w in service.glove_embeddings else np.random.randn(service.vector_dim) * 0.1
+        for w in words
+    ]
+    return np.mean(vectors, axis=0)
+
+def current_embed(service, words):
+    return service._embed_tokens(words, service.glove_embeddings.lookup_ids(words))
+
+def per_call_us(fn, repeat, setup=None):
+    timer = timeit.Timer(fn, setup=setup or (lambda: None))
+    number, _ = timer.autorange()
+    return min(timer.repeat(repeat=repeat, number=number)) / number * 1e6
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--vocab-size", type=int, default=100000)
+    parser.add_argument("--tokens", type=int, nargs="+", default=[5, 50, 500])
+    parser.add_argument("--oov-rate", type=float, default=0.8)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    keywords = [word for words in HEXAGRAM_KEYWORDS.values() for word in words]
+    with bench_workdir("glove-bench-", vocab_size=args.vocab_size, extra_words=keywords) as workdir:
+        glove_path = workdir.glove_path
+
+        start = time.perf_counter()
+        service = ICHingEmbeddingService(glove_path)
+        first_start = time.perf_counter() - start
+
+        rng = np.random.default_rng(0)
+        letters = np.array(list(string.ascii_lowercase))
+        results = {}
+        for n in args.tokens:
+            words = [
+                "".join(rng.choice(letters, rng.integers(4, 12))) if rng.random() < args.oov_rate
+                else f"w{rng.integers(args.vocab_size)}"
+                for _ in range(n)
+            ]
+            results[str(n)] = {
+                "legacy_us": per_call_us(lambda: legacy_embed(service, words), args.repeat),
+                "subword_cold_us": per_call_us(
+                    lambda: (service._oov_vector.cache_clear(), current_embed(service, words)), args.repeat
+                ),
+                "subword_warm_us": per_call_us(lambda: current_embed(service, words), args.repeat),
+                "deterministic": bool(np.array_equal(current_embed(service, words), current_embed(service, words))),
+            }
+
+        print(json.dumps({
+            "vocab_size": args.vocab_size,
+            "oov_rate": args.oov_rate,
+            "first_start_seconds_incl_table_build": first_start,
+            "subword_table_mb": service.subword_table.table.nbytes / 1e6,
+            "results": results,
+        }, indent=2))
+
+if __name__ == "__main__":
+    main()
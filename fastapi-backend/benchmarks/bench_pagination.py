@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+GET /queries/ page latency: OFFSET pagination vs keyset cursors.
+
+Compares the old unordered ``offset(skip).limit(limit)``, OFFSET with the
+new (created_at, id) ordering, and the cursor path, at page 1 and a deep
+page. created_at is spread one second per row, as a live history would be.
+Run from fastapi-backend/:
+
+    python3 -m benchmarks.bench_pagination --rows 210000 --page-size 20 --pages 1 10000
+"""
+import argparse
+import json
+import time
+
+import numpy as np
+
+from benchmarks.synthetic import bench_workdir, populate_queries
+
+def timed(fn, repeats):
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        rows = fn()
+        times.append(time.perf_counter() - start)
+    return 1000 * float(np.median(times)), rows
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=210000)
+    parser.add_argument("--page-size", type=int, default=20)
+    parser.add_argument("--pages", type=int, nargs="+", default=[1, 10000])
+    parser.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args()
+
+    with bench_workdir("pagination-bench-", database=True):
+
+        import models
+        from database import Base, SessionLocal, engine
+        from pagination import encode_cursor, get_queries_page, ordered_select
+        from sqlalchemy import text
+
+        Base.metadata.create_all(bind=engine)
+        db = SessionLocal()
+        populate_queries(db, args.rows)
+        db.execute(text("UPDATE queries SET created_at = datetime('2024-01-01', '+' || id || ' seconds')"))
+        db.commit()
+        db.execute(text("ANALYZE"))
+
+        results = {}
+        for page in args.pages:
+            skip = (page - 1) * args.page_size
+            if skip >= args.rows:
+                continue
+            # The cursor a client would hold after reading the previous page
+            cursor = None
+            if skip:
+                previous = db.scalars(ordered_select().offset(skip - 1).limit(1)).one()
+                cursor = encode_cursor(previous.created_at, previous.id, "asc")
+
+            unordered_ms, _ = timed(lambda: db.query(models.Query).offset(skip).limit(args.page_size).all(), args.repeats)
+            ordered_ms, expected = timed(lambda: db.scalars(ordered_select().offset(skip).limit(args.page_size)).all(),
+                                         args.repeats)
+            keyset_ms, (rows, _) = timed(
+                lambda: get_queries_page(db, limit=args.page_size, cursor=cursor) if cursor
+                else get_queries_page(db, limit=args.page_size), args.repeats)
+            db.expunge_all()
+
+            results[str(page)] = {
+                "offset_unordered_ms": unordered_ms,
+                "offset_ordered_ms": ordered_ms,
+                "keyset_ms": keyset_ms,
+                "same_rows": [row.id for row in rows] == [row.id for row in expected],
+            }
+        plan = db.execute(text(
+            "EXPLAIN QUERY PLAN SELECT * FROM queries WHERE created_at >= '2024-01-02' "
+            "AND (created_at > '2024-01-02' OR id > 5) ORDER BY created_at, id LIMIT 21"
+        )).all()
+        db.close()
+
+        print(json.dumps({
+            "rows": args.rows,
+            "page_size": args.page_size,
+            "keyset_plan": [row[-1] for row in plan],
+            "results": results,
+        }, indent=2))
+
+if __name__ == "__main__":
+    main()
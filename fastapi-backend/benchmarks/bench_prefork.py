@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+Memory and throughput of multi-worker serving: uvicorn --workers vs serve.py.
+
+``uvicorn --workers N`` spawns N fresh interpreters that each load the
+vocabulary and the query index; ``serve.py --workers N`` loads them once
+and forks. For each worker count both are started against the same
+synthetic GloVe file and a copy of one populated SQLite database. The
+report has the mean worker RSS and the PSS of the whole process tree
+(shared pages counted once), after start-up and again after a mixed load,
+plus req/s under that load. Run from fastapi-backend/:
+
+    python3 -m benchmarks.bench_prefork --workers 1 4 8 --rows 100000
+"""
+import argparse
+import asyncio
+import json
+import os
+import shutil
+import subprocess
+import sys
+import time
+
+from benchmarks.bench_async_app import drive
+from benchmarks.bench_startup import free_port, status_of
+from benchmarks.queries import query_words
+from benchmarks.synthetic import bench_workdir, child_pids, populate_queries, process_memory_mb
+
+def launch_command(launcher, workers, port):
+    if launcher == "prefork":
+        return [sys.executable, "serve.py", "--workers", str(workers), "--port", str(port),
+                "--host", "127.0.0.1", "--log-level", "warning"]
+    return [sys.executable, "-m", "uvicorn", "main:app", "--workers", str(workers), "--port", str(port),
+            "--host", "127.0.0.1", "--log-level", "warning"]
+
+def worker_pids(pid):
+    pids = []
+    for child in child_pids(pid):
+        with open(f"/proc/{child}/cmdline", "rb") as f:
+            if b"resource_tracker" not in f.read():
+                pids.append(child)
+    return pids
+
+def memory_report(pid):
+    workers = worker_pids(pid) or [pid]
+    tree = set(workers) | {pid} | set(child_pids(pid))
+    worker_rss = [process_memory_mb(worker)[0] for worker in workers]
+    return {
+        "workers": len(workers),
+        "worker_rss_mb": sum(worker_rss) / len(worker_rss),
+        "parent_rss_mb": process_memory_mb(pid)[0],
+        "total_pss_mb": sum(process_memory_mb(p)[1] for p in tree),
+    }
+
+def wait_ready(proc, base, log_path, loads, timeout):
+    """Until /ready answers 200 and the model has been loaded ``loads`` times"""
+    start = time.perf_counter()
+    while time.perf_counter() - start < timeout:
+        if proc.poll() is not None:
+            raise RuntimeError(f"server exited with {proc.returncode}")
+        with open(log_path) as f:
+            loaded = f.read().count("Embedding service ready")
+        if loaded >= loads and status_of(base + "/ready") == 200:
+            return time.perf_counter() - start
+        time.sleep(0.2)
+    raise RuntimeError("server did not become ready")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 4, 8])
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--vocab-size", type=int, default=100000)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--duration", type=float, default=10)
+    parser.add_argument("--timeout", type=float, default=600)
+    args = parser.parse_args()
+
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    from services.iching_embeddings import HEXAGRAMS
+    # bench.db is the seed database, copied for each server
+    with bench_workdir("prefork-bench-", vocab_size=args.vocab_size, database=True, build_store=True,
+                       extra_words=query_words() + [h[2].lower() for h in HEXAGRAMS]) as workdir:
+        glove_path = workdir.glove_path
+        import models
+        from database import Base, SessionLocal, engine
+
+        Base.metadata.create_all(bind=engine)
+        db = SessionLocal()
+        populate_queries(db, args.rows)
+        db.close()
+        engine.dispose()
+
+        results = {}
+        for workers in args.workers:
+            for launcher in ("uvicorn", "prefork"):
+                name = f"{launcher}-{workers}"
+                db_path = os.path.join(workdir.path, name + ".db")
+                shutil.copy(workdir.db_path, db_path)
+                log_path = os.path.join(workdir.path, name + ".log")
+                port = free_port()
+                env = dict(os.environ, GLOVE_PATH=glove_path, EMBEDDING_WARMUP="blocking", PYTHONUNBUFFERED="1",
+                           DATABASE_URL=f"sqlite:///{db_path}",
+                           ANN_INDEX_DIR=os.path.join(workdir.path, "no-ann-index"))
+                with open(log_path, "w") as log:
+                    proc = subprocess.Popen(launch_command(launcher, workers, port), cwd=root, env=env,
+                                            stdout=log, stderr=subprocess.STDOUT)
+                base = f"http://127.0.0.1:{port}"
+                try:
+                    loads = workers if launcher == "uvicorn" else 1
+                    ready_seconds = wait_ready(proc, base, log_path, loads, args.timeout)
+                    after_start = memory_report(proc.pid)
+                    load = asyncio.run(drive(base, args.concurrency, args.duration, args.rows))
+                    results[name] = {
+                        "ready_seconds": ready_seconds,
+                        "after_start": after_start,
+                        "after_load": memory_report(proc.pid),
+                        "requests_per_second": load["requests_per_second"],
+                    }
+                finally:
+                    proc.terminate()
+                    proc.wait()
+
+        print(json.dumps({
+            "rows": args.rows,
+            "vocab_size": args.vocab_size,
+            "concurrency": args.concurrency,
+            "cpus": os.cpu_count(),
+            "results": results,
+        }, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Cost of the per-request profiling hook.
+
+Runs the app in-process twice, in child processes: once with
+PROFILING_ENABLED=0 and once with PROFILING_ENABLED=1. Each run times
+``POST /queries/`` and similar search on requests that are not profiled. The
+enabled run also times requests profiled as pstats and as collapsed stacks,
+with the per-minute cap lifted so that every opted-in request is profiled.
+Run from fastapi-backend/:
+
+    python3 -m benchmarks.bench_profiling --rows 100000
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+from benchmarks.queries import QUERIES, query_words
+from benchmarks.synthetic import bench_workdir, populate_queries
+
+def median_ms(fn, repeats):
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return 1000 * float(np.median(times))
+
+def child(args):
+    from fastapi.testclient import TestClient
+    import main as app_module
+
+    results = {}
+    with TestClient(app_module.app) as client:
+        created = iter(range(10 ** 9))
+        questions = iter(QUERIES * 10 ** 4)
+
+        def create(**params):
+            client.post("/queries/", json={"query": f"{QUERIES[1]} {next(created)}"}, params=params).raise_for_status()
+
+        def similar(**params):
+            client.get("/queries/search/similar",
+                       params=dict(params, query=next(questions), limit=10)).raise_for_status()
+
+        modes = {"unprofiled": {}}
+        if app_module.profiler.enabled:
+            modes.update(pstats={"profile": "pstats"}, collapsed={"profile": "collapsed"})
+        for mode, params in modes.items():
+            results[mode] = {
+                "create_query_ms": median_ms(lambda: create(**params), args.repeats),
+                "similar_search_ms": median_ms(lambda: similar(**params), args.repeats),
+            }
+        if app_module.profiler.enabled:
+            results["reports_kept"] = len(app_module.profiler.reports)
+    print(json.dumps(results))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--vocab-size", type=int, default=50000)
+    parser.add_argument("--repeats", type=int, default=50)
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        return child(args)
+
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    from services.iching_embeddings import HEXAGRAMS
+    with bench_workdir("profiling-bench-", vocab_size=args.vocab_size, database=True, build_store=True,
+                       extra_words=query_words() + [h[2].lower() for h in HEXAGRAMS]) as workdir:
+        glove_path = workdir.glove_path
+        import models
+        from database import Base, SessionLocal, engine
+        Base.metadata.create_all(bind=engine)
+        db = SessionLocal()
+        populate_queries(db, args.rows)
+        db.close()
+
+        results = {}
+        for enabled in ("0", "1"):
+            env = dict(os.environ, GLOVE_PATH=glove_path, EMBEDDING_WARMUP="blocking",
+                       ANN_INDEX_DIR=os.path.join(workdir.path, "no-ann-index"),
+                       PROFILING_ENABLED=enabled, PROFILE_MAX_PER_MINUTE="1000000")
+            out = subprocess.run([sys.executable, "-m", "benchmarks.bench_profiling", "--child",
+                                  "--repeats", str(args.repeats)],
+                                 cwd=root, env=env, capture_output=True, text=True, check=True).stdout
+            results["enabled" if enabled == "1" else "disabled"] = json.loads(out.strip().splitlines()[-1])
+
+        print(json.dumps({"rows": args.rows, "repeats": args.repeats, "cpus": os.cpu_count(),
+                          "results": results}, indent=2))
+
+if __name__ == "__main__":
+    main()
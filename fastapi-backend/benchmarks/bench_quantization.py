@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+Compare embedding table precisions: memory used and agreement of readings.
+
+For each precision the top-6 hexagram set of every question in
+``benchmarks.queries.QUERIES`` is compared with the float32 reading.
+Uses a synthetic GloVe file unless ``--glove-path`` is given. Run from
+fastapi-backend/:
+
+    python3 -m benchmarks.bench_quantization --glove-path ./glove/glove.6B.300d.txt
+"""
+import argparse
+import json
+
+import numpy as np
+
+from benchmarks.queries import QUERIES, query_words
+from benchmarks.synthetic import bench_workdir
+from services.embedding_store import PRECISIONS
+from services.iching_embeddings import HEXAGRAM_KEYWORDS, ICHingEmbeddingService
+
+def readings(service):
+    results = []
+    for query in QUERIES:
+        _, hexagram_set = service.process_query(query)
+        results.append([h["hexagram_id"] for h in hexagram_set])
+    return results
+
+def compare(reference, candidate):
+    top1 = np.mean([r[0] == c[0] for r, c in zip(reference, candidate)])
+    exact = np.mean([r == c for r, c in zip(reference, candidate)])
+    overlap = np.mean([len(set(r) & set(c)) / len(r) for r, c in zip(reference, candidate)])
+    return {"top1_agreement": float(top1), "top6_set_overlap": float(overlap), "top6_exact_order": float(exact)}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--glove-path", default=None)
+    parser.add_argument("--vocab-size", type=int, default=100000)
+    args = parser.parse_args()
+
+    keywords = [word for words in HEXAGRAM_KEYWORDS.values() for word in words]
+    # A synthetic file only when no --glove-path is given
+    with bench_workdir("glove-bench-", vocab_size=None if args.glove_path else args.vocab_size,
+                       extra_words=query_words() + keywords) as workdir:
+        glove_path = args.glove_path or workdir.glove_path
+
+        report = {"glove_path": glove_path, "queries": len(QUERIES), "precisions": {}}
+        reference = None
+        reference_bytes = None
+        for precision in PRECISIONS:
+            service = ICHingEmbeddingService(glove_path, precision=precision)
+            table = service.glove_embeddings
+            result = readings(service)
+            if reference is None:
+                reference, reference_bytes = result, table.nbytes
+
+            entry = {
+                "table_mb": table.nbytes / 1e6,
+                "saved_mb": (reference_bytes - table.nbytes) / 1e6,
+                "saved_ratio": 1 - table.nbytes / reference_bytes if reference_bytes else 0.0,
+            }
+            entry.update(compare(reference, result))
+            report["precisions"][precision] = entry
+
+        print(json.dumps(report, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Per-query latency of process_query: per-word loop vs id array + single gather.
+
+The legacy path is the original implementation (one ``_get_word_vector``
+call per token, then ``np.mean`` over a list). Run from fastapi-backend/:
+
+    python3 -m benchmarks.bench_query_embedding --tokens 5 50 500
+"""
+import argparse
+import json
+import timeit
+
+import numpy as np
+
+from benchmarks.synthetic import bench_workdir
+from services.iching_embeddings import HEXAGRAM_KEYWORDS, ICHingEmbeddingService
+
+def legacy_embed(service, query):
+    words = query.lower().split()
+    word_vectors = [service._get_word_vector(word) for word in words]
+    if word_vectors:
+        return np.mean(word_vectors, axis=0)
+    return np.zeros(service.vector_dim)
+
+def vectorized_embed(service, query):
+    words = query.lower().split()
+    return service._embed_tokens(words, service.glove_embeddings.lookup_ids(words))
+
+def legacy_process_query(service, query):
+    query_vector = legacy_embed(service, query)
+    return query_vector.tolist(), service._calculate_hexagram_set(query_vector)
+
+def per_query_us(fn, repeat):
+    timer = timeit.Timer(fn)
+    number, _ = timer.autorange()
+    best = min(timer.repeat(repeat=repeat, number=number))
+    return best / number * 1e6
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--vocab-size", type=int, default=100000)
+    parser.add_argument("--tokens", type=int, nargs="+", default=[5, 50, 500])
+    parser.add_argument("--oov-rate", type=float, default=0.0, help="Fraction of tokens not in the vocabulary")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    keywords = [word for words in HEXAGRAM_KEYWORDS.values() for word in words]
+    with bench_workdir("glove-bench-", vocab_size=args.vocab_size, extra_words=keywords) as workdir:
+        glove_path = workdir.glove_path
+        service = ICHingEmbeddingService(glove_path)
+
+        rng = np.random.default_rng(0)
+        results = {}
+        for n in args.tokens:
+            words = [
+                f"oov{i}" if rng.random() < args.oov_rate else f"w{rng.integers(args.vocab_size)}"
+                for i in range(n)
+            ]
+            query = " ".join(words)
+            legacy = per_query_us(lambda: legacy_process_query(service, query), args.repeat)
+            current = per_query_us(lambda: service.process_query(query), args.repeat)
+            legacy_embedding = per_query_us(lambda: legacy_embed(service, query), args.repeat)
+            current_embedding = per_query_us(lambda: vectorized_embed(service, query), args.repeat)
+            results[str(n)] = {
+                "process_query": {"legacy_us": legacy, "vectorized_us": current, "speedup": legacy / current},
+                "embedding_only": {
+                    "legacy_us": legacy_embedding,
+                    "vectorized_us": current_embedding,
+                    "speedup": legacy_embedding / current_embedding,
+                },
+            }
+
+        print(json.dumps({"vocab_size": args.vocab_size, "oov_rate": args.oov_rate, "results": results}, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+GET /queries/ payload size and time: pydantic responses vs orjson + projection.
+
+The legacy route is the original endpoint (response_model=List[QueryResponse]
+over ORM rows, serialized by FastAPI's jsonable_encoder + json). It is
+compared with the current route at full width, with include_vector=false
+and with fields=id,query. Serialization alone is timed on the same page of
+rows. Run from fastapi-backend/:
+
+    python3 -m benchmarks.bench_response_projection --limit 100
+"""
+import argparse
+import asyncio
+import json
+import time
+
+import numpy as np
+
+from benchmarks.synthetic import bench_workdir, populate_queries
+
+def median_ms(fn, repeats):
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = fn()
+        times.append(time.perf_counter() - start)
+    return 1000 * float(np.median(times)), result
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=5000)
+    parser.add_argument("--limit", type=int, default=100)
+    parser.add_argument("--repeats", type=int, default=50)
+    args = parser.parse_args()
+
+    with bench_workdir("projection-bench-", database=True):
+
+        from typing import List
+        from fastapi import Depends, FastAPI
+        from fastapi.responses import JSONResponse
+        from fastapi.routing import serialize_response
+        from fastapi.testclient import TestClient
+        from fastapi._compat import ModelField
+        from pydantic import TypeAdapter
+        from pydantic.fields import FieldInfo
+
+        import main as app_module
+        import models
+        import schemas
+        from database import SessionLocal, get_db
+        from responses import FastJSONResponse, QUERY_FIELDS, project_query
+
+        db = SessionLocal()
+        populate_queries(db, args.rows)
+
+        legacy = FastAPI()
+
+        @legacy.get("/queries/", response_model=List[schemas.QueryResponse])
+        def read_queries(skip: int = 0, limit: int = 100, db=Depends(get_db)):
+            return db.query(models.Query).offset(skip).limit(limit).all()
+
+        # No context manager: the lifespan (embedding warm-up) is not needed for GET /queries/
+        clients = {"legacy": TestClient(legacy), "current": TestClient(app_module.app)}
+        variants = {
+            "legacy": ("legacy", {}),
+            "orjson_full": ("current", {}),
+            "orjson_no_vector": ("current", {"include_vector": "false"}),
+            "orjson_id_query": ("current", {"fields": "id,query"}),
+        }
+        results = {}
+        for name, (client, params) in variants.items():
+            ms, response = median_ms(
+                lambda: clients[client].get("/queries/", params={"limit": args.limit, **params}), args.repeats)
+            response.raise_for_status()
+            results[name] = {"request_ms": ms, "payload_bytes": len(response.content)}
+
+        # Serialization only, on one page of loaded rows
+        rows = db.query(models.Query).limit(args.limit).all()
+        field = ModelField(name="Response", field_info=FieldInfo(annotation=List[schemas.QueryResponse]), mode="serialization")
+        legacy_ms, _ = median_ms(
+            lambda: JSONResponse(asyncio.run(serialize_response(field=field, response_content=rows, is_coroutine=False))).body,
+            args.repeats)
+        dump_ms, _ = median_ms(lambda: TypeAdapter(List[schemas.QueryResponse]).dump_json(
+            [schemas.QueryResponse.model_validate(row, from_attributes=True) for row in rows]), args.repeats)
+        orjson_ms, _ = median_ms(lambda: FastJSONResponse([project_query(row, QUERY_FIELDS) for row in rows]).body, args.repeats)
+        db.close()
+
+        print(json.dumps({
+            "rows": args.rows,
+            "limit": args.limit,
+            "requests": results,
+            "serialize_page_ms": {
+                "fastapi_jsonable_encoder": legacy_ms,
+                "pydantic_dump_json": dump_ms,
+                "orjson_numpy": orjson_ms,
+            },
+        }, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+/queries/search/similar latency: full table scan vs the in-memory vector index.
+
+The legacy path is the original endpoint body (load every row, parse every
+JSON vector, cosine in a Python loop). Both return the top ``limit`` rows
+for the same search vectors. Run from fastapi-backend/:
+
+    python3 -m benchmarks.bench_similar_search --rows 10000 100000
+"""
+import argparse
+import json
+import time
+
+import numpy as np
+
+from benchmarks.synthetic import bench_workdir, populate_queries
+
+def legacy_search(db, models, search_vector, limit):
+    search_vector = np.array(search_vector)
+    similarities = []
+    for db_query in db.query(models.Query).all():
+        db_vector = np.array(db_query.query_vector)
+        similarity = np.dot(search_vector, db_vector) / (np.linalg.norm(search_vector) * np.linalg.norm(db_vector))
+        similarities.append((db_query, similarity))
+    similarities.sort(key=lambda x: x[1], reverse=True)
+    return [query.id for query, _ in similarities[:limit]]
+
+def index_search(db, models, index, search_vector, limit):
+    matches = index.search(search_vector, limit)
+    rows = db.query(models.Query).filter(models.Query.id.in_([query_id for query_id, _ in matches])).all()
+    rows_by_id = {row.id: row for row in rows}
+    return [query_id for query_id, _ in matches if query_id in rows_by_id]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, nargs="+", default=[10000, 50000])
+    parser.add_argument("--searches", type=int, default=5)
+    parser.add_argument("--limit", type=int, default=10)
+    args = parser.parse_args()
+
+    with bench_workdir("similar-bench-", database=True):
+
+        import models
+        from database import Base, SessionLocal, engine
+        from services.vector_index import QueryVectorIndex
+
+        Base.metadata.create_all(bind=engine)
+        rng = np.random.default_rng(1)
+        searches = [rng.standard_normal(300) for _ in range(args.searches)]
+
+        results = {}
+        for n_rows in sorted(args.rows):
+            db = SessionLocal()
+            populate_queries(db, n_rows)
+
+            start = time.perf_counter()
+            index = QueryVectorIndex()
+            index.load(db.query(models.Query.id, models.Query.query_vector).order_by(models.Query.id).yield_per(10000))
+            load_seconds = time.perf_counter() - start
+
+            legacy_times, index_times, agree = [], [], 0
+            for vector in searches:
+                start = time.perf_counter()
+                expected = legacy_search(db, models, vector, args.limit)
+                legacy_times.append(time.perf_counter() - start)
+                start = time.perf_counter()
+                got = index_search(db, models, index, vector, args.limit)
+                index_times.append(time.perf_counter() - start)
+                agree += expected == got
+            db.close()
+
+            results[str(n_rows)] = {
+                "legacy_ms": 1000 * float(np.median(legacy_times)),
+                "index_ms": 1000 * float(np.median(index_times)),
+                "index_load_seconds": load_seconds,
+                "index_mb": index.nbytes / 1e6,
+                "same_results": agree / len(searches),
+            }
+
+        print(json.dumps({"limit": args.limit, "results": results}, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Measure server start-up: time to first accepted connection and time to ready.
+
+Starts uvicorn in a subprocess against a synthetic GloVe file and a temp
+SQLite database, once with EMBEDDING_WARMUP=blocking (the old behaviour) and
+once with background warm-up. Run from fastapi-backend/:
+
+    python3 -m benchmarks.bench_startup --vocab-size 400000
+"""
+import argparse
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+
+from benchmarks.synthetic import bench_workdir
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def status_of(url):
+    try:
+        with urllib.request.urlopen(url, timeout=1) as response:
+            return response.status
+    except urllib.error.HTTPError as e:
+        return e.code
+    except (urllib.error.URLError, ConnectionError, socket.timeout):
+        return None
+
+def measure(mode, glove_path, workdir, root, timeout):
+    port = free_port()
+    env = dict(os.environ, GLOVE_PATH=glove_path, EMBEDDING_WARMUP=mode,
+               DATABASE_URL=f"sqlite:///{os.path.join(workdir, mode + '.db')}")
+    start = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--app-dir", root, "--port", str(port), "--log-level", "warning"],
+        cwd=workdir, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    base = f"http://127.0.0.1:{port}"
+    first_connection = ready = None
+    try:
+        while time.perf_counter() - start < timeout:
+            if first_connection is None and status_of(base + "/") == 200:
+                first_connection = time.perf_counter() - start
+            if first_connection is not None and status_of(base + "/ready") == 200:
+                ready = time.perf_counter() - start
+                break
+            time.sleep(0.02)
+    finally:
+        proc.terminate()
+        proc.wait()
+    return {"first_connection_seconds": first_connection, "ready_seconds": ready}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--vocab-size", type=int, default=100000)
+    parser.add_argument("--cold", action="store_true", help="Delete the binary store before each run")
+    parser.add_argument("--timeout", type=float, default=300)
+    args = parser.parse_args()
+
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    with bench_workdir("startup-bench-", vocab_size=args.vocab_size, build_store=not args.cold) as workdir:
+        glove_path = workdir.glove_path
+
+        results = {}
+        for mode in ("blocking", "background"):
+            if args.cold:
+                for name in os.listdir(workdir.path):
+                    if name.startswith("glove.txt."):
+                        os.remove(os.path.join(workdir.path, name))
+            results[mode] = measure(mode, glove_path, workdir.path, root, args.timeout)
+
+        print(json.dumps({"vocab_size": args.vocab_size, "cold": args.cold, "results": results}, indent=2))
+
+if __name__ == "__main__":
+    main()
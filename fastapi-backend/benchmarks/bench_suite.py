@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+"""
+Offline benchmark suite: embedding load, query scoring and the query endpoints.
+
+Generates a synthetic GloVe file (``--vocab-size`` words of ``--dim``
+floats) and one synthetic queries table grown through ``--rows``. Timed
+in-process, with no network:
+
+- ``_load_glove_embeddings`` building the store from text (cold) and
+  opening it (warm), and the whole service start-up
+- ``process_query`` on cache misses and hits, and ``_calculate_hexagram_set``
+- per table size: warm-up (service + query index), ``GET /queries/`` with
+  and without vectors, ``/queries/search/similar`` and ``POST /queries/``
+  through the ASGI app
+
+Prints one JSON document tagged with the git commit and library versions.
+``--compare OLD.json`` adds new/old ratios for every timing, so a
+regression between two commits shows up as a ratio above 1. Run from
+fastapi-backend/:
+
+    python3 -m benchmarks.bench_suite --output before.json
+    python3 -m benchmarks.bench_suite --rows 10000 100000 --compare before.json
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from benchmarks.queries import QUERIES, query_words
+from benchmarks.synthetic import populate_queries, write_synthetic_glove
+
+TIMING_SUFFIXES = ("_ms", "_seconds")
+
+def latency_ms(fn, repeats, warmup=1):
+    for _ in range(warmup):
+        fn()
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    times = 1000 * np.array(times)
+    return {
+        "p50_ms": float(np.percentile(times, 50)),
+        "p99_ms": float(np.percentile(times, 99)),
+        "mean_ms": float(times.mean()),
+    }
+
+def timed_seconds(fn):
+    start = time.perf_counter()
+    result = fn()
+    return time.perf_counter() - start, result
+
+def git_commit(root):
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=root, capture_output=True, text=True)
+        return out.stdout.strip() or None
+    except OSError:
+        return None
+
+def compare(current, baseline):
+    """new/old ratio for every timing present in both reports"""
+    ratios = {}
+    for key, value in current.items():
+        old = baseline.get(key) if isinstance(baseline, dict) else None
+        if isinstance(value, dict) and isinstance(old, dict):
+            nested = compare(value, old)
+            if nested:
+                ratios[key] = nested
+        elif key.endswith(TIMING_SUFFIXES) and isinstance(value, (int, float)) and old:
+            ratios[key] = value / old
+    return ratios
+
+def bench_embeddings(glove_path, args):
+    from services.embedding_store import store_paths
+    from services.iching_embeddings import ICHingEmbeddingService
+
+    results = {}
+    # Cold: text file only, so the first service builds the store and the subword table
+    results["service_init_cold_seconds"], service = timed_seconds(lambda: ICHingEmbeddingService(glove_path))
+    for path in store_paths(glove_path):
+        os.remove(path)
+    results["load_glove_cold_seconds"], _ = timed_seconds(lambda: service._load_glove_embeddings(glove_path))
+    ICHingEmbeddingService(glove_path)  # rebuilds the subword table the store rebuild removed
+    results["load_glove_warm_seconds"] = min(
+        timed_seconds(lambda: service._load_glove_embeddings(glove_path))[0] for _ in range(5)
+    )
+    results["service_init_warm_seconds"], service = timed_seconds(lambda: ICHingEmbeddingService(glove_path))
+
+    # Unique random queries so every call is a cache miss
+    rng = np.random.default_rng(0)
+    words = np.array(service.glove_embeddings.words[:50000])
+    misses = iter([" ".join(rng.choice(words, args.tokens)) for _ in range(args.repeats * 10 + 1)])
+    results["process_query_miss"] = latency_ms(lambda: service.process_query(next(misses)), args.repeats * 10)
+    results["process_query_hit"] = latency_ms(lambda: service.process_query(QUERIES[0]), args.repeats * 10)
+
+    vectors = iter(rng.standard_normal((args.repeats * 10 + 1, service.vector_dim)).astype(np.float32))
+    results["calculate_hexagram_set"] = latency_ms(lambda: service._calculate_hexagram_set(next(vectors)),
+                                                   args.repeats * 10)
+    results["tokens_per_query"] = args.tokens
+    return results
+
+def bench_endpoints(n_rows, args):
+    from fastapi.testclient import TestClient
+    import main as app_module
+    from database import SessionLocal
+    from services.warmup import EmbeddingWarmup
+
+    db = SessionLocal()
+    populate_queries(db, n_rows, dim=args.dim)
+    db.close()
+
+    # A fresh warm-up per table size: the service and the query index are loaded again
+    app_module.embedding_warmup = EmbeddingWarmup(app_module.load_models)
+    results = {}
+    start = time.perf_counter()
+    with TestClient(app_module.app) as client:
+        results["warmup_seconds"] = time.perf_counter() - start
+        results["indexed_vectors"] = len(app_module.query_index)
+
+        def get(path, params):
+            client.get(path, params=params).raise_for_status()
+
+        results["list_queries"] = latency_ms(lambda: get("/queries/", {"limit": 100}), args.repeats)
+        results["list_queries_no_vector"] = latency_ms(
+            lambda: get("/queries/", {"limit": 100, "include_vector": "false"}), args.repeats)
+        questions = iter(QUERIES * (args.repeats // len(QUERIES) + 2))
+        results["similar_search"] = latency_ms(
+            lambda: get("/queries/search/similar", {"query": next(questions), "limit": 10}), args.repeats)
+        created = iter(range(args.repeats + 1))
+        results["create_query"] = latency_ms(
+            lambda: client.post("/queries/", json={"query": f"{QUERIES[1]} {next(created)}"}).raise_for_status(),
+            args.repeats)
+    return results
+
+def run(args, workdir):
+    """The report, with every generated file under ``workdir``"""
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+    os.environ["ANN_INDEX_DIR"] = os.path.join(workdir, "no-ann-index")
+    os.environ["EMBEDDING_WARMUP"] = "blocking"
+
+    from services.iching_embeddings import HEXAGRAMS
+    glove_path = os.path.join(workdir, f"synthetic.{args.vocab_size}.{args.dim}d.txt")
+    write_synthetic_glove(glove_path, vocab_size=args.vocab_size, dim=args.dim,
+                          extra_words=query_words() + [h[2].lower() for h in HEXAGRAMS])
+    os.environ["GLOVE_PATH"] = glove_path
+
+    return {
+        "commit": git_commit(root),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "cpus": os.cpu_count(),
+        "vocab_size": args.vocab_size,
+        "dim": args.dim,
+        "embeddings": bench_embeddings(glove_path, args),
+        "endpoints": {str(n_rows): bench_endpoints(n_rows, args) for n_rows in sorted(args.rows)},
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--vocab-size", type=int, default=100000)
+    parser.add_argument("--dim", type=int, default=300)
+    parser.add_argument("--rows", type=int, nargs="+", default=[10000, 100000, 1000000])
+    parser.add_argument("--tokens", type=int, default=8, help="Words per synthetic query for process_query")
+    parser.add_argument("--repeats", type=int, default=50)
+    parser.add_argument("--output", help="Also write the report to this file")
+    parser.add_argument("--compare", help="Earlier report to compute new/old timing ratios against")
+    parser.add_argument("--keep-workdir", action="store_true",
+                        help="Keep the synthetic GloVe file, embedding store and database (path on stderr)")
+    args = parser.parse_args()
+
+    if args.keep_workdir:
+        workdir = tempfile.mkdtemp(prefix="bench-suite-")
+        print(f"Working directory: {workdir}", file=sys.stderr)
+        report = run(args, workdir)
+    else:
+        with tempfile.TemporaryDirectory(prefix="bench-suite-") as workdir:
+            report = run(args, workdir)
+    if args.compare:
+        with open(args.compare) as f:
+            report["ratios_vs_baseline"] = compare(report, json.load(f))
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output)
+    print(output)
+
+if __name__ == "__main__":
+    main()
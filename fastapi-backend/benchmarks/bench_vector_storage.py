@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Stored query vectors: JSON float arrays vs packed float32/float16 blobs.
+
+Writes the same synthetic rows into one SQLite file per format and reports
+bytes per stored vector, file size, and read throughput for a full vector
+scan (every row decoded into a float32 array, as the index load does) and
+for building QueryResponse objects (the GET /queries/ path). Run from
+fastapi-backend/:
+
+    python3 -m benchmarks.bench_vector_storage --rows 100000
+"""
+import argparse
+import json
+import os
+import time
+
+import numpy as np
+import sqlalchemy as sa
+
+import schemas
+from benchmarks.synthetic import bench_workdir
+from models import VectorBlob
+
+FORMATS = {
+    "json": sa.JSON(),
+    "float32": VectorBlob("float32"),
+    "float16": VectorBlob("float16"),
+}
+
+def make_table(metadata, column_type):
+    return sa.Table(
+        "queries", metadata,
+        sa.Column("id", sa.Integer, primary_key=True),
+        sa.Column("query", sa.Text, nullable=False),
+        sa.Column("query_vector", column_type, nullable=False),
+        sa.Column("hexagram_set", sa.JSON, nullable=False),
+        sa.Column("created_at", sa.DateTime, server_default=sa.func.now(), nullable=False),
+    )
+
+def populate(engine, table, n_rows, dim, batch_rows=5000):
+    rng = np.random.default_rng(0)
+    hexagram_set = [{"hexagram_id": 1, "hexagram_name": "The Creative", "hexagram_unicode": "䷀", "score": 0.5}] * 6
+    with engine.begin() as connection:
+        for start in range(0, n_rows, batch_rows):
+            count = min(batch_rows, n_rows - start)
+            vectors = rng.standard_normal((count, dim)).astype(np.float32) * 0.4
+            connection.execute(table.insert(), [
+                {"query": f"synthetic question {start + i}", "query_vector": vectors[i].tolist(),
+                 "hexagram_set": hexagram_set}
+                for i in range(count)
+            ])
+
+def scan_vectors(engine, table):
+    """Rows/s decoding every stored vector into a float32 array"""
+    start = time.perf_counter()
+    rows = 0
+    with engine.connect() as connection:
+        result = connection.execution_options(yield_per=10000).execute(sa.select(table.c.id, table.c.query_vector))
+        for _, vector in result:
+            np.asarray(vector, dtype=np.float32)
+            rows += 1
+    return rows / (time.perf_counter() - start)
+
+def read_responses(engine, table, page_rows):
+    """Rows/s reading full rows and validating them into QueryResponse"""
+    start = time.perf_counter()
+    with engine.connect() as connection:
+        rows = connection.execute(sa.select(table).limit(page_rows)).mappings().all()
+        responses = [schemas.QueryResponse.model_validate(dict(row)) for row in rows]
+    elapsed = time.perf_counter() - start
+    return len(responses) / elapsed, responses[0].model_dump_json()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--page-rows", type=int, default=1000)
+    parser.add_argument("--dim", type=int, default=300)
+    parser.add_argument("--repeats", type=int, default=3)
+    args = parser.parse_args()
+
+    with bench_workdir("vector-storage-bench-") as workdir:
+
+        results = {}
+        for name, column_type in FORMATS.items():
+            path = os.path.join(workdir.path, f"{name}.db")
+            engine = sa.create_engine(f"sqlite:///{path}")
+            table = make_table(sa.MetaData(), column_type)
+            table.metadata.create_all(engine)
+            populate(engine, table, args.rows, args.dim)
+
+            with engine.connect() as connection:
+                vector_bytes = connection.execute(sa.select(sa.func.avg(sa.func.length(sa.cast(table.c.query_vector, sa.LargeBinary))))).scalar()
+            scan = max(scan_vectors(engine, table) for _ in range(args.repeats))
+            responses, sample = max(read_responses(engine, table, args.page_rows) for _ in range(args.repeats))
+            engine.dispose()
+
+            results[name] = {
+                "vector_bytes_per_row": float(vector_bytes),
+                "file_bytes_per_row": os.path.getsize(path) / args.rows,
+                "scan_rows_per_s": scan,
+                "response_rows_per_s": responses,
+                "response_json_bytes": len(sample),
+            }
+
+        print(json.dumps({"rows": args.rows, "dim": args.dim, "results": results}, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,27 @@
+# Fixed question set used to compare readings between configurations.
+QUERIES = [
+    "What path should I take in my career?",
+    "How can I find balance in my life?",
+    "I seek wisdom about conflict and peace in my life",
+    "What does the future hold for my career?",
+    "How can I find balance between work and family?",
+    "I am facing a difficult decision about moving",
+    "Seeking guidance on a new relationship",
+    "Need clarity about financial investments",
+    "How can I find inner peace?",
+    "Should I wait or act now?",
+    "How do I restore a friendship after an argument?",
+    "What should I focus on today?",
+    "Is this the right time to start a business?",
+    "How can I be more patient with my children?",
+    "What is blocking my progress at work?",
+    "How do I handle a dispute with my neighbour?",
+    "Will the changes ahead bring growth or loss?",
+    "How can I lead my team through a hard season?",
+    "What should I learn from this failure?",
+    "How do I find the courage to begin again?",
+]
+
+def query_words():
+    """Lower-cased tokens appearing in QUERIES, as the service tokenizes them"""
+    return sorted({word for query in QUERIES for word in query.lower().split()})
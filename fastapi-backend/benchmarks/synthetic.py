@@ -0,0 +1,144 @@
+import os
+import tempfile
+from collections import namedtuple
+from contextlib import contextmanager, nullcontext
+import numpy as np
+
+BenchWorkdir = namedtuple("BenchWorkdir", "path glove_path db_path")
+
+def write_synthetic_glove(path, vocab_size=50000, dim=300, seed=0, extra_words=()):
+    """
+    Write a GloVe-format text file with random vectors.
+
+    Words are ``w0``, ``w1``, ... plus any ``extra_words`` (e.g. hexagram
+    keywords) so the service finds real vocabulary hits.
+    """
+    if os.path.exists(path):
+        return path
+
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    rng = np.random.default_rng(seed)
+    words = list(dict.fromkeys(list(extra_words) + [f"w{i}" for i in range(vocab_size)]))[:max(vocab_size, len(extra_words))]
+
+    chunk = 10000
+    with open(path, "w", encoding="utf-8") as f:
+        for start in range(0, len(words), chunk):
+            block = rng.standard_normal((min(chunk, len(words) - start), dim)).astype(np.float32) * 0.4
+            for word, row in zip(words[start:start + chunk], block):
+                f.write(word)
+                f.write(" ")
+                f.write(" ".join(f"{x:.5f}" for x in row))
+                f.write("\n")
+    return path
+
+def read_glove_text(glove_path, vocab_size=None):
+    """
+    Baseline parser: the original one-line-at-a-time loader, kept as the
+    serial reference for services/glove_parser.py.
+    """
+    from tqdm import tqdm
+    from services.embedding_store import EmbeddingStore
+
+    words = []
+    rows = []
+    with open(glove_path, "r", encoding="utf-8") as f:
+        for i, line in enumerate(tqdm(f, desc="Loading GloVe")):
+            if vocab_size and i >= vocab_size:
+                break
+
+            values = line.split()
+            words.append(values[0])
+            rows.append(np.array(values[1:], dtype="float32"))
+
+    if not rows:
+        return EmbeddingStore.empty()
+    return EmbeddingStore(words, np.vstack(rows))
+
+@contextmanager
+def bench_workdir(prefix, vocab_size=None, dim=300, extra_words=(), glove_name="glove.txt", database=False,
+                  build_store=False, path=None):
+    """
+    Working directory for one benchmark run, deleted with its contents on exit.
+
+    With ``database``, DATABASE_URL points at bench.db in it (enter before
+    importing database.py). With ``vocab_size``, a synthetic GloVe file is
+    written there, and its binary store built too with ``build_store``.
+    An existing ``path`` is used instead and kept.
+    """
+    with nullcontext(path) if path else tempfile.TemporaryDirectory(prefix=prefix) as workdir:
+        db_path = os.path.join(workdir, "bench.db")
+        if database:
+            os.environ["DATABASE_URL"] = f"sqlite:///{db_path}"
+        glove_path = None
+        if vocab_size is not None:
+            glove_path = write_synthetic_glove(os.path.join(workdir, glove_name), vocab_size=vocab_size, dim=dim,
+                                               extra_words=extra_words)
+            if build_store:
+                from services.glove_parser import build_store as build
+                build(glove_path)
+        yield BenchWorkdir(workdir, glove_path, db_path)
+
+def current_rss_mb():
+    """Resident set size of this process in MB (Linux /proc, else peak RSS)"""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    import resource
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+def process_memory_mb(pid):
+    """(RSS, PSS) of a process in MB; PSS splits shared pages between the processes sharing them"""
+    values = {}
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            key, _, rest = line.partition(":")
+            if key in ("Rss", "Pss"):
+                values[key] = int(rest.split()[0]) / 1024
+    return values["Rss"], values["Pss"]
+
+def child_pids(pid):
+    """Direct children of a process (Linux /proc)"""
+    children = []
+    for task in os.listdir(f"/proc/{pid}/task"):
+        try:
+            with open(f"/proc/{pid}/task/{task}/children") as f:
+                children.extend(int(child) for child in f.read().split())
+        except OSError:
+            pass
+    return children
+
+def populate_queries(session, n_rows, dim=300, seed=0, batch_rows=5000):
+    """Insert ``n_rows`` synthetic rows into the queries table (random vectors and hexagram sets)"""
+    import models
+    from services.iching_embeddings import HEXAGRAMS
+
+    rng = np.random.default_rng(seed)
+    existing = session.query(models.Query).count()
+    for start in range(existing, n_rows, batch_rows):
+        count = min(batch_rows, n_rows - start)
+        vectors = rng.standard_normal((count, dim)).astype(np.float32) * 0.4
+        picks = rng.integers(len(HEXAGRAMS), size=(count, 6))
+        rows = []
+        for i in range(count):
+            scores = np.sort(rng.random(6))[::-1]
+            scores = scores / scores.sum()
+            rows.append({
+                "query": f"synthetic question {start + i}",
+                "query_vector": [float(x) for x in vectors[i]],
+                "hexagram_set": [
+                    {
+                        "hexagram_id": HEXAGRAMS[p][0],
+                        "hexagram_name": HEXAGRAMS[p][1],
+                        "hexagram_unicode": HEXAGRAMS[p][3],
+                        "score": float(score),
+                    }
+                    for p, score in zip(picks[i], scores)
+                ],
+            })
+        session.bulk_insert_mappings(models.Query, rows)
+        session.commit()
+    return n_rows
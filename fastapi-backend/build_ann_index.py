@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+import argparse
+import os
+import time
+import numpy as np
+import models
+from database import SessionLocal
+from services.ivf_index import IVFIndex, TRAIN_ITERATIONS, TRAIN_SAMPLE_ROWS, default_list_count
+from services.vector_index import HEXAGRAMS_PER_ROW, hexagram_ids
+
+def stored_vector_dim(db):
+    """Length of the newest stored vector (the current embedding store's dimension), or None"""
+    vector = db.query(models.Query.query_vector).order_by(models.Query.id.desc()).limit(1).scalar()
+    return len(vector) if vector is not None else None
+
+def read_vectors(db, vector_dim=None, batch_rows=10000):
+    """
+    All stored (id, vector, hexagram ids) rows as arrays, streamed from the
+    queries table; rows of another dimension than ``vector_dim`` (by default
+    the newest row's) are skipped
+    """
+    vector_dim = vector_dim or stored_vector_dim(db) or 300
+    ids, vectors, hexagrams = [], [], []
+    rows = (db.query(models.Query.id, models.Query.query_vector, models.Query.hexagram_set)
+            .order_by(models.Query.id))
+    for query_id, vector, hexagram_set in rows.yield_per(batch_rows):
+        if vector is not None and len(vector) == vector_dim:
+            ids.append(query_id)
+            vectors.append(np.asarray(vector, dtype=np.float32))
+            row = hexagram_ids(hexagram_set)
+            hexagrams.append(row + [0] * (HEXAGRAMS_PER_ROW - len(row)))
+    if not ids:
+        return (np.zeros(0, dtype=np.int64), np.zeros((0, vector_dim), dtype=np.float32),
+                np.zeros((0, HEXAGRAMS_PER_ROW), dtype=np.uint8))
+    return np.array(ids, dtype=np.int64), np.stack(vectors), np.array(hexagrams, dtype=np.uint8)
+
+def build(index_dir, n_lists=None, sample_rows=TRAIN_SAMPLE_ROWS, iterations=TRAIN_ITERATIONS, vector_dim=None):
+    """Build the IVF index from the queries table and save it to ``index_dir``"""
+    db = SessionLocal()
+    try:
+        start = time.perf_counter()
+        ids, vectors, hexagrams = read_vectors(db, vector_dim)
+        print(f"Read {len(ids)} query vectors of {vectors.shape[1]} dimensions in {time.perf_counter() - start:.1f}s")
+    finally:
+        db.close()
+
+    n_lists = n_lists or default_list_count(len(ids))
+    start = time.perf_counter()
+    index = IVFIndex.build(ids, vectors, hexagrams, n_lists=n_lists, sample_rows=sample_rows, iterations=iterations)
+    print(f"Trained {index.n_lists} lists in {time.perf_counter() - start:.1f}s")
+
+    index.save(index_dir)
+    sizes = [len(inverted_list) for inverted_list in index.lists]
+    print(f"Wrote {index_dir} ({index.nbytes / 1e6:.1f} MB); list sizes min {min(sizes)}, "
+          f"median {int(np.median(sizes))}, max {max(sizes)}")
+    return index
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build the approximate nearest-neighbour index for similar-query search")
+    parser.add_argument("--out", default=os.getenv("ANN_INDEX_DIR", "./ann_index"))
+    parser.add_argument("--lists", type=int, default=None,
+                        help="Number of inverted lists (default: 4 * sqrt(rows))")
+    parser.add_argument("--sample", type=int, default=TRAIN_SAMPLE_ROWS,
+                        help="Rows sampled to train the centroids")
+    parser.add_argument("--iterations", type=int, default=TRAIN_ITERATIONS)
+    parser.add_argument("--dim", type=int, default=None,
+                        help="Vector dimension to index (default: that of the newest stored vector)")
+    args = parser.parse_args()
+
+    build(args.out, n_lists=args.lists, sample_rows=args.sample, iterations=args.iterations, vector_dim=args.dim)
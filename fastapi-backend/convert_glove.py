@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+import argparse
+import os
+import sys
+import time
+from services.embedding_store import LEGACY_CACHE_SUFFIX, read_legacy_cache, store_paths
+from services.glove_parser import parse_glove_parallel
+
+def convert(glove_path, source="auto", vocab_size=None, workers=None):
+    """Convert a GloVe text file or legacy pickle cache into the memory-mapped store"""
+    legacy_cache = glove_path + LEGACY_CACHE_SUFFIX
+
+    if source == "auto":
+        source = "pickle" if os.path.exists(legacy_cache) and vocab_size is None else "text"
+
+    start = time.perf_counter()
+    if source == "pickle":
+        print(f"Reading legacy cache {legacy_cache}...")
+        store = read_legacy_cache(legacy_cache)
+        store.save(glove_path)
+    else:
+        print(f"Parsing GloVe text file {glove_path} with {workers or os.cpu_count()} workers...")
+        store = parse_glove_parallel(glove_path, vocab_size=vocab_size, workers=workers)
+    elapsed = time.perf_counter() - start
+
+    vectors_path, vocab_path = store_paths(glove_path)
+    print(f"Wrote {len(store)} x {store.vector_dim} vectors in {elapsed:.1f}s")
+    print(f"  {vectors_path} ({os.path.getsize(vectors_path) / 1e6:.1f} MB)")
+    print(f"  {vocab_path} ({os.path.getsize(vocab_path) / 1e6:.1f} MB)")
+    return vectors_path, vocab_path
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build the memory-mapped GloVe embedding store")
+    parser.add_argument("glove_path", nargs="?", default="./glove/glove.6B.300d.txt")
+    parser.add_argument("--source", choices=["auto", "text", "pickle"], default="auto",
+                        help="Convert from the .txt file or the legacy .cache.pkl (default: auto)")
+    parser.add_argument("--vocab-size", type=int, default=None,
+                        help="Only keep the first N words (text source only)")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="Parser processes for the text source (default: CPU count)")
+    args = parser.parse_args()
+
+    if args.source == "pickle" and args.vocab_size:
+        print("--vocab-size is only supported when converting from the text file")
+        sys.exit(1)
+
+    convert(args.glove_path, source=args.source, vocab_size=args.vocab_size, workers=args.workers)
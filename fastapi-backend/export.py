@@ -0,0 +1,129 @@
+import base64
+import csv
+import io
+import os
+from datetime import date, datetime, time, timezone
+from typing import Iterator, Optional, Sequence, Tuple, Union
+import numpy as np
+import orjson
+from sqlalchemy import LargeBinary, Text, select, type_coerce
+import models
+from database import SessionLocal
+
+# Streaming export of the queries table. Rows are read in EXPORT_BATCH_ROWS
+# batches through a streaming result (a server-side cursor on MySQL), so
+# memory stays flat however many rows are exported. Each batch is written out
+# as one NDJSON or CSV chunk. The vector and the hexagram set are passed
+# through as stored: the vector blob is never decoded unless it is exported
+# as a JSON list, and the hexagram JSON is not parsed.
+EXPORT_BATCH_ROWS = int(os.getenv("EXPORT_BATCH_ROWS", "5000"))
+
+EXPORT_FORMATS = ("ndjson", "csv")
+MEDIA_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+# "none": no vector; "base64": the stored little-endian bytes (QUERY_VECTOR_DTYPE);
+# "list": a JSON array of floats, as in the API responses
+VECTOR_ENCODINGS = ("none", "base64", "list")
+CSV_COLUMNS = ("id", "query", "hexagram_set", "created_at")
+
+_VECTOR_DTYPE = np.dtype(models.QUERY_VECTOR_DTYPE).newbyteorder("<")
+
+
+def vector_encoding_header(vector: str) -> str:
+    """How exported vectors are encoded, for the X-Vector-Encoding header and the CLI"""
+    if vector == "base64":
+        return f"base64 little-endian {models.QUERY_VECTOR_DTYPE}"
+    return vector
+
+
+def as_stored_time(value: Union[date, datetime, None]) -> Optional[datetime]:
+    """Naive UTC datetime, as created_at is stored; a date means its midnight"""
+    if value is None or isinstance(value, datetime):
+        if value is not None and value.tzinfo is not None:
+            value = value.astimezone(timezone.utc).replace(tzinfo=None)
+        return value
+    return datetime.combine(value, time())
+
+
+def export_statement(start: Union[date, datetime, None] = None, end: Union[date, datetime, None] = None,
+                     vector: str = "none"):
+    """
+    Raw column SELECT: rows in id order, or in (created_at, id) order over
+    the created_at index when a date range is given
+    """
+    start, end = as_stored_time(start), as_stored_time(end)
+    columns = [models.Query.id, models.Query.query,
+               type_coerce(models.Query.hexagram_set, Text).label("hexagram_set"), models.Query.created_at]
+    if vector != "none":
+        columns.append(type_coerce(models.Query.query_vector, LargeBinary).label("query_vector"))
+    statement = select(*columns)
+    if start is not None:
+        statement = statement.where(models.Query.created_at >= start)
+    if end is not None:
+        statement = statement.where(models.Query.created_at < end)
+    if start is None and end is None:
+        return statement.order_by(models.Query.id)
+    return statement.order_by(models.Query.created_at, models.Query.id)
+
+
+def _vector_json(blob: bytes, vector: str) -> bytes:
+    if vector == "base64":
+        return b'"' + base64.b64encode(blob) + b'"'
+    return orjson.dumps(np.frombuffer(blob, dtype=_VECTOR_DTYPE).astype(np.float32),
+                        option=orjson.OPT_SERIALIZE_NUMPY)
+
+
+def ndjson_chunk(rows: Sequence, vector: str) -> bytes:
+    """One NDJSON line per row; the stored hexagram JSON is embedded as is"""
+    lines = []
+    for row in rows:
+        line = b'{"id":%d,"query":%s,"hexagram_set":%s,"created_at":"%s"' % (
+            row[0], orjson.dumps(row[1]), row[2].encode(), row[3].isoformat().encode())
+        if vector != "none":
+            line += b',"query_vector":' + _vector_json(row[4], vector)
+        lines.append(line + b"}\n")
+    return b"".join(lines)
+
+
+def csv_chunk(rows: Sequence, vector: str, header: bool = False) -> bytes:
+    """CSV rows; hexagram_set (and a list vector) as JSON text in one column"""
+    out = io.StringIO()
+    writer = csv.writer(out, lineterminator="\n")
+    if header:
+        writer.writerow(CSV_COLUMNS + (("query_vector",) if vector != "none" else ()))
+    for row in rows:
+        values = [row[0], row[1], row[2], row[3].isoformat()]
+        if vector != "none":
+            values.append(base64.b64encode(row[4]).decode() if vector == "base64"
+                          else _vector_json(row[4], vector).decode())
+        writer.writerow(values)
+    return out.getvalue().encode()
+
+
+def export_batches(export_format: str = "ndjson", start: Union[date, datetime, None] = None,
+                   end: Union[date, datetime, None] = None, vector: str = "none",
+                   batch_rows: int = EXPORT_BATCH_ROWS) -> Iterator[Tuple[int, bytes]]:
+    """(row count, NDJSON or CSV chunk) per batch of rows read"""
+    # Its own session: the response body is still being produced after the endpoint returns
+    db = SessionLocal()
+    try:
+        result = db.execute(export_statement(start, end, vector), execution_options={"yield_per": batch_rows})
+        if export_format == "csv":
+            first = True
+            for rows in result.partitions():
+                yield len(rows), csv_chunk(rows, vector, header=first)
+                first = False
+            if first:
+                yield 0, csv_chunk([], vector, header=True)
+        else:
+            for rows in result.partitions():
+                yield len(rows), ndjson_chunk(rows, vector)
+    finally:
+        db.close()
+
+
+def export_queries(export_format: str = "ndjson", start: Union[date, datetime, None] = None,
+                   end: Union[date, datetime, None] = None, vector: str = "none",
+                   batch_rows: int = EXPORT_BATCH_ROWS) -> Iterator[bytes]:
+    """Stream the queries table as NDJSON or CSV chunks, one per batch of rows"""
+    for _, chunk in export_batches(export_format, start, end, vector, batch_rows):
+        yield chunk
@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+"""
+Export the queries table as NDJSON or CSV, streamed in batches (the same
+export as GET /queries/export, without going through the API).
+
+    python3 export_queries.py --format csv --output queries.csv
+    python3 export_queries.py --start 2024-01-01 --end 2024-02-01 --vector base64 > january.ndjson
+"""
+import argparse
+import resource
+import sys
+import time
+from datetime import datetime
+from export import EXPORT_BATCH_ROWS, EXPORT_FORMATS, VECTOR_ENCODINGS, export_batches, vector_encoding_header
+
+def peak_rss_mb():
+    """This process's peak RSS (VmHWM; ru_maxrss would include the parent's at fork)"""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+def export(output, export_format="ndjson", start=None, end=None, vector="none", batch_rows=EXPORT_BATCH_ROWS):
+    """Write the export to a binary file object; returns (rows, bytes, seconds)"""
+    rows = written = 0
+    started = time.perf_counter()
+    for count, chunk in export_batches(export_format, start, end, vector, batch_rows):
+        output.write(chunk)
+        written += len(chunk)
+        rows += count
+    return rows, written, time.perf_counter() - started
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export stored I Ching queries as NDJSON or CSV")
+    parser.add_argument("--format", choices=EXPORT_FORMATS, default="ndjson")
+    parser.add_argument("--start", type=datetime.fromisoformat, help="Only rows created at or after this time")
+    parser.add_argument("--end", type=datetime.fromisoformat, help="Only rows created before this time")
+    parser.add_argument("--vector", choices=VECTOR_ENCODINGS, default="none",
+                        help="Include query vectors: base64 of the stored bytes, or a JSON list")
+    parser.add_argument("--batch-rows", type=int, default=EXPORT_BATCH_ROWS)
+    parser.add_argument("--output", help="File to write (default: stdout)")
+    args = parser.parse_args()
+
+    output = open(args.output, "wb") if args.output else sys.stdout.buffer
+    try:
+        rows, written, seconds = export(output, args.format, args.start, args.end, args.vector, args.batch_rows)
+    finally:
+        if args.output:
+            output.close()
+    print(f"Exported {rows} rows ({written / 1e6:.1f} MB, vectors: {vector_encoding_header(args.vector)}) "
+          f"in {seconds:.1f}s, {rows / seconds if seconds else 0:.0f} rows/s, peak RSS {peak_rss_mb():.0f} MB",
+          file=sys.stderr)
@@ -0,0 +1,158 @@
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Callable, List, Optional, Tuple
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import StaticPool
+import models
+from hexagram_stats import record_queries
+
+# Optional group commit for POST /queries/ (QUERY_WRITE_MODE=group): rows from
+# concurrent requests are queued and written by one thread, many rows per
+# transaction. A batch is closed after GROUP_COMMIT_ROWS rows or
+# GROUP_COMMIT_MS milliseconds after its first row, whichever comes first
+# (0 ms, the default: write whatever is queued, without waiting for more).
+#
+# GROUP_COMMIT_DURABILITY says when a request gets its response:
+#   "commit" - after the COMMIT of its batch. Nothing acknowledged is lost.
+#   "flush"  - as soon as its row is INSERTed (id and created_at assigned),
+#              before the batch commits. A crash or failed commit loses the
+#              rows acknowledged in that batch, at most GROUP_COMMIT_ROWS
+#              rows or GROUP_COMMIT_MS of writes. Needs a pooled engine:
+#              the batch's transaction stays open between flushes, and on a
+#              StaticPool (local SQLite) every session shares that connection.
+QUERY_WRITE_MODE = os.getenv("QUERY_WRITE_MODE", "immediate")  # "immediate" or "group"
+GROUP_COMMIT_ROWS = int(os.getenv("GROUP_COMMIT_ROWS", "64"))
+GROUP_COMMIT_MS = float(os.getenv("GROUP_COMMIT_MS", "0"))
+GROUP_COMMIT_DURABILITY = os.getenv("GROUP_COMMIT_DURABILITY", "commit")
+DURABILITY_MODES = ("commit", "flush")
+
+_STOP = object()
+
+PendingRow = Tuple[models.Query, Future]
+
+
+class GroupCommitWriter:
+    """
+    Background writer batching ``models.Query`` inserts into shared transactions.
+
+    ``submit`` returns a Future resolved with the inserted row (``id`` and
+    ``created_at`` set) according to the durability mode. ``on_commit`` is
+    called with each committed batch of rows, e.g. to index them.
+    """
+
+    def __init__(self, session_factory: Callable[..., Session], max_rows: int = GROUP_COMMIT_ROWS,
+                 max_delay_ms: float = GROUP_COMMIT_MS, durability: str = GROUP_COMMIT_DURABILITY,
+                 on_commit: Optional[Callable[[List[models.Query]], None]] = None):
+        if durability not in DURABILITY_MODES:
+            raise ValueError(f"GROUP_COMMIT_DURABILITY must be one of {', '.join(DURABILITY_MODES)}")
+        bind = getattr(session_factory, "kw", {}).get("bind")
+        if durability == "flush" and isinstance(getattr(bind, "pool", None), StaticPool):
+            raise ValueError("GROUP_COMMIT_DURABILITY=flush needs a pooled engine, not a StaticPool: "
+                             "other sessions would read and commit the batch's open transaction")
+        self.session_factory = session_factory
+        self.max_rows = max(1, max_rows)
+        self.max_delay = max(0.0, max_delay_ms) / 1000
+        self.durability = durability
+        self.on_commit = on_commit
+        self.batches = 0
+        self.rows = 0
+        self._queue: "queue.Queue" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="group-commit", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        """Write everything queued so far, then stop the writer thread"""
+        if self._thread is not None:
+            self._queue.put(_STOP)
+            self._thread.join()
+            self._thread = None
+
+    def submit(self, row: models.Query) -> Future:
+        future: Future = Future()
+        self._queue.put((row, future))
+        return future
+
+    def stats(self) -> dict:
+        return {
+            "batches": self.batches,
+            "rows": self.rows,
+            "rows_per_batch": self.rows / self.batches if self.batches else 0.0,
+        }
+
+    def _take(self, limit: int, timeout: Optional[float]) -> Tuple[List[PendingRow], bool]:
+        """Up to ``limit`` queued rows, waiting at most ``timeout`` for the first; (rows, stop seen)"""
+        rows: List[PendingRow] = []
+        try:
+            item = self._queue.get(timeout=timeout) if timeout and timeout > 0 else self._queue.get_nowait()
+            while True:
+                if item is _STOP:
+                    return rows, True
+                rows.append(item)
+                if len(rows) >= limit:
+                    return rows, False
+                item = self._queue.get_nowait()
+        except queue.Empty:
+            return rows, False
+
+    def _insert(self, db: Session, pending: List[PendingRow]):
+        # One clock reading per chunk stands in for the created_at default
+        created_at = models.utc_now()
+        for row, _ in pending:
+            row.created_at = created_at
+        db.add_all([row for row, _ in pending])
+        db.flush()
+        record_queries(db, [row for row, _ in pending])
+
+    def _run(self):
+        stopping = False
+        while not stopping:
+            first = self._queue.get()
+            if first is _STOP:
+                break
+            batch = [first]
+            deadline = time.monotonic() + self.max_delay
+            db = self.session_factory(expire_on_commit=False)
+            acknowledged = 0
+            try:
+                while True:
+                    if self.durability == "flush" and acknowledged < len(batch):
+                        self._insert(db, batch[acknowledged:])
+                        for row, future in batch[acknowledged:]:
+                            future.set_result(row)
+                        acknowledged = len(batch)
+                    if stopping or len(batch) >= self.max_rows:
+                        break
+                    more, stopping = self._take(self.max_rows - len(batch), deadline - time.monotonic())
+                    if not more and not stopping:
+                        break
+                    batch.extend(more)
+
+                if self.durability == "commit":
+                    self._insert(db, batch)
+                db.commit()
+            except Exception as e:
+                db.rollback()
+                print(f"Group commit of {len(batch)} rows failed: {e!r}")
+                for _, future in batch[acknowledged:]:
+                    future.set_exception(e)
+                continue
+            finally:
+                db.close()
+
+            self.batches += 1
+            self.rows += len(batch)
+            if self.durability == "commit":
+                for row, future in batch:
+                    future.set_result(row)
+            if self.on_commit is not None:
+                try:
+                    self.on_commit([row for row, _ in batch])
+                except Exception as e:
+                    print(f"Group commit callback failed: {e!r}")
@@ -0,0 +1,196 @@
+import os
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+from sqlalchemy import bindparam, delete, func, inspect, select, text, update
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.attributes import set_committed_value
+from sqlalchemy.sql.elements import TextClause
+import models
+from services.iching_embeddings import HEXAGRAMS
+
+# Hexagram frequencies per day, week (starting Monday) and month, kept in the
+# hexagram_stats table: for each bucket and hexagram, how often it was the
+# top hexagram of a query, how often it was among the six, and the sum of its
+# scores. Every insert path adds its rows' counts in the same transaction, so
+# GET /hexagrams/stats reads at most 64 rows per bucket whatever the size of
+# the queries table. Buckets follow created_at, set in UTC by models.utc_now.
+PERIODS = ("day", "week", "month")
+COUNT_COLUMNS = ("top1_count", "top6_count", "score_sum")
+# Buckets shown when GET /hexagrams/stats gets no start
+DEFAULT_STATS_BUCKETS = int(os.getenv("HEXAGRAM_STATS_DEFAULT_BUCKETS", "30"))
+CREATED_AT_BATCH = 500
+
+StatKey = Tuple[str, date, int]
+
+
+def bucket_start(period: str, moment) -> date:
+    """First day of the ``period`` bucket containing ``moment`` (a date or datetime)"""
+    day = moment.date() if isinstance(moment, datetime) else moment
+    if period == "day":
+        return day
+    if period == "week":
+        return day - timedelta(days=day.weekday())
+    return day.replace(day=1)
+
+
+def shift_bucket(period: str, start: date, buckets: int) -> date:
+    """The bucket ``buckets`` periods after (or before, if negative) the one starting at ``start``"""
+    if period == "day":
+        return start + timedelta(days=buckets)
+    if period == "week":
+        return start + timedelta(weeks=buckets)
+    months = start.year * 12 + start.month - 1 + buckets
+    return date(months // 12, months % 12 + 1, 1)
+
+
+def stat_increments(rows: Iterable[Tuple[datetime, Optional[List[Dict]]]]) -> Dict[StatKey, List[float]]:
+    """[top1, top6, score sum] per (period, bucket, hexagram) for (created_at, hexagram_set) rows"""
+    increments: Dict[StatKey, List[float]] = defaultdict(lambda: [0, 0, 0.0])
+    for created_at, hexagram_set in rows:
+        if not hexagram_set:
+            continue
+        buckets = [(period, bucket_start(period, created_at)) for period in PERIODS]
+        for rank, entry in enumerate(hexagram_set[:6]):
+            hexagram_id, score = int(entry["hexagram_id"]), float(entry["score"])
+            for period, start in buckets:
+                counts = increments[(period, start, hexagram_id)]
+                counts[0] += rank == 0
+                counts[1] += 1
+                counts[2] += score
+    return increments
+
+
+@lru_cache(maxsize=None)
+def _upsert_statement(dialect: str) -> Optional[TextClause]:
+    """
+    Adding upsert for one stats row, or None where there is none. Written as
+    text: SQLAlchemy 2.0 cannot cache the dialect ON CONFLICT / ON DUPLICATE
+    KEY constructs, which then cost a compile per insert.
+    """
+    table = models.HexagramStat.__table__
+    columns = ", ".join(column.name for column in table.c)
+    values = ", ".join(f":{column.name}" for column in table.c)
+    if dialect in ("sqlite", "postgresql"):
+        updates = ", ".join(f"{column} = {table.name}.{column} + excluded.{column}" for column in COUNT_COLUMNS)
+        conflict = f"ON CONFLICT (period, bucket_start, hexagram_id) DO UPDATE SET {updates}"
+    elif dialect in ("mysql", "mariadb"):
+        updates = ", ".join(f"{column} = {column} + VALUES({column})" for column in COUNT_COLUMNS)
+        conflict = f"ON DUPLICATE KEY UPDATE {updates}"
+    else:
+        return None
+    return text(f"INSERT INTO {table.name} ({columns}) VALUES ({values}) {conflict}").bindparams(
+        *(bindparam(column.name, type_=column.type) for column in table.c))
+
+
+def apply_increments(db: Session, increments: Dict[StatKey, List[float]]):
+    """Add the increments to hexagram_stats (one upsert per key, in key order so writers lock alike)"""
+    if not increments:
+        return
+    values = [
+        {"period": period, "bucket_start": start, "hexagram_id": hexagram_id,
+         "top1_count": counts[0], "top6_count": counts[1], "score_sum": counts[2]}
+        for (period, start, hexagram_id), counts in sorted(increments.items())
+    ]
+    upsert = _upsert_statement(db.get_bind().dialect.name)
+    if upsert is not None:
+        db.execute(upsert, values)
+        return
+    table = models.HexagramStat.__table__
+    for row in values:
+        key = (table.c.period == row["period"]) & (table.c.bucket_start == row["bucket_start"]) \
+            & (table.c.hexagram_id == row["hexagram_id"])
+        changed = db.execute(update(table).where(key).values(
+            {column: table.c[column] + row[column] for column in COUNT_COLUMNS})).rowcount
+        if not changed:
+            db.execute(table.insert().values(row))
+
+
+def record_queries(db: Session, rows: Sequence[models.Query]):
+    """
+    Count flushed, not yet committed rows into hexagram_stats. created_at of
+    rows that got it from the server default is read back with one SELECT per 500 rows.
+    """
+    pending = [row for row in rows if "created_at" in inspect(row).unloaded]
+    for start in range(0, len(pending), CREATED_AT_BATCH):
+        chunk = {row.id: row for row in pending[start:start + CREATED_AT_BATCH]}
+        for query_id, created_at in db.execute(
+            select(models.Query.id, models.Query.created_at).where(models.Query.id.in_(list(chunk)))
+        ):
+            set_committed_value(chunk[query_id], "created_at", created_at)
+    apply_increments(db, stat_increments((row.created_at, row.hexagram_set) for row in rows))
+
+
+def rebuild(db: Session, batch_rows: int = 10000) -> int:
+    """
+    Recompute hexagram_stats from the whole queries table in one transaction;
+    returns the number of rows counted. The table is emptied first, so
+    inserts committed meanwhile wait for the rebuild and then add their own counts.
+    """
+    db.execute(delete(models.HexagramStat))
+    rows = db.execute(select(models.Query.created_at, models.Query.hexagram_set),
+                      execution_options={"yield_per": batch_rows})
+    increments: Dict[StatKey, List[float]] = {}
+    counted = 0
+    for partition in rows.partitions():
+        for key, counts in stat_increments(partition).items():
+            total = increments.setdefault(key, [0, 0, 0.0])
+            total[0] += counts[0]
+            total[1] += counts[1]
+            total[2] += counts[2]
+        counted += len(partition)
+    apply_increments(db, increments)
+    db.commit()
+    return counted
+
+
+def read_stats(db: Session, period: str, start: Optional[date] = None, end: Optional[date] = None,
+               hexagram_id: Optional[int] = None, series: bool = False) -> Dict:
+    """
+    Hexagram counts over the buckets from the one containing ``start`` up to
+    (not including) ``end``; the last DEFAULT_STATS_BUCKETS buckets by default.
+    Totals per hexagram, or per bucket as well with ``series``.
+    """
+    end = end or shift_bucket(period, bucket_start(period, models.utc_now()), 1)
+    first = bucket_start(period, start) if start else shift_bucket(period, bucket_start(period, end),
+                                                                   -DEFAULT_STATS_BUCKETS)
+    stat = models.HexagramStat
+    conditions = [stat.period == period, stat.bucket_start >= first, stat.bucket_start < end]
+    if hexagram_id is not None:
+        conditions.append(stat.hexagram_id == hexagram_id)
+
+    report = {"period": period, "start": first, "end": end}
+    if series:
+        statement = (select(stat.bucket_start, stat.hexagram_id, stat.top1_count, stat.top6_count, stat.score_sum)
+                     .where(*conditions).order_by(stat.bucket_start))
+        buckets: Dict[date, List] = defaultdict(list)
+        for bucket, *counts in db.execute(statement):
+            buckets[bucket].append(counts)
+        report["buckets"] = [{"bucket_start": bucket, "hexagrams": _hexagram_entries(rows)}
+                             for bucket, rows in buckets.items()]
+    else:
+        statement = (select(stat.hexagram_id, func.sum(stat.top1_count), func.sum(stat.top6_count),
+                            func.sum(stat.score_sum))
+                     .where(*conditions).group_by(stat.hexagram_id))
+        report["hexagrams"] = _hexagram_entries(db.execute(statement))
+    return report
+
+
+def _hexagram_entries(rows) -> List[Dict]:
+    """Stats rows as response entries, most frequent top hexagram first"""
+    names = {hexagram[0]: hexagram for hexagram in HEXAGRAMS}
+    entries = [
+        {
+            "hexagram_id": hexagram_id,
+            "hexagram_name": names[hexagram_id][1] if hexagram_id in names else None,
+            "hexagram_unicode": names[hexagram_id][3] if hexagram_id in names else None,
+            "top1_count": int(top1),
+            "top6_count": int(top6),
+            "score_sum": float(score_sum),
+            "mean_score": float(score_sum) / top6 if top6 else 0.0,
+        }
+        for hexagram_id, top1, top6, score_sum in rows
+    ]
+    entries.sort(key=lambda entry: (-entry["top1_count"], -entry["top6_count"], entry["hexagram_id"]))
+    return entries
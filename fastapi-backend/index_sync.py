@@ -0,0 +1,79 @@
+import os
+import threading
+import time
+from typing import List, Sequence
+import models
+from database import SessionLocal
+
+# With several worker processes each one holds its own query index, and only
+# its own inserts are added to it directly. Before a similar search a worker
+# pulls the rows other workers have committed since its last catch-up, at
+# most once every QUERY_INDEX_SYNC_SECONDS (0 disables it: one process).
+QUERY_INDEX_SYNC_SECONDS = float(os.getenv("QUERY_INDEX_SYNC_SECONDS", "0"))
+
+
+class IndexSync:
+    """
+    Catches a per-process query index up with rows inserted elsewhere.
+
+    ``synced_id`` is the highest id read from the database; ids this process
+    indexed itself (through ``add``) above it are remembered so they are not
+    added twice. Rows are found by ``id > synced_id``, so a row committed after a higher id
+    was already synced (possible with concurrent MySQL writers) is only
+    picked up at the next restart.
+    """
+
+    def __init__(self, interval_seconds: float = QUERY_INDEX_SYNC_SECONDS):
+        self.interval = interval_seconds
+        self.synced_id = 0
+        self.last_sync = 0.0
+        self._local_ids = set()
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.interval > 0
+
+    def reset(self, synced_id: int):
+        """Everything up to ``synced_id`` is in the index (after a full load)"""
+        with self._lock:
+            self.synced_id = synced_id
+            self._local_ids = set()
+            self.last_sync = time.monotonic()
+
+    def add(self, index, ids: List[int], vectors: Sequence, hexagram_sets: Sequence):
+        """Add rows this process inserted to ``index``, skipping any a catch-up already added"""
+        if not self.enabled:
+            index.add_many(ids, vectors, hexagram_sets)
+            return
+        with self._lock:
+            keep = [i for i, query_id in enumerate(ids) if query_id > self.synced_id]
+            if keep:
+                index.add_many([ids[i] for i in keep], [vectors[i] for i in keep], [hexagram_sets[i] for i in keep])
+                self._local_ids.update(ids[i] for i in keep)
+
+    def catch_up(self, index) -> int:
+        """Add rows committed by other processes to ``index``; returns how many were added"""
+        if not self.enabled or time.monotonic() - self.last_sync < self.interval:
+            return 0
+        if not self._lock.acquire(blocking=False):
+            return 0  # another request is already catching up
+        try:
+            db = SessionLocal()
+            try:
+                rows = (db.query(models.Query.id, models.Query.query_vector, models.Query.hexagram_set)
+                        .filter(models.Query.id > self.synced_id)
+                        .order_by(models.Query.id)
+                        .all())
+            finally:
+                db.close()
+            new_rows = [row for row in rows if row[0] not in self._local_ids]
+            if new_rows:
+                index.load(new_rows)
+            if rows:
+                self.synced_id = rows[-1][0]
+                self._local_ids = {i for i in self._local_ids if i > self.synced_id}
+            self.last_sync = time.monotonic()
+            return len(new_rows)
+        finally:
+            self._lock.release()
@@ -9,6 +9,7 @@ import os
 class ICHingClient:
     def __init__(self, base_url="http://localhost:8000"):
         self.base_url = base_url
+        self.history_cursor = None
         self.check_connection()
     
     def check_connection(self):
@@ -29,7 +30,8 @@ class ICHingClient:
         try:
             response = requests.post(
                 f"{self.base_url}/queries/",
-                json={"query": query_text}
+                json={"query": query_text},
+                params={"include_vector": "false"}
             )
             if response.ok:
                 return response.json()
@@ -40,21 +42,27 @@ class ICHingClient:
             print(f"Error submitting query: {e}")
             return None
     
-    def get_all_queries(self, limit: int = 10) -> List[Dict]:
-        """Get recent queries"""
+    def get_all_queries(self, limit: int = 10, cursor: Optional[str] = None) -> List[Dict]:
+        """Get recent queries, newest first, following the API's page cursor"""
+        queries = []
         try:
-            response = requests.get(
-                f"{self.base_url}/queries/",
-                params={"limit": limit}
-            )
-            if response.ok:
-                return response.json()
-            else:
-                print(f"Error fetching queries: {response.status_code}")
-                return []
+            while len(queries) < limit:
+                params = {"limit": min(limit - len(queries), 100), "order": "desc", "include_vector": "false"}
+                if cursor:
+                    params["cursor"] = cursor
+                response = requests.get(f"{self.base_url}/queries/", params=params)
+                if not response.ok:
+                    print(f"Error fetching queries: {response.status_code}")
+                    break
+                queries.extend(response.json())
+                cursor = response.headers.get("X-Next-Cursor")
+                if not cursor:
+                    break
         except Exception as e:
             print(f"Error: {e}")
-            return []
+        # Remembered so "history more" continues where this page ended
+        self.history_cursor = cursor
+        return queries
     
     def find_similar(self, query_text: str, limit: int = 5) -> List[Dict]:
         """Find similar queries"""
@@ -153,11 +161,13 @@ def main():
     print("  ask <question>  - Ask the I Ching a question")
     print("  find <query>    - Find similar previous queries")
     print("  history [n]     - Show last n queries (default: 10)")
+    print("  history more    - Show the n queries before those")
     print("  hexagrams       - List all 64 hexagrams")
     print("  help            - Show this help message")
     print("  quit/exit       - Exit the program")
     print("═" * 60)
     
+    history_limit = 10
     while True:
         try:
             user_input = input("\n> ").strip()
@@ -177,6 +187,7 @@ def main():
                 print("  ask <question>  - Ask the I Ching a question")
                 print("  find <query>    - Find similar previous queries")
                 print("  history [n]     - Show last n queries (default: 10)")
+                print("  history more    - Show the n queries before those")
                 print("  hexagrams       - List all 64 hexagrams")
                 print("  help            - Show this help message")
                 print("  quit/exit       - Exit the program")
@@ -207,12 +218,19 @@ def main():
                 client.display_similar_queries(results)
             
             elif command == 'history':
-                limit = 10
-                if len(parts) > 1 and parts[1].isdigit():
-                    limit = int(parts[1])
-                
-                print(f"\nFetching last {limit} queries...")
-                queries = client.get_all_queries(limit=limit)
+                if len(parts) > 1 and parts[1].lower() == 'more':
+                    if not client.history_cursor:
+                        print("No more queries.")
+                        continue
+                    print(f"\nFetching {history_limit} earlier queries...")
+                    queries = client.get_all_queries(limit=history_limit, cursor=client.history_cursor)
+                else:
+                    history_limit = 10
+                    if len(parts) > 1 and parts[1].isdigit():
+                        history_limit = int(parts[1])
+                    
+                    print(f"\nFetching last {history_limit} queries...")
+                    queries = client.get_all_queries(limit=history_limit)
                 
                 if queries:
                     print(f"\nRecent Queries ({len(queries)} results):")
@@ -0,0 +1,220 @@
+#!/usr/bin/env python3
+"""
+Concurrent load generator for the query API.
+
+Replays a weighted mix of POST /queries/, GET /queries/, similar search
+and GET /hexagrams/ with an async httpx client, either closed-loop
+(``--concurrency`` clients back to back) or open-loop (``--rate`` requests
+per second; latency counts from each request's scheduled start, so a
+server falling behind shows up as queueing rather than a lower rate).
+Prints throughput and p50/p95/p99/max latency per route as JSON.
+
+Without ``--url`` the app is run in-process (httpx ASGI transport, no
+network) against a temp SQLite database of ``--rows`` synthetic queries
+and a synthetic GloVe file:
+
+    python3 load_test.py --concurrency 16 --duration 30
+    python3 load_test.py --rate 200 --mix create=1,list=4,similar=2,hexagrams=1
+    python3 load_test.py --url http://localhost:8000 --concurrency 32
+"""
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+import tempfile
+import time
+from typing import Dict, List
+
+import httpx
+import numpy as np
+
+# Route name -> (method, path)
+ROUTES = {
+    "create": ("POST", "/queries/"),
+    "list": ("GET", "/queries/"),
+    "similar": ("GET", "/queries/search/similar"),
+    "hexagrams": ("GET", "/hexagrams/"),
+}
+DEFAULT_MIX = "create=1,list=3,similar=2,hexagrams=1"
+
+QUESTIONS = [
+    "What path should I take in my career?",
+    "How can I find balance in my life?",
+    "I seek wisdom about conflict and peace in my life",
+    "How can I find inner peace?",
+    "Should I wait or act now?",
+    "What should I focus on today?",
+    "Is this the right time to start a business?",
+    "How do I find the courage to begin again?",
+]
+
+def parse_mix(text: str) -> Dict[str, float]:
+    """``create=1,list=3`` -> normalized route weights"""
+    weights = {}
+    for part in text.split(","):
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in ROUTES:
+            raise argparse.ArgumentTypeError(f"unknown route {name!r}, expected one of {', '.join(ROUTES)}")
+        weights[name] = float(weight or 1)
+    total = sum(weights.values())
+    if total <= 0:
+        raise argparse.ArgumentTypeError("route weights must add up to more than 0")
+    return {name: weight / total for name, weight in weights.items()}
+
+def build_request(route: str, rng: np.random.Generator):
+    method, path = ROUTES[route]
+    question = QUESTIONS[rng.integers(len(QUESTIONS))]
+    if route == "create":
+        return method, path, {"json": {"query": question}}
+    if route == "list":
+        return method, path, {"params": {"limit": 20, "order": "desc"}}
+    if route == "similar":
+        return method, path, {"params": {"query": question, "limit": 10}}
+    return method, path, {}
+
+class Recorder:
+    def __init__(self, routes):
+        self.latencies: Dict[str, List[float]] = {route: [] for route in routes}
+        self.errors: Dict[str, int] = {route: 0 for route in routes}
+
+    async def send(self, client: httpx.AsyncClient, route: str, rng: np.random.Generator, start: float = None):
+        method, path, kwargs = build_request(route, rng)
+        start = start if start is not None else time.perf_counter()
+        try:
+            response = await client.request(method, path, **kwargs)
+            failed = response.status_code >= 400
+        except httpx.HTTPError:
+            failed = True
+        self.latencies[route].append(time.perf_counter() - start)
+        if failed:
+            self.errors[route] += 1
+
+    def summary(self, elapsed: float) -> Dict:
+        routes = {}
+        for route, times in self.latencies.items():
+            if not times:
+                continue
+            ms = 1000 * np.array(times)
+            routes[route] = {
+                "requests": len(times),
+                "errors": self.errors[route],
+                "requests_per_second": len(times) / elapsed,
+                "p50_ms": float(np.percentile(ms, 50)),
+                "p95_ms": float(np.percentile(ms, 95)),
+                "p99_ms": float(np.percentile(ms, 99)),
+                "max_ms": float(ms.max()),
+            }
+        total = sum(len(times) for times in self.latencies.values())
+        return {
+            "elapsed_seconds": elapsed,
+            "requests": total,
+            "errors": sum(self.errors.values()),
+            "requests_per_second": total / elapsed if elapsed else 0.0,
+            "routes": routes,
+        }
+
+async def closed_loop(client, recorder, mix, concurrency, duration, seed):
+    routes, weights = list(mix), list(mix.values())
+    deadline = time.perf_counter() + duration
+
+    async def user(rng):
+        while time.perf_counter() < deadline:
+            await recorder.send(client, routes[rng.choice(len(routes), p=weights)], rng)
+
+    await asyncio.gather(*(user(np.random.default_rng(seed + i)) for i in range(concurrency)))
+
+async def open_loop(client, recorder, mix, rate, duration, seed):
+    routes, weights = list(mix), list(mix.values())
+    rng = np.random.default_rng(seed)
+    pending = set()
+    start = time.perf_counter()
+    for i in range(int(rate * duration)):
+        scheduled = start + i / rate
+        delay = scheduled - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        task = asyncio.create_task(recorder.send(client, routes[rng.choice(len(routes), p=weights)], rng, scheduled))
+        pending.add(task)
+        task.add_done_callback(pending.discard)
+    if pending:
+        await asyncio.gather(*pending)
+
+async def run_load(client: httpx.AsyncClient, mix: Dict[str, float], concurrency: int = 8, rate: float = None,
+                   duration: float = 10, seed: int = 0) -> Dict:
+    """Drive ``client`` with the route mix; returns the summary"""
+    recorder = Recorder(mix)
+    start = time.perf_counter()
+    if rate:
+        await open_loop(client, recorder, mix, rate, duration, seed)
+    else:
+        await closed_loop(client, recorder, mix, concurrency, duration, seed)
+    return recorder.summary(time.perf_counter() - start)
+
+def prepare_in_process(rows: int, vocab_size: int, workdir: str):
+    """Point the app at a temp SQLite database and synthetic GloVe file, before it is imported"""
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(workdir, 'load.db')}"
+    os.environ["ANN_INDEX_DIR"] = os.path.join(workdir, "ann_index")
+    os.environ["EMBEDDING_WARMUP"] = "blocking"
+    from benchmarks.queries import query_words
+    from benchmarks.synthetic import populate_queries, write_synthetic_glove
+    from services.iching_embeddings import HEXAGRAMS
+    words = query_words() + [word.strip("?,.").lower() for question in QUESTIONS for word in question.split()]
+    os.environ["GLOVE_PATH"] = write_synthetic_glove(
+        os.path.join(workdir, "glove.txt"), vocab_size=vocab_size,
+        extra_words=list(dict.fromkeys(words + [h[2].lower() for h in HEXAGRAMS])))
+
+    import models
+    from database import Base, SessionLocal, engine
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        populate_queries(db, rows)
+    finally:
+        db.close()
+
+async def main_async(args):
+    mix = args.mix
+    limits = httpx.Limits(max_connections=max(args.concurrency, 100))
+    if args.url:
+        async with httpx.AsyncClient(base_url=args.url, limits=limits, timeout=args.timeout) as client:
+            return await run_load(client, mix, args.concurrency, args.rate, args.duration, args.seed)
+
+    import importlib
+    app = importlib.import_module(args.app).app
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://load-test", timeout=args.timeout) as client:
+            return await run_load(client, mix, args.concurrency, args.rate, args.duration, args.seed)
+
+def main():
+    parser = argparse.ArgumentParser(description="Concurrent load generator for the I Ching query API")
+    parser.add_argument("--url", help="Server to load; without it the app runs in-process")
+    parser.add_argument("--app", choices=("main", "async_main"), default="main", help="In-process app")
+    parser.add_argument("--mix", type=parse_mix, default=parse_mix(DEFAULT_MIX),
+                        help=f"Route weights (default {DEFAULT_MIX})")
+    parser.add_argument("--concurrency", type=int, default=8, help="Closed-loop clients")
+    parser.add_argument("--rate", type=float, help="Open-loop requests per second (overrides --concurrency)")
+    parser.add_argument("--duration", type=float, default=10)
+    parser.add_argument("--timeout", type=float, default=30)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--rows", type=int, default=10000, help="Synthetic queries for the in-process database")
+    parser.add_argument("--vocab-size", type=int, default=50000, help="Synthetic GloVe words (in-process)")
+    args = parser.parse_args()
+
+    with contextlib.ExitStack() as stack:
+        if not args.url:
+            # Synthetic GloVe file, embedding store and database, removed after the run
+            workdir = stack.enter_context(tempfile.TemporaryDirectory(prefix="load-test-"))
+            prepare_in_process(args.rows, args.vocab_size, workdir)
+        report = asyncio.run(main_async(args))
+    report.update({
+        "target": args.url or f"in-process {args.app}:app",
+        "mode": f"rate {args.rate}/s" if args.rate else f"concurrency {args.concurrency}",
+        "mix": args.mix,
+    })
+    print(json.dumps(report, indent=2))
+
+if __name__ == "__main__":
+    main()
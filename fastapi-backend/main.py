@@ -1,22 +1,128 @@
-from fastapi import FastAPI, HTTPException, Depends, status
+from fastapi import FastAPI, HTTPException, Depends, Query, Request, status
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
 from sqlalchemy.orm import Session
-from typing import List
+from contextlib import asynccontextmanager
+from datetime import date, datetime
+from typing import List, Optional, Tuple, Union
+import math
+import os
 import models
 import schemas
-from database import Base, engine, get_db
-from services.iching_embeddings import ICHingEmbeddingService
-import numpy as np
+from database import Base, SessionLocal, engine, get_db
+from export import MEDIA_TYPES, export_queries, vector_encoding_header
+from group_commit import QUERY_WRITE_MODE, GroupCommitWriter
+from hexagram_stats import read_stats, record_queries
+from index_sync import IndexSync
+from ndjson_import import NDJSONStreamingResponse, stream_import
+from pagination import InvalidCursor, get_queries_page
+from profiling import ProfiledRoute, profiler, require_profile_access
+from responses import FastJSONResponse, load_projection, project_query, query_page_response, query_projection
+from services.iching_embeddings import HEXAGRAMS, ICHingEmbeddingService
+from services.ivf_index import IVFIndex
+from services.metrics import metrics
+from services.vector_index import QueryVectorIndex
+from services.warmup import EmbeddingWarmup
 
 # Create database tables
 Base.metadata.create_all(bind=engine)
 
+# Embedding service configuration
+GLOVE_PATH = os.getenv("GLOVE_PATH", "./glove/glove.6B.300d.txt")
+EMBEDDING_WARMUP = os.getenv("EMBEDDING_WARMUP", "background")  # "background" or "blocking"
+RETRY_AFTER_SECONDS = int(os.getenv("EMBEDDING_RETRY_AFTER", "5"))
+# Failed model loads are retried this many times, after 2 s, 4 s, ... (at most 60 s)
+EMBEDDING_WARMUP_RETRIES = int(os.getenv("EMBEDDING_WARMUP_RETRIES", "3"))
+EMBEDDING_WARMUP_RETRY_SECONDS = float(os.getenv("EMBEDDING_WARMUP_RETRY_SECONDS", "2"))
+
+# Approximate similar-query search: used when build_ann_index.py has written an index here
+ANN_INDEX_DIR = os.getenv("ANN_INDEX_DIR", "./ann_index")
+ANN_NPROBE = int(os.getenv("ANN_NPROBE", "8"))
+
+# In-memory matrix of stored query vectors for /queries/search/similar
+# (replaced by an IVFIndex at startup when one has been built)
+query_index = QueryVectorIndex()
+
+# Pulls rows inserted by other worker processes into query_index (QUERY_INDEX_SYNC_SECONDS)
+index_sync = IndexSync()
+
+def load_models(progress):
+    """Build the embedding service, then load every stored query vector into the index"""
+    global query_index
+    service = ICHingEmbeddingService(GLOVE_PATH, progress=progress)
+    progress("loading_query_index")
+    last_indexed_id = 0
+    if IVFIndex.exists(ANN_INDEX_DIR):
+        query_index = IVFIndex.load_files(ANN_INDEX_DIR, nprobe=ANN_NPROBE)
+        last_indexed_id = query_index.max_id
+        print(f"ANN index loaded from {ANN_INDEX_DIR}: {query_index.n_lists} lists, {len(query_index)} vectors")
+    else:
+        query_index = QueryVectorIndex(vector_dim=service.vector_dim)
+    db = SessionLocal()
+    try:
+        # Rows inserted after the offline build are added to their nearest lists
+        rows = (db.query(models.Query.id, models.Query.query_vector, models.Query.hexagram_set)
+                .filter(models.Query.id > last_indexed_id)
+                .order_by(models.Query.id))
+        query_index.load(rows.yield_per(10000))
+    finally:
+        db.close()
+    index_sync.reset(query_index.max_id)
+    print(f"Query index loaded: {len(query_index)} vectors")
+    return service
+
+def index_queries(ids: List[int], vectors: list, hexagram_sets: list):
+    """Add rows this process has just committed to the similar-search index"""
+    index_sync.add(query_index, ids, vectors, hexagram_sets)
+
+def index_rows(rows: List[models.Query]):
+    index_queries([row.id for row in rows], [row.query_vector for row in rows], [row.hexagram_set for row in rows])
+
+# The embedding service loads in the background so the port binds immediately
+embedding_warmup = EmbeddingWarmup(load_models, retries=EMBEDDING_WARMUP_RETRIES,
+                                   retry_delay=EMBEDDING_WARMUP_RETRY_SECONDS)
+
+# Memory gauges for GET /metrics, read at scrape time (absent until the model is loaded)
+def service_gauge(read):
+    return lambda: read(embedding_warmup.service) if embedding_warmup.service is not None else None
+
+metrics.gauge("embedding_vocab_size", "Words in the embedding vocabulary",
+              service_gauge(lambda service: len(service.glove_embeddings)))
+metrics.gauge("embedding_bytes", "Bytes of the embedding matrix (memory-mapped)",
+              service_gauge(lambda service: service.glove_embeddings.nbytes))
+metrics.gauge("subword_table_bytes", "Bytes of the OOV subword bucket table",
+              service_gauge(lambda service: service.subword_table.table.nbytes))
+metrics.gauge("query_cache_bytes", "Estimated bytes held by the process_query cache",
+              service_gauge(lambda service: service.query_cache.bytes))
+metrics.gauge("query_index_vectors", "Vectors in the similar-search index", lambda: len(query_index))
+metrics.gauge("query_index_bytes", "Bytes of the similar-search index", lambda: query_index.nbytes)
+
+# QUERY_WRITE_MODE=group: POST /queries/ rows are written by one thread in shared transactions
+query_writer = GroupCommitWriter(SessionLocal, on_commit=index_rows) if QUERY_WRITE_MODE == "group" else None
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # serve.py loads the model once before forking its workers
+    if not embedding_warmup.ready:
+        if EMBEDDING_WARMUP == "blocking":
+            embedding_warmup.run()
+        else:
+            embedding_warmup.start()
+    if query_writer is not None:
+        query_writer.start()
+    yield
+    if query_writer is not None:
+        query_writer.stop()
+
 # Create FastAPI instance
 app = FastAPI(
     title="I Ching Query API",
     description="API for I Ching query processing with hexagram analysis",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
+# Handlers can be profiled per request (PROFILING_ENABLED)
+app.router.route_class = ProfiledRoute
 
 # Configure CORS
 app.add_middleware(
@@ -27,16 +133,53 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Initialize embedding service
-embedding_service = ICHingEmbeddingService()
+def retry_after() -> str:
+    """Retry-After while warming up: no sooner than the next load attempt"""
+    return str(max(RETRY_AFTER_SECONDS, math.ceil(embedding_warmup.retry_in() or 0)))
+
+def get_embedding_service() -> ICHingEmbeddingService:
+    """Dependency: the loaded embedding service; 503 while it is warming up, 500 once loading has failed"""
+    service = embedding_warmup.service
+    if service is None:
+        if embedding_warmup.failed:
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail=f"Embedding model failed to load: {embedding_warmup.snapshot().get('error')}",
+            )
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=f"Embedding model is {embedding_warmup.status}",
+            headers={"Retry-After": retry_after()},
+        )
+    return service
 
 @app.get("/", tags=["Health"])
 def read_root():
     """Health check endpoint"""
     return {"status": "healthy", "service": "I Ching Query API"}
 
-@app.post("/queries/", response_model=schemas.QueryResponse, tags=["Queries"])
-def create_query(query: schemas.QueryCreate, db: Session = Depends(get_db)):
+@app.get("/ready", tags=["Health"])
+def read_readiness():
+    """
+    Readiness check: 200 once the embedding model is loaded, 503 with
+    progress until then, 500 when every load attempt has failed
+    """
+    report = embedding_warmup.snapshot()
+    if embedding_warmup.failed:
+        return JSONResponse(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, content=report)
+    if not embedding_warmup.ready:
+        return JSONResponse(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            content=report,
+            headers={"Retry-After": retry_after()},
+        )
+    return report
+
+@app.post("/queries/", response_model=None, response_class=FastJSONResponse,
+          responses={200: {"model": schemas.QueryProjection}}, tags=["Queries"])
+def create_query(query: schemas.QueryCreate, db: Session = Depends(get_db),
+                 fields: Tuple[str, ...] = Depends(query_projection),
+                 embedding_service: ICHingEmbeddingService = Depends(get_embedding_service)):
     # Generate vector embedding and hexagram set for the query
     query_vector, hexagram_set = embedding_service.process_query(query.query)
     
@@ -46,57 +189,206 @@ def create_query(query: schemas.QueryCreate, db: Session = Depends(get_db)):
         query_vector=query_vector,
         hexagram_set=hexagram_set
     )
-    db.add(db_query)
-    db.commit()
-    db.refresh(db_query)
+    with metrics.time("db_commit"):
+        if query_writer is not None:
+            # Inserted, committed and indexed by the group-commit thread
+            db_query = query_writer.submit(db_query).result()
+        else:
+            db.add(db_query)
+            db.flush()
+            record_queries(db, [db_query])
+            db.commit()
+            db.refresh(db_query)
+    if query_writer is None:
+        index_queries([db_query.id], [query_vector], [hexagram_set])
     
-    return db_query
+    return FastJSONResponse(project_query(db_query, fields))
 
-@app.get("/queries/", response_model=List[schemas.QueryResponse], tags=["Queries"])
-def read_queries(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    queries = db.query(models.Query).offset(skip).limit(limit).all()
-    return queries
+@app.post("/queries/batch", response_model=None, response_class=FastJSONResponse,
+          responses={200: {"model": List[schemas.QueryProjection]}}, tags=["Queries"])
+def create_queries_batch(batch: schemas.QueryBatchCreate, db: Session = Depends(get_db),
+                         fields: Tuple[str, ...] = Depends(query_projection),
+                         embedding_service: ICHingEmbeddingService = Depends(get_embedding_service)):
+    """Embed, score and store many queries in one pass; results are in input order"""
+    texts = [item.query for item in batch.queries]
+    results = embedding_service.process_queries(texts)
+    
+    # Insert every row in a single transaction
+    db_queries = [
+        models.Query(query=text, query_vector=query_vector, hexagram_set=hexagram_set)
+        for text, (query_vector, hexagram_set) in zip(texts, results)
+    ]
+    with metrics.time("db_commit"):
+        db.add_all(db_queries)
+        db.flush()
+        ids = [db_query.id for db_query in db_queries]
+        record_queries(db, db_queries)
+        db.commit()
+    index_queries(ids, [query_vector for query_vector, _ in results], [hexagram_set for _, hexagram_set in results])
+    
+    # Reload the rows the commit expired with a few SELECTs
+    # rather than one refresh per row (chunked to stay under SQLite's parameter limit)
+    for start in range(0, len(ids), 500):
+        db.query(models.Query).filter(models.Query.id.in_(ids[start:start + 500])).all()
+    return FastJSONResponse([project_query(db_query, fields) for db_query in db_queries])
 
-@app.get("/queries/{query_id}", response_model=schemas.QueryResponse, tags=["Queries"])
-def read_query(query_id: int, db: Session = Depends(get_db)):
-    query = db.query(models.Query).filter(models.Query.id == query_id).first()
+@app.post("/queries/import", response_class=NDJSONStreamingResponse, tags=["Queries"])
+async def import_queries(request: Request,
+                         embedding_service: ICHingEmbeddingService = Depends(get_embedding_service)):
+    """
+    Bulk import from a newline-delimited JSON body (one {"query": ...} per line).
+    Streams back one NDJSON result line per input line, {"line", "id", "hexagram_set"}
+    or {"line", "error"}, as each chunk is committed.
+    """
+    return NDJSONStreamingResponse(stream_import(embedding_service, index_queries, request.stream()))
+
+@app.get("/queries/", response_model=None, response_class=FastJSONResponse,
+         responses={200: {"model": List[schemas.QueryProjection]}}, tags=["Queries"])
+def read_queries(request: Request, limit: int = Query(100, ge=1, le=1000),
+                 cursor: Optional[str] = None, order: str = Query("asc", pattern="^(asc|desc)$"),
+                 skip: int = Query(0, ge=0), fields: Tuple[str, ...] = Depends(query_projection),
+                 db: Session = Depends(get_db)):
+    """
+    Queries ordered by (created_at, id). When there are more rows, the
+    ``X-Next-Cursor`` header (and a ``Link: rel="next"`` URL) carries an
+    opaque cursor for the next page; pass it back as ``cursor``.
+    ``skip`` is kept for old clients but deep offsets get slower.
+    ``fields`` / ``include_vector=false`` leave columns out of the response
+    and the SELECT.
+    """
+    try:
+        with metrics.time("db_query"):
+            queries, next_cursor = get_queries_page(db, limit=limit, cursor=cursor, order=order, skip=skip,
+                                                    options=[load_projection(fields)])
+    except InvalidCursor as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return query_page_response(request, queries, fields, next_cursor)
+
+@app.get("/queries/export", tags=["Queries"])
+def export_query_history(format: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+                         start: Union[datetime, date, None] = None, end: Union[datetime, date, None] = None,
+                         vector: str = Query("none", pattern="^(none|base64|list)$")):
+    """
+    Stream every stored query (created_at in [start, end) when given; dates
+    are midnight, times without an offset UTC) as
+    NDJSON or CSV, read in batches so memory stays flat. ``vector=base64``
+    adds the stored vector bytes (see the X-Vector-Encoding header),
+    ``vector=list`` a JSON array of floats.
+    """
+    return StreamingResponse(
+        export_queries(format, start, end, vector),
+        media_type=MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="queries.{format}"',
+                 "X-Vector-Encoding": vector_encoding_header(vector)},
+    )
+
+@app.get("/queries/{query_id}", response_model=None, response_class=FastJSONResponse,
+         responses={200: {"model": schemas.QueryProjection}}, tags=["Queries"])
+def read_query(query_id: int, fields: Tuple[str, ...] = Depends(query_projection), db: Session = Depends(get_db)):
+    with metrics.time("db_query"):
+        query = db.query(models.Query).options(load_projection(fields)).filter(models.Query.id == query_id).first()
     if query is None:
         raise HTTPException(status_code=404, detail="Query not found")
-    return query
-
-@app.get("/queries/search/similar", tags=["Queries"])
-def find_similar_queries(query: str, limit: int = 10, db: Session = Depends(get_db)):
-    """Find queries with similar vector embeddings"""
-    # Generate vector for search query
-    search_vector, _ = embedding_service.process_query(query)
-    search_vector = np.array(search_vector)
-    
-    # Get all queries from database
-    all_queries = db.query(models.Query).all()
-    
-    # Calculate cosine similarity
-    similarities = []
-    for db_query in all_queries:
-        db_vector = np.array(db_query.query_vector)
-        
-        # Cosine similarity
-        similarity = np.dot(search_vector, db_vector) / (np.linalg.norm(search_vector) * np.linalg.norm(db_vector))
-        similarities.append((db_query, similarity))
-    
-    # Sort by similarity and return top results
-    similarities.sort(key=lambda x: x[1], reverse=True)
+    return FastJSONResponse(project_query(query, fields))
+
+@app.get("/queries/search/similar", response_class=FastJSONResponse,
+         responses={200: {"model": List[schemas.SimilarQuery]}}, tags=["Queries"])
+def find_similar_queries(query: str, limit: int = Query(10, ge=1, le=100),
+                         nprobe: Optional[int] = None, exact: bool = False,
+                         min_shared_hexagrams: int = Query(0, ge=0, le=6),
+                         hexagram_ids: Optional[List[int]] = Query(None),
+                         db: Session = Depends(get_db),
+                         embedding_service: ICHingEmbeddingService = Depends(get_embedding_service)):
+    """
+    Find queries with similar vector embeddings.
+
+    With an ANN index, ``nprobe`` lists are scanned (higher is slower but
+    finds more of the true neighbours) and ``exact=true`` scans them all.
+    ``min_shared_hexagrams`` scores only stored queries sharing at least that
+    many hexagrams with the search query's own set, and ``hexagram_ids``
+    (repeatable) keeps only queries whose set contains all of them.
+    """
+    matches = search_similar(embedding_service, query, limit, nprobe, exact, min_shared_hexagrams, hexagram_ids)
+    with metrics.time("db_fetch"):
+        rows = db.query(models.Query).filter(models.Query.id.in_([query_id for query_id, _ in matches])).all()
+    return similar_results(matches, rows)
+
+def search_similar(embedding_service: ICHingEmbeddingService, query: str, limit: int, nprobe: Optional[int],
+                   exact: bool, min_shared_hexagrams: int, hexagram_ids: Optional[List[int]]) -> List[Tuple[int, float]]:
+    """Embed the search query and score the indexed vectors: (id, similarity) pairs, best first"""
+    # Generate vector and hexagram set for search query
+    search_vector, search_hexagram_set = embedding_service.process_query(query)
     
+    # Score the indexed vectors (only the hexagram candidates when filtering)
+    index_sync.catch_up(query_index)
+    if exact and isinstance(query_index, IVFIndex):
+        nprobe = query_index.n_lists
+    with metrics.time("similar_search"):
+        return query_index.search(
+            search_vector, limit, nprobe=nprobe,
+            query_hexagrams=[h["hexagram_id"] for h in search_hexagram_set],
+            min_shared=min_shared_hexagrams,
+            required_hexagrams=hexagram_ids or (),
+        )
+
+def similar_results(matches: List[Tuple[int, float]], rows: List[models.Query]) -> list:
+    """Similar-search response items for the matched rows, in match order"""
+    rows_by_id = {row.id: row for row in rows}
     return [
         {
-            "id": query.id,
-            "query": query.query,
-            "similarity": float(similarity),
-            "hexagram_set": query.hexagram_set,
-            "created_at": query.created_at
+            "id": query_id,
+            "query": rows_by_id[query_id].query,
+            "similarity": similarity,
+            "hexagram_set": rows_by_id[query_id].hexagram_set,
+            "created_at": rows_by_id[query_id].created_at
         }
-        for query, similarity in similarities[:limit]
+        for query_id, similarity in matches
+        if query_id in rows_by_id
     ]
 
+@app.get("/cache/queries", tags=["Cache"])
+def get_query_cache_stats(embedding_service: ICHingEmbeddingService = Depends(get_embedding_service)):
+    """Hit, miss and eviction counters of the process_query result cache"""
+    return embedding_service.query_cache.stats()
+
+@app.get("/metrics", response_class=PlainTextResponse, tags=["Health"])
+def get_metrics():
+    """Stage latency histograms, counters and memory gauges in the Prometheus text format"""
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+@app.get("/admin/profiles", tags=["Admin"], dependencies=[Depends(require_profile_access)])
+def list_profiles():
+    """Stored request profiles, newest first (without the reports)"""
+    return profiler.summaries()
+
+@app.get("/admin/profiles/{profile_id}", response_class=PlainTextResponse, tags=["Admin"],
+         dependencies=[Depends(require_profile_access)])
+def get_profile(profile_id: str):
+    """One request profile: sorted cProfile stats or collapsed stacks"""
+    report = profiler.get(profile_id)
+    if report is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return PlainTextResponse(report["report"])
+
+@app.get("/hexagrams/stats", response_model=schemas.HexagramStatsResponse, response_model_exclude_none=True,
+         tags=["Hexagrams"])
+def get_hexagram_stats(period: str = Query("day", pattern="^(day|week|month)$"),
+                       start: Optional[date] = None, end: Optional[date] = None,
+                       hexagram_id: Optional[int] = Query(None, ge=1, le=64), series: bool = False,
+                       db: Session = Depends(get_db)):
+    """
+    How often each hexagram came up, per day, week (from Monday) or month:
+    as the top hexagram (top1_count), in the hexagram set (top6_count) and its
+    summed and mean score. Covers the buckets from the one containing
+    ``start`` up to ``end`` (exclusive), by default the last
+    HEXAGRAM_STATS_DEFAULT_BUCKETS; ``series`` returns each bucket instead of
+    the totals. Read from the hexagram_stats table, not the queries.
+    """
+    if start is not None and end is not None and end <= start:
+        raise HTTPException(status_code=400, detail="end must be after start")
+    with metrics.time("db_query"):
+        return read_stats(db, period, start, end, hexagram_id=hexagram_id, series=series)
+
 @app.get("/hexagrams/", tags=["Hexagrams"])
 def get_hexagrams():
     """Get all available hexagrams"""
@@ -107,7 +399,7 @@ def get_hexagrams():
             "keyword": hex_data[2],
             "unicode": hex_data[3]
         }
-        for hex_data in embedding_service.hexagrams
+        for hex_data in HEXAGRAMS
     ]
 
 if __name__ == "__main__":
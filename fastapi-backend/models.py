@@ -1,13 +1,73 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime, JSON
+from sqlalchemy import Column, Date, Float, Integer, SmallInteger, String, Text, DateTime, Index, JSON, LargeBinary
+from sqlalchemy.dialects import sqlite
 from sqlalchemy.sql import func
+from sqlalchemy.types import TypeDecorator
 from database import Base
 from datetime import datetime
+import os
+import numpy as np
+
+# Element type of stored query vectors: "float32" or "float16" (half the size).
+# Changing it needs the stored blobs rewritten (see alembic/versions).
+QUERY_VECTOR_DTYPE = os.getenv("QUERY_VECTOR_DTYPE", "float32")
+
+class VectorBlob(TypeDecorator):
+    """
+    Vector stored as little-endian float32/float16 bytes.
+
+    Accepts any sequence of floats on write; reads return a read-only numpy
+    array viewing the fetched bytes (np.frombuffer, no per-element parsing).
+    """
+    impl = LargeBinary
+    cache_ok = True
+
+    def __init__(self, dtype: str = "float32"):
+        super().__init__()
+        self.dtype = np.dtype(dtype).newbyteorder("<")
+
+    def process_bind_param(self, value, dialect):
+        if value is None:
+            return None
+        return np.asarray(value, dtype=self.dtype).tobytes()
+
+    def process_result_value(self, value, dialect):
+        if value is None:
+            return None
+        return np.frombuffer(value, dtype=self.dtype)
+
+# SQLite's CURRENT_TIMESTAMP default has no fractional seconds; binding
+# datetimes the same way keeps created_at comparisons (keyset pagination) exact
+CreatedAt = DateTime().with_variant(sqlite.DATETIME(truncate_microseconds=True), "sqlite")
+
+def utc_now() -> datetime:
+    """
+    created_at for new rows: naive UTC to the second. Set by the app rather
+    than the server default, whose NOW() is local time on MySQL, so stats
+    buckets and read_stats use the same clock.
+    """
+    return datetime.utcnow().replace(microsecond=0)
 
 class Query(Base):
     __tablename__ = "queries"
 
     id = Column(Integer, primary_key=True, index=True)
     query = Column(Text, nullable=False)
-    query_vector = Column(JSON, nullable=False)  # Store vector as JSON array
+    query_vector = Column(VectorBlob(QUERY_VECTOR_DTYPE), nullable=False)  # Store vector as packed floats
     hexagram_set = Column(JSON, nullable=False)  # Store hexagram indices and scores
-    created_at = Column(DateTime, server_default=func.now(), nullable=False)
\ No newline at end of file
+    created_at = Column(CreatedAt, default=utc_now, server_default=func.now(), nullable=False)
+
+    __table_args__ = (
+        # GET /queries/ pages in (created_at, id) order
+        Index("ix_queries_created_at_id", "created_at", "id"),
+    )
+
+class HexagramStat(Base):
+    """Per-bucket hexagram counts, kept up to date on insert (see hexagram_stats.py)"""
+    __tablename__ = "hexagram_stats"
+
+    period = Column(String(5), primary_key=True)  # "day", "week" or "month"
+    bucket_start = Column(Date, primary_key=True)
+    hexagram_id = Column(SmallInteger, primary_key=True)
+    top1_count = Column(Integer, nullable=False, default=0)  # Queries with it as the top hexagram
+    top6_count = Column(Integer, nullable=False, default=0)  # Queries with it in their hexagram set
+    score_sum = Column(Float, nullable=False, default=0.0)
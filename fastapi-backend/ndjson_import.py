@@ -0,0 +1,136 @@
+import json
+import os
+from typing import AsyncIterator, Callable, Dict, List, Optional, Tuple
+from pydantic import ValidationError
+from starlette.concurrency import run_in_threadpool
+from starlette.responses import StreamingResponse
+from starlette.types import Receive, Scope, Send
+import models
+import schemas
+from database import SessionLocal
+from hexagram_stats import record_queries
+
+# Bulk NDJSON import: the request body is read incrementally, split into lines
+# and processed IMPORT_CHUNK_SIZE lines at a time, so memory use does not grow
+# with the size of the upload.
+IMPORT_CHUNK_SIZE = int(os.getenv("IMPORT_CHUNK_SIZE", "500"))
+IMPORT_MAX_LINE_BYTES = int(os.getenv("IMPORT_MAX_LINE_BYTES", str(64 * 1024)))
+
+
+class NDJSONStreamingResponse(StreamingResponse):
+    """
+    Streams NDJSON while the request body is still being read.
+
+    Starlette's StreamingResponse listens for client disconnects by calling
+    ``receive()`` alongside the body iterator, which would steal the request
+    body chunks the iterator itself is reading, so that listener is skipped.
+    """
+
+    media_type = "application/x-ndjson"
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        await self.stream_response(send)
+        if self.background is not None:
+            await self.background()
+
+
+async def iter_lines(stream: AsyncIterator[bytes], max_line_bytes: int = IMPORT_MAX_LINE_BYTES
+                     ) -> AsyncIterator[Optional[bytes]]:
+    """Split a byte stream into lines; yields None in place of a line longer than max_line_bytes"""
+    buffer = b""
+    skipping = False
+    async for block in stream:
+        if skipping:
+            newline = block.find(b"\n")
+            if newline < 0:
+                continue
+            block = block[newline + 1:]
+            skipping = False
+
+        lines = (buffer + block).split(b"\n")
+        buffer = lines.pop()
+        for line in lines:
+            yield line if len(line) <= max_line_bytes else None
+
+        if len(buffer) > max_line_bytes:
+            yield None
+            buffer = b""
+            skipping = True
+
+    if buffer:
+        yield buffer if len(buffer) <= max_line_bytes else None
+
+
+def import_chunk(embedding_service, index_queries: Callable, lines: List[Tuple[int, Optional[bytes]]]) -> List[Dict]:
+    """
+    Validate, embed and bulk-insert one chunk of lines; returns one result per line.
+    ``index_queries(ids, vectors, hexagram_sets)`` adds the committed rows to the similar-search index.
+    """
+    results: Dict[int, Dict] = {}
+    valid = []
+    for line_number, line in lines:
+        if line is None:
+            results[line_number] = {"line": line_number, "error": f"line exceeds {IMPORT_MAX_LINE_BYTES} bytes"}
+            continue
+        try:
+            valid.append((line_number, schemas.QueryCreate.model_validate_json(line).query))
+        except ValidationError as e:
+            results[line_number] = {"line": line_number, "error": e.errors(include_url=False)[0]["msg"]}
+
+    if valid:
+        processed = embedding_service.process_queries([text for _, text in valid])
+        db_queries = [
+            models.Query(query=text, query_vector=query_vector, hexagram_set=hexagram_set)
+            for (_, text), (query_vector, hexagram_set) in zip(valid, processed)
+        ]
+        db = SessionLocal()
+        try:
+            db.add_all(db_queries)
+            db.flush()
+            ids = [db_query.id for db_query in db_queries]
+            record_queries(db, db_queries)
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            ids = None
+            for line_number, _ in valid:
+                results[line_number] = {"line": line_number, "error": f"database error: {e.__class__.__name__}"}
+        finally:
+            db.close()
+
+        if ids is not None:
+            for (line_number, _), query_id, (_, hexagram_set) in zip(valid, ids, processed):
+                results[line_number] = {"line": line_number, "id": query_id, "hexagram_set": hexagram_set}
+            try:
+                index_queries(ids, [query_vector for query_vector, _ in processed],
+                              [hexagram_set for _, hexagram_set in processed])
+            except Exception as e:
+                # The rows are stored, so they are reported as such (a retry would duplicate
+                # them); search finds them at the latest after the next start-up reloads the index
+                print(f"Indexing {len(ids)} imported rows failed: {e!r}")
+
+    return [results[line_number] for line_number, _ in lines]
+
+
+async def stream_import(embedding_service, index_queries: Callable, body: AsyncIterator[bytes],
+                        chunk_size: int = IMPORT_CHUNK_SIZE) -> AsyncIterator[bytes]:
+    """Consume an NDJSON body chunk by chunk, yielding NDJSON results as each chunk commits"""
+    chunk = []
+    line_number = 0
+    async for line in iter_lines(body):
+        line_number += 1
+        if line is not None and not line.strip():
+            continue
+        chunk.append((line_number, line))
+        if len(chunk) >= chunk_size:
+            yield await _run_chunk(embedding_service, index_queries, chunk)
+            chunk = []
+
+    if chunk:
+        yield await _run_chunk(embedding_service, index_queries, chunk)
+
+
+async def _run_chunk(embedding_service, index_queries: Callable, chunk: List[Tuple[int, Optional[bytes]]]) -> bytes:
+    # Embedding and the DB write are blocking; keep them off the event loop
+    results = await run_in_threadpool(import_chunk, embedding_service, index_queries, chunk)
+    return b"".join(json.dumps(result).encode() + b"\n" for result in results)
@@ -0,0 +1,91 @@
+import base64
+import binascii
+import json
+from datetime import datetime
+from typing import List, Optional, Sequence, Tuple
+from sqlalchemy import Select, or_, select
+from sqlalchemy.orm import Session
+import models
+
+# Keyset pagination for GET /queries/: rows are ordered by (created_at, id),
+# which the ix_queries_created_at_id index serves in either direction, and a
+# page starts strictly after the last row of the previous one. The cursor is
+# that row's (created_at, id) plus the direction, base64-encoded so clients
+# treat it as opaque.
+ORDERS = ("asc", "desc")
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(created_at: datetime, query_id: int, order: str) -> str:
+    payload = json.dumps([created_at.isoformat(), query_id, order], separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int, str]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, query_id, order = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if order not in ORDERS or not isinstance(query_id, int):
+            raise ValueError(order)
+        return datetime.fromisoformat(created_at), query_id, order
+    except (binascii.Error, UnicodeDecodeError, TypeError, ValueError) as e:
+        raise InvalidCursor("Invalid pagination cursor") from e
+
+
+def ordered_select(order: str = "asc") -> Select:
+    """SELECT of all queries ordered by (created_at, id) in the given direction"""
+    if order == "desc":
+        return select(models.Query).order_by(models.Query.created_at.desc(), models.Query.id.desc())
+    return select(models.Query).order_by(models.Query.created_at, models.Query.id)
+
+
+def after_cursor(statement: Select, created_at: datetime, query_id: int, order: str) -> Select:
+    """``statement`` limited to rows strictly after (created_at, id) in ``order``"""
+    # The redundant leading bound on created_at gives the planner an index range
+    # to seek to; without it SQLite walks the index from the start
+    if order == "desc":
+        return statement.filter(
+            models.Query.created_at <= created_at,
+            or_(models.Query.created_at < created_at, models.Query.id < query_id),
+        )
+    return statement.filter(
+        models.Query.created_at >= created_at,
+        or_(models.Query.created_at > created_at, models.Query.id > query_id),
+    )
+
+
+def page_statement(limit: int = 100, cursor: Optional[str] = None, order: str = "asc", skip: int = 0,
+                   options: Sequence = ()) -> Tuple[Select, str]:
+    """
+    The SELECT for one page (limit + 1 rows) and its direction, for sync or
+    async sessions. A cursor carries its own direction; ``skip`` is only
+    applied without one.
+    """
+    if cursor:
+        created_at, query_id, order = decode_cursor(cursor)
+        statement = after_cursor(ordered_select(order), created_at, query_id, order)
+    else:
+        statement = ordered_select(order).offset(skip)
+    # One extra row tells whether there is a next page without a COUNT
+    return statement.options(*options).limit(limit + 1), order
+
+
+def split_page(rows: List[models.Query], limit: int, order: str) -> Tuple[List[models.Query], Optional[str]]:
+    """Drop the look-ahead row and build the next cursor from the last row kept"""
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    return rows, encode_cursor(rows[-1].created_at, rows[-1].id, order)
+
+
+def get_queries_page(db: Session, limit: int = 100, cursor: Optional[str] = None, order: str = "asc",
+                     skip: int = 0, options: Sequence = ()) -> Tuple[List[models.Query], Optional[str]]:
+    """
+    One page of queries and the cursor of the next page (None on the last page).
+    ``options`` are ORM loader options, e.g. to skip loading vectors.
+    """
+    statement, order = page_statement(limit, cursor, order, skip, options)
+    return split_page(db.scalars(statement).all(), limit, order)
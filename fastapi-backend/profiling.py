@@ -0,0 +1,288 @@
+import asyncio
+import cProfile
+import io
+import itertools
+import os
+import pstats
+import random
+import sys
+import threading
+import time
+from collections import Counter, deque
+from contextvars import ContextVar
+from typing import Callable, Dict, List, Optional
+from fastapi import HTTPException, Request
+from fastapi.exceptions import RequestValidationError
+from fastapi.routing import APIRoute
+from starlette.exceptions import HTTPException as StarletteHTTPException
+
+# Opt-in profiling of single requests. With PROFILING_ENABLED=1 a request
+# sent with an ``X-Profile`` header or a ``profile`` query parameter (value
+# 1, "pstats" or "collapsed") runs its handler under a profiler, and a
+# PROFILE_SAMPLE_RATE fraction of all requests is profiled unasked. Both are
+# capped by PROFILE_MAX_PER_MINUTE and one profile at a time, so leaving it
+# on costs at most a few slowed-down requests a minute. Reports are kept in
+# memory (the last PROFILE_KEEP, also written to PROFILE_DIR when set) and
+# read back from GET /admin/profiles. With PROFILE_TOKEN set, opting in and
+# the admin endpoints need a matching X-Profile-Token header.
+#
+# Report formats:
+#   "pstats"    - cProfile stats sorted by PROFILE_SORT (default cumulative)
+#   "collapsed" - stacks sampled every PROFILE_INTERVAL_MS, one
+#                 "frame;frame;frame count" line each (flamegraph.pl, speedscope)
+PROFILING_ENABLED = os.getenv("PROFILING_ENABLED", "0") in ("1", "true", "yes")
+PROFILE_SAMPLE_RATE = min(max(float(os.getenv("PROFILE_SAMPLE_RATE", "0")), 0.0), 1.0)
+PROFILE_MAX_PER_MINUTE = float(os.getenv("PROFILE_MAX_PER_MINUTE", "6"))
+PROFILE_FORMAT = os.getenv("PROFILE_FORMAT", "pstats")
+PROFILE_SORT = os.getenv("PROFILE_SORT", "cumulative")
+PROFILE_TOP_FUNCTIONS = int(os.getenv("PROFILE_TOP_FUNCTIONS", "60"))
+PROFILE_INTERVAL_MS = float(os.getenv("PROFILE_INTERVAL_MS", "1"))
+PROFILE_KEEP = int(os.getenv("PROFILE_KEEP", "50"))
+PROFILE_DIR = os.getenv("PROFILE_DIR", "")
+PROFILE_TOKEN = os.getenv("PROFILE_TOKEN", "")
+PROFILE_FORMATS = ("pstats", "collapsed")
+
+_OPT_IN_VALUES = ("1", "true", "yes") + PROFILE_FORMATS
+
+
+class ProfileSession:
+    """
+    Profiles one request: every ``call`` made on its behalf, on whichever
+    thread runs it, is added to the same report.
+    """
+
+    def __init__(self, request: Request, report_format: str, trigger: str):
+        self.method = request.method
+        self.path = request.url.path
+        self.query = request.url.query
+        self.format = report_format
+        self.trigger = trigger
+        self.started_at = time.time()
+        self.start = time.perf_counter()
+        self.profiles: List[cProfile.Profile] = []
+        self.stacks: Counter = Counter()
+        self._lock = threading.Lock()
+
+    def call(self, fn: Callable, *args, **kwargs):
+        """Run ``fn`` on this thread under the session's profiler"""
+        if self.format == "collapsed":
+            sampler = StackSampler(threading.get_ident(), PROFILE_INTERVAL_MS / 1000)
+            sampler.start()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                stacks = sampler.stop()
+                with self._lock:
+                    self.stacks.update(stacks)
+        profile = cProfile.Profile()
+        try:
+            return profile.runcall(fn, *args, **kwargs)
+        finally:
+            with self._lock:
+                self.profiles.append(profile)
+
+    def render(self) -> str:
+        if self.format == "collapsed":
+            if not self.stacks:
+                return f"No samples: the handler ran for less than PROFILE_INTERVAL_MS ({PROFILE_INTERVAL_MS} ms)\n"
+            return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+        if not self.profiles:
+            return "No handler code ran on a profiled thread\n"
+        out = io.StringIO()
+        stats = pstats.Stats(*self.profiles, stream=out)
+        stats.strip_dirs().sort_stats(PROFILE_SORT).print_stats(PROFILE_TOP_FUNCTIONS)
+        return out.getvalue()
+
+
+class StackSampler(threading.Thread):
+    """Samples one thread's Python stack at a fixed interval into collapsed-stack counts"""
+
+    def __init__(self, thread_id: int, interval: float):
+        super().__init__(daemon=True, name="profile-sampler")
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self._done = threading.Event()
+
+    def run(self):
+        while not self._done.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            frames = []
+            # Up to the profiled call (not the thread or profiler frames below it)
+            while frame is not None and frame.f_code is not _SESSION_CALL_CODE:
+                code = frame.f_code
+                frames.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                frame = frame.f_back
+            if frames:
+                self.stacks[";".join(reversed(frames))] += 1
+
+    def stop(self) -> Counter:
+        self._done.set()
+        self.join()
+        return self.stacks
+
+
+_SESSION_CALL_CODE = ProfileSession.call.__code__
+
+
+class Profiler:
+    """
+    Decides which requests are profiled and keeps their reports.
+
+    ``PROFILE_MAX_PER_MINUTE`` is a token bucket shared by opted-in and
+    sampled requests; a request arriving while another is profiled, or with
+    the bucket empty, runs unprofiled.
+    """
+
+    def __init__(self, enabled: bool = PROFILING_ENABLED, sample_rate: float = PROFILE_SAMPLE_RATE,
+                 max_per_minute: float = PROFILE_MAX_PER_MINUTE, keep: int = PROFILE_KEEP,
+                 report_dir: str = PROFILE_DIR):
+        self.enabled = enabled
+        self.sample_rate = sample_rate
+        self.max_per_minute = max_per_minute
+        self.report_dir = report_dir
+        self.reports: "deque[Dict]" = deque(maxlen=keep)
+        self.skipped = 0
+        self._tokens = max_per_minute
+        self._refilled = time.monotonic()
+        self._ids = itertools.count(1)
+        self._active = threading.Lock()
+        self._lock = threading.Lock()
+
+    def _take_token(self) -> bool:
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.max_per_minute, self._tokens + (now - self._refilled) * self.max_per_minute / 60)
+            self._refilled = now
+            if self._tokens < 1:
+                self.skipped += 1
+                return False
+            self._tokens -= 1
+            return True
+
+    def start(self, request: Request) -> Optional[ProfileSession]:
+        """A session if this request is to be profiled, else None"""
+        requested = request.headers.get("x-profile") or request.query_params.get("profile")
+        if requested and requested.lower() in _OPT_IN_VALUES and has_profile_token(request):
+            report_format = requested.lower() if requested.lower() in PROFILE_FORMATS else PROFILE_FORMAT
+            trigger = "requested"
+        elif self.sample_rate and random.random() < self.sample_rate:
+            report_format, trigger = PROFILE_FORMAT, "sampled"
+        else:
+            return None
+        if not self._active.acquire(blocking=False):
+            self.skipped += 1
+            return None
+        if not self._take_token():
+            self._active.release()
+            return None
+        return ProfileSession(request, report_format, trigger)
+
+    def finish(self, session: ProfileSession, status_code: int) -> Dict:
+        """Store the session's report and return it"""
+        try:
+            report = {
+                "id": str(next(self._ids)),
+                "method": session.method,
+                "path": session.path,
+                "query": session.query,
+                "status_code": status_code,
+                "format": session.format,
+                "trigger": session.trigger,
+                "started_at": session.started_at,
+                "duration_ms": 1000 * (time.perf_counter() - session.start),
+                "report": session.render(),
+            }
+        finally:
+            self._active.release()
+        self.reports.append(report)
+        if self.report_dir:
+            self._write(report)
+        return report
+
+    def _write(self, report: Dict):
+        os.makedirs(self.report_dir, exist_ok=True)
+        suffix = "collapsed" if report["format"] == "collapsed" else "txt"
+        name = f"{int(report['started_at'])}-{os.getpid()}-{report['id']}.{suffix}"
+        with open(os.path.join(self.report_dir, name), "w") as f:
+            f.write(report["report"])
+
+    def summaries(self) -> List[Dict]:
+        return [{key: value for key, value in report.items() if key != "report"} for report in reversed(self.reports)]
+
+    def get(self, profile_id: str) -> Optional[Dict]:
+        return next((report for report in self.reports if report["id"] == profile_id), None)
+
+
+profiler = Profiler()
+
+# The session of the request being handled, if it is profiled
+current_session: ContextVar[Optional[ProfileSession]] = ContextVar("profile_session", default=None)
+
+
+def has_profile_token(request: Request) -> bool:
+    return not PROFILE_TOKEN or request.headers.get("x-profile-token") == PROFILE_TOKEN
+
+
+def require_profile_access(request: Request):
+    """Dependency for the admin endpoints: 404 while profiling is off, 403 without the token"""
+    if not profiler.enabled:
+        raise HTTPException(status_code=404, detail="Profiling is disabled (PROFILING_ENABLED)")
+    if not has_profile_token(request):
+        raise HTTPException(status_code=403, detail="X-Profile-Token required")
+
+
+def profiled(fn: Callable, *args, **kwargs):
+    """Call ``fn``, under the current request's profiler if it has one (for work handed to other threads)"""
+    session = current_session.get()
+    if session is None:
+        return fn(*args, **kwargs)
+    return session.call(fn, *args, **kwargs)
+
+
+class ProfiledRoute(APIRoute):
+    """
+    Route class that can profile its handler. Sync endpoints are profiled on
+    the threadpool thread running them; async endpoints only in the work
+    they pass through ``profiled`` (the event loop thread interleaves other
+    requests).
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        endpoint = self.dependant.call
+        if profiler.enabled and not asyncio.iscoroutinefunction(endpoint):
+            # Runs in the threadpool, where the request's context is copied in
+            self.dependant.call = lambda **values: profiled(endpoint, **values)
+
+    def get_route_handler(self):
+        handler = super().get_route_handler()
+        if not profiler.enabled:
+            return handler
+
+        async def profiling_handler(request: Request):
+            session = profiler.start(request)
+            if session is None:
+                return await handler(request)
+            token = current_session.set(session)
+            # Any other exception ends up as a 500; an HTTPException is turned into
+            # its response later, so the id goes on its headers
+            status_code, headers = 500, None
+            try:
+                response = await handler(request)
+                status_code, headers = response.status_code, response.headers
+                return response
+            except StarletteHTTPException as exc:
+                status_code = exc.status_code
+                exc.headers = headers = dict(exc.headers or {})
+                raise
+            except RequestValidationError:
+                status_code = 422
+                raise
+            finally:
+                current_session.reset(token)
+                report = profiler.finish(session, status_code)
+                if headers is not None:
+                    headers["X-Profile-Id"] = report["id"]
+
+        return profiling_handler
@@ -8,7 +8,8 @@ def quick_query(question: str, base_url="http://localhost:8000"):
     try:
         response = requests.post(
             f"{base_url}/queries/",
-            json={"query": question}
+            json={"query": question},
+            params={"include_vector": "false"}
         )
         
         if response.ok:
@@ -0,0 +1,70 @@
+from typing import Any, Dict, List, Optional, Tuple
+import numpy as np
+import orjson
+from fastapi import HTTPException, Query, Request
+from fastapi.responses import ORJSONResponse
+from sqlalchemy.orm import load_only
+import models
+from services.metrics import metrics
+
+# Field projection for the query endpoints: clients that never display the
+# 300-float vector can leave it out, and then it is neither loaded from the
+# database nor serialized.
+QUERY_FIELDS = ("id", "query", "query_vector", "hexagram_set", "created_at")
+
+
+def _numpy_default(value: Any):
+    # Arrays orjson can't take natively (e.g. non-native byte order)
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if isinstance(value, np.generic):
+        return value.item()
+    raise TypeError
+
+
+class FastJSONResponse(ORJSONResponse):
+    """orjson response that writes numpy vectors directly, without a list of Python floats"""
+
+    def render(self, content: Any) -> bytes:
+        with metrics.time("json_encode"):
+            return orjson.dumps(content, default=_numpy_default,
+                                option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS)
+
+
+def query_projection(
+    fields: Optional[str] = Query(None, description="Comma-separated subset of " + ", ".join(QUERY_FIELDS)),
+    include_vector: bool = Query(True, description="Include query_vector when fields is not given"),
+) -> Tuple[str, ...]:
+    """Dependency: the QueryResponse fields to return, in schema order"""
+    if fields is None:
+        return tuple(field for field in QUERY_FIELDS if include_vector or field != "query_vector")
+    requested = {field.strip() for field in fields.split(",") if field.strip()}
+    unknown = requested - set(QUERY_FIELDS)
+    if unknown or not requested:
+        raise HTTPException(
+            status_code=422,
+            detail=f"fields must be a comma-separated subset of {', '.join(QUERY_FIELDS)}",
+        )
+    return tuple(field for field in QUERY_FIELDS if field in requested)
+
+
+def load_projection(fields: Tuple[str, ...]):
+    """ORM loader option that only reads the projected columns (plus id and created_at, for cursors)"""
+    columns = {"id", "created_at", *fields}
+    return load_only(*(getattr(models.Query, column) for column in QUERY_FIELDS if column in columns))
+
+
+def project_query(row: models.Query, fields: Tuple[str, ...]) -> Dict[str, Any]:
+    """A QueryResponse-shaped dict with only ``fields``"""
+    return {field: getattr(row, field) for field in fields}
+
+
+def query_page_response(request: Request, queries: List[models.Query], fields: Tuple[str, ...],
+                        next_cursor: Optional[str]) -> FastJSONResponse:
+    """A GET /queries/ page, with X-Next-Cursor and Link: rel="next" headers when there are more rows"""
+    response = FastJSONResponse([project_query(query, fields) for query in queries])
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+        next_url = request.url.remove_query_params(["skip", "cursor", "order"]).include_query_params(cursor=next_cursor)
+        response.headers["Link"] = f'<{next_url}>; rel="next"'
+    return response
@@ -1,5 +1,5 @@
 from pydantic import BaseModel, ConfigDict, Field
-from datetime import datetime
+from datetime import date, datetime
 from typing import List, Optional
 
 class QueryBase(BaseModel):
@@ -8,6 +8,9 @@ class QueryBase(BaseModel):
 class QueryCreate(QueryBase):
     pass
 
+class QueryBatchCreate(BaseModel):
+    queries: List[QueryCreate] = Field(..., min_length=1, max_length=1000)
+
 class HexagramScore(BaseModel):
     hexagram_id: int
     hexagram_name: str
@@ -21,4 +24,44 @@ class QueryResponse(QueryBase):
     created_at: datetime
 
     class Config:
-        orm_mode = True
\ No newline at end of file
+        orm_mode = True
+
+class QueryProjection(BaseModel):
+    """
+    What the query endpoints return: the QueryResponse fields picked by
+    ``fields`` (all of them by default, less query_vector with
+    ``include_vector=false``). Only documents the responses, which are
+    written straight from the rows by FastJSONResponse.
+    """
+    id: Optional[int] = None
+    query: Optional[str] = None
+    query_vector: Optional[List[float]] = None
+    hexagram_set: Optional[List[HexagramScore]] = None
+    created_at: Optional[datetime] = None
+
+class SimilarQuery(BaseModel):
+    id: int
+    query: str
+    similarity: float
+    hexagram_set: List[HexagramScore]
+    created_at: datetime
+
+class HexagramStatEntry(BaseModel):
+    hexagram_id: int
+    hexagram_name: Optional[str]
+    hexagram_unicode: Optional[str]
+    top1_count: int
+    top6_count: int
+    score_sum: float
+    mean_score: float
+
+class HexagramStatsBucket(BaseModel):
+    bucket_start: date
+    hexagrams: List[HexagramStatEntry]
+
+class HexagramStatsResponse(BaseModel):
+    period: str
+    start: date
+    end: date
+    hexagrams: Optional[List[HexagramStatEntry]] = None
+    buckets: Optional[List[HexagramStatsBucket]] = None
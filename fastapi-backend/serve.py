@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Pre-fork multi-worker launcher.
+
+Loads the embedding service and the query index once, in this process, then
+forks ``--workers`` uvicorn workers sharing one listening socket. The workers
+inherit the loaded model copy-on-write: the memory-mapped matrices, the
+vocabulary and the query index are shared instead of being loaded once per
+worker, as ``uvicorn --workers`` does. A worker that exits is forked again
+from the loaded parent. Each worker keeps its own query index up to date
+with rows the others insert (QUERY_INDEX_SYNC_SECONDS, default 1 s here).
+
+    python3 serve.py --workers 4 --port 8000
+"""
+import argparse
+import gc
+import os
+import signal
+import socket
+import sys
+import time
+
+def bind_socket(host, port, backlog=2048):
+    sock = socket.socket(socket.AF_INET6 if ":" in host else socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(backlog)
+    sock.set_inheritable(True)
+    return sock
+
+def run_worker(app, sock, log_level):
+    import uvicorn
+
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    uvicorn.Server(uvicorn.Config(app, log_level=log_level)).run(sockets=[sock])
+
+def main():
+    parser = argparse.ArgumentParser(description="Pre-fork multi-worker launcher for the I Ching API")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--app", choices=("main", "async_main"), default="main",
+                        help="Sync app or the async variant")
+    parser.add_argument("--index-sync-seconds", type=float, default=1.0,
+                        help="How often a worker pulls other workers' inserts into its query index")
+    parser.add_argument("--log-level", default="info")
+    args = parser.parse_args()
+
+    # Read by index_sync at import
+    if args.workers > 1:
+        os.environ.setdefault("QUERY_INDEX_SYNC_SECONDS", str(args.index_sync_seconds))
+
+    import importlib
+    import main as app_module
+    from database import engine
+    app = importlib.import_module(args.app).app
+
+    app_module.embedding_warmup.run()
+    if not app_module.embedding_warmup.ready:
+        sys.exit(1)
+    # Pooled connections must not be shared across fork; each worker opens its own
+    engine.dispose()
+    # Keep the garbage collector from writing to (and so un-sharing) the loaded objects
+    gc.collect()
+    gc.freeze()
+
+    sock = bind_socket(args.host, args.port)
+    workers = set()
+    stopping = False
+
+    def spawn():
+        pid = os.fork()
+        if pid == 0:
+            try:
+                run_worker(app, sock, args.log_level)
+            finally:
+                os._exit(0)
+        workers.add(pid)
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for pid in workers:
+            os.kill(pid, signal.SIGTERM)
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    for _ in range(args.workers):
+        spawn()
+    print(f"Serving {args.app}:app on {args.host}:{args.port} with {args.workers} pre-forked workers")
+
+    while workers:
+        pid, status = os.wait()
+        workers.discard(pid)
+        if not stopping:
+            print(f"Worker {pid} exited with status {status}; restarting")
+            time.sleep(1)
+            spawn()
+
+if __name__ == "__main__":
+    main()
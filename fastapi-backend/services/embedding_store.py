@@ -0,0 +1,224 @@
+import glob
+import os
+import pickle
+from itertools import repeat
+import numpy as np
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+# On-disk layout: one contiguous float32 matrix (.npy, opened as a memmap)
+# plus a vocabulary file holding one word per line, line number == row.
+VECTORS_SUFFIX = ".vectors.npy"
+VOCAB_SUFFIX = ".vocab.txt"
+LEGACY_CACHE_SUFFIX = ".cache.pkl"
+
+# Storage precisions for the matrix. Reduced precisions are derived from the
+# float32 matrix and stored next to it; int8 keeps one float32 scale per row.
+PRECISIONS = ("float32", "float16", "int8")
+QUANTIZE_CHUNK_ROWS = 65536
+
+
+def store_paths(glove_path: str) -> Tuple[str, str]:
+    """Return the (vectors, vocabulary) file paths for a GloVe text file"""
+    return glove_path + VECTORS_SUFFIX, glove_path + VOCAB_SUFFIX
+
+
+def quantized_paths(glove_path: str, precision: str) -> Tuple[str, Optional[str]]:
+    """Return the (vectors, scales) file paths for a reduced-precision matrix"""
+    if precision == "float32":
+        return glove_path + VECTORS_SUFFIX, None
+    vectors_path = f"{glove_path}.vectors.{precision}.npy"
+    scales_path = f"{glove_path}.scales.{precision}.npy" if precision == "int8" else None
+    return vectors_path, scales_path
+
+
+def store_exists(glove_path: str) -> bool:
+    """Check whether a binary store has already been built for a GloVe file"""
+    return all(os.path.exists(path) for path in store_paths(glove_path))
+
+
+def remove_derived(glove_path: str):
+    """Delete reduced-precision copies derived from a previous float32 matrix"""
+    for precision in PRECISIONS[1:]:
+        for path in quantized_paths(glove_path, precision):
+            if path and os.path.exists(path):
+                os.remove(path)
+
+    # Subword bucket tables (services/subword.py) are derived from it too
+    for path in glob.glob(glob.escape(glove_path) + ".subwords.*.npy"):
+        os.remove(path)
+
+
+def check_precision(precision: str) -> str:
+    if precision not in PRECISIONS:
+        raise ValueError(f"Unknown embedding precision {precision!r}, expected one of {PRECISIONS}")
+    return precision
+
+
+def quantize(vectors: np.ndarray, precision: str) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+    """Convert float32 rows to ``precision``; returns (data, per-row scales or None)"""
+    vectors = np.asarray(vectors, dtype=np.float32)
+    if precision == "float32":
+        return vectors, None
+    if precision == "float16":
+        return vectors.astype(np.float16), None
+
+    scales = np.abs(vectors).max(axis=1) / 127.0
+    safe = np.where(scales > 0, scales, 1.0)
+    data = np.clip(np.rint(vectors / safe[:, None]), -127, 127).astype(np.int8)
+    return data, scales.astype(np.float32)
+
+
+def dequantize(data: np.ndarray, scales: Optional[np.ndarray] = None) -> np.ndarray:
+    """Inverse of ``quantize``: always returns float32"""
+    if scales is None:
+        return np.asarray(data, dtype=np.float32)
+    return data.astype(np.float32) * np.asarray(scales, dtype=np.float32)[..., None]
+
+
+class EmbeddingStore:
+    """
+    Read-only word -> vector table backed by a single contiguous matrix.
+
+    Behaves like the ``Dict[str, np.ndarray]`` it replaces (``in``, ``[]``,
+    ``len``), but rows live in one array, so a memory-mapped store costs
+    almost nothing to open and its pages are shared through the OS page cache.
+    The matrix may be float32, float16 or int8 (with ``scales``); lookups
+    always return dequantized float32 vectors.
+    """
+
+    def __init__(self, words: List[str], vectors: np.ndarray, scales: Optional[np.ndarray] = None):
+        if len(words) != vectors.shape[0]:
+            raise ValueError(
+                f"Vocabulary has {len(words)} words but matrix has {vectors.shape[0]} rows"
+            )
+        self.words = words
+        self.vectors = vectors
+        self.scales = scales
+        self.precision = "int8" if scales is not None else str(vectors.dtype)
+        self.word_to_row = {word: row for row, word in enumerate(words)}
+        self.vector_dim = vectors.shape[1]
+
+    @property
+    def nbytes(self) -> int:
+        """Size of the matrix (and scales) whether resident or memory-mapped"""
+        return self.vectors.nbytes + (self.scales.nbytes if self.scales is not None else 0)
+
+    @classmethod
+    def empty(cls, vector_dim: int = 300) -> "EmbeddingStore":
+        return cls([], np.zeros((0, vector_dim), dtype=np.float32))
+
+    @classmethod
+    def load(cls, glove_path: str, precision: str = "float32") -> "EmbeddingStore":
+        """
+        Open a store built by ``save`` without reading the matrix into memory.
+
+        Reduced-precision matrices are derived from the float32 one the first
+        time they are requested and kept on disk alongside it.
+        """
+        check_precision(precision)
+        _, vocab_path = store_paths(glove_path)
+        vectors_path, scales_path = quantized_paths(glove_path, precision)
+        if not os.path.exists(vectors_path) or (scales_path and not os.path.exists(scales_path)):
+            write_quantized(glove_path, precision)
+
+        vectors = np.load(vectors_path, mmap_mode="r")
+        scales = np.load(scales_path, mmap_mode="r") if scales_path else None
+        with open(vocab_path, "r", encoding="utf-8") as f:
+            words = f.read().split("\n")
+        if words and words[-1] == "":
+            words.pop()
+        return cls(words, vectors, scales)
+
+    @classmethod
+    def from_dict(cls, embeddings: Dict[str, np.ndarray]) -> "EmbeddingStore":
+        if not embeddings:
+            return cls.empty()
+        words = list(embeddings.keys())
+        vectors = np.stack([embeddings[w] for w in words]).astype(np.float32, copy=False)
+        return cls(words, vectors)
+
+    def save(self, glove_path: str):
+        """Write the matrix and vocabulary next to the GloVe file, atomically"""
+        if self.scales is not None or self.vectors.dtype != np.float32:
+            raise ValueError("Only float32 stores can be saved; reduced precisions are derived on load")
+        vectors_path, vocab_path = store_paths(glove_path)
+        tmp_vectors = vectors_path + ".tmp"
+        tmp_vocab = vocab_path + ".tmp"
+
+        with open(tmp_vectors, "wb") as f:
+            np.save(f, np.ascontiguousarray(self.vectors, dtype=np.float32))
+        with open(tmp_vocab, "w", encoding="utf-8") as f:
+            for word in self.words:
+                f.write(word)
+                f.write("\n")
+
+        os.replace(tmp_vectors, vectors_path)
+        os.replace(tmp_vocab, vocab_path)
+        remove_derived(glove_path)
+
+    def __contains__(self, word: str) -> bool:
+        return word in self.word_to_row
+
+    def row_vector(self, row: int) -> np.ndarray:
+        """Dequantized float32 vector for one matrix row"""
+        return dequantize(self.vectors[row], None if self.scales is None else self.scales[row])
+
+    def lookup_ids(self, words: Sequence[str]) -> np.ndarray:
+        """Map words to int32 row ids; out-of-vocabulary words become -1"""
+        return np.fromiter(map(self.word_to_row.get, words, repeat(-1)), dtype=np.int32, count=len(words))
+
+    def gather(self, ids: np.ndarray) -> np.ndarray:
+        """Dequantized float32 rows for an array of (in-vocabulary) row ids, in one fancy-index"""
+        return dequantize(self.vectors[ids], None if self.scales is None else self.scales[ids])
+
+    def __getitem__(self, word: str) -> np.ndarray:
+        return self.row_vector(self.word_to_row[word])
+
+    def __len__(self) -> int:
+        return len(self.words)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.words)
+
+    def get(self, word: str, default: Optional[np.ndarray] = None) -> Optional[np.ndarray]:
+        row = self.word_to_row.get(word)
+        if row is None:
+            return default
+        return self.row_vector(row)
+
+
+def read_legacy_cache(cache_path: str) -> EmbeddingStore:
+    """Read a pickled ``Dict[str, np.ndarray]`` cache from older versions"""
+    with open(cache_path, "rb") as f:
+        return EmbeddingStore.from_dict(pickle.load(f))
+
+
+def write_quantized(glove_path: str, precision: str):
+    """Derive the ``precision`` matrix from the float32 store, chunk by chunk"""
+    check_precision(precision)
+    if precision == "float32":
+        return
+
+    source = np.load(store_paths(glove_path)[0], mmap_mode="r")
+    vectors_path, scales_path = quantized_paths(glove_path, precision)
+    tmp_vectors = vectors_path + ".tmp"
+    tmp_scales = scales_path + ".tmp" if scales_path else None
+
+    out = np.lib.format.open_memmap(tmp_vectors, mode="w+", dtype=np.dtype(precision), shape=source.shape)
+    out_scales = (
+        np.lib.format.open_memmap(tmp_scales, mode="w+", dtype=np.float32, shape=(source.shape[0],))
+        if tmp_scales else None
+    )
+    for start in range(0, source.shape[0], QUANTIZE_CHUNK_ROWS):
+        stop = start + QUANTIZE_CHUNK_ROWS
+        data, scales = quantize(source[start:stop], precision)
+        out[start:stop] = data
+        if out_scales is not None:
+            out_scales[start:stop] = scales
+    out.flush()
+    del out
+    if out_scales is not None:
+        out_scales.flush()
+        del out_scales
+        os.replace(tmp_scales, scales_path)
+    os.replace(tmp_vectors, vectors_path)
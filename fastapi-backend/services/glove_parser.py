@@ -0,0 +1,167 @@
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Optional, Tuple
+import numpy as np
+
+from services.embedding_store import (
+    EmbeddingStore,
+    LEGACY_CACHE_SUFFIX,
+    read_legacy_cache,
+    remove_derived,
+    store_paths,
+)
+
+# Parse the GloVe text file in parallel, one byte range per task. Each worker
+# parses its lines with a single bulk numeric conversion and writes the rows
+# straight into the memory-mapped output matrix; only words come back.
+TARGET_CHUNK_BYTES = 32 * 1024 * 1024
+SCAN_BLOCK_BYTES = 16 * 1024 * 1024
+
+
+def _line_end(f, offset: int, file_size: int) -> int:
+    """Smallest position >= offset that starts a line"""
+    if offset <= 0:
+        return 0
+    if offset >= file_size:
+        return file_size
+    f.seek(offset - 1)
+    f.readline()
+    return f.tell()
+
+
+def _prefix_bytes(glove_path: str, vocab_size: int) -> int:
+    """Byte length of the first ``vocab_size`` lines"""
+    seen = 0
+    offset = 0
+    with open(glove_path, "rb") as f:
+        while True:
+            block = f.read(SCAN_BLOCK_BYTES)
+            if not block:
+                return offset
+            count = block.count(b"\n")
+            if seen + count >= vocab_size:
+                position = -1
+                for _ in range(vocab_size - seen):
+                    position = block.index(b"\n", position + 1)
+                return offset + position + 1
+            seen += count
+            offset += len(block)
+
+
+def byte_ranges(glove_path: str, chunks: int, limit: Optional[int] = None) -> List[Tuple[int, int]]:
+    """Split the file (or its first ``limit`` bytes) into line-aligned ranges"""
+    file_size = os.path.getsize(glove_path) if limit is None else limit
+    chunks = max(1, min(chunks, file_size // 4096 or 1))
+    with open(glove_path, "rb") as f:
+        bounds = [_line_end(f, file_size * i // chunks, file_size) for i in range(chunks)] + [file_size]
+    return [(start, end) for start, end in zip(bounds, bounds[1:]) if end > start]
+
+
+def _count_lines(args) -> int:
+    glove_path, start, end = args
+    with open(glove_path, "rb") as f:
+        f.seek(start)
+        data = f.read(end - start)
+    return sum(1 for line in data.split(b"\n") if line.strip())
+
+
+def _parse_range(args) -> List[str]:
+    """Parse lines in [start, end) into rows [row_start, ...) of the output matrix"""
+    glove_path, start, end, output_path, row_start = args
+    with open(glove_path, "rb") as f:
+        f.seek(start)
+        text = f.read(end - start).decode("utf-8")
+
+    words = []
+    numbers = []
+    for line in text.split("\n"):
+        # Any run of whitespace separates fields, as with line.split()
+        fields = line.split(None, 1)
+        if not fields:
+            continue
+        words.append(fields[0])
+        numbers.append(fields[1] if len(fields) > 1 else "")
+    if not words:
+        return words
+
+    out = np.load(output_path, mmap_mode="r+")
+    dim = out.shape[1]
+    # One C-level parse for the whole range instead of an np.array per line
+    try:
+        values = np.loadtxt(numbers, dtype=np.float32, delimiter=None, comments=None, ndmin=2)
+    except ValueError as e:
+        raise ValueError(f"Malformed GloVe lines in bytes {start}-{end} of {glove_path}: {e}") from e
+    if values.shape != (len(words), dim):
+        raise ValueError(
+            f"Malformed GloVe lines in bytes {start}-{end} of {glove_path}: "
+            f"expected {len(words)} x {dim} values, got {values.shape}"
+        )
+    out[row_start:row_start + len(words)] = values
+    out.flush()
+    return words
+
+
+def _vector_dim(glove_path: str) -> int:
+    with open(glove_path, "r", encoding="utf-8") as f:
+        return len(f.readline().split()) - 1
+
+
+def parse_glove_parallel(glove_path: str, vocab_size: Optional[int] = None,
+                         workers: Optional[int] = None) -> EmbeddingStore:
+    """
+    Parse a GloVe text file into the binary store across a process pool.
+
+    Writes the matrix and vocabulary next to ``glove_path`` and returns the
+    store memory-mapped (float32).
+    """
+    workers = workers or os.cpu_count() or 1
+    limit = _prefix_bytes(glove_path, vocab_size) if vocab_size else None
+    file_size = os.path.getsize(glove_path) if limit is None else limit
+    chunks = max(workers, -(-file_size // TARGET_CHUNK_BYTES))
+    ranges = byte_ranges(glove_path, chunks, limit)
+    dim = _vector_dim(glove_path)
+
+    vectors_path, vocab_path = store_paths(glove_path)
+    tmp_vectors = vectors_path + ".tmp"
+    tmp_vocab = vocab_path + ".tmp"
+
+    # Spawn rather than fork: this may run on the server's warm-up thread
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context) as pool:
+        counts = list(pool.map(_count_lines, [(glove_path, start, end) for start, end in ranges]))
+        row_starts = np.concatenate([[0], np.cumsum(counts)]).astype(int)
+        out = np.lib.format.open_memmap(tmp_vectors, mode="w+", dtype=np.float32, shape=(int(row_starts[-1]), dim))
+        del out
+
+        tasks = [
+            (glove_path, start, end, tmp_vectors, int(row_start))
+            for (start, end), row_start in zip(ranges, row_starts)
+        ]
+        with open(tmp_vocab, "w", encoding="utf-8") as f:
+            for words in pool.map(_parse_range, tasks):
+                for word in words:
+                    f.write(word)
+                    f.write("\n")
+
+    os.replace(tmp_vectors, vectors_path)
+    os.replace(tmp_vocab, vocab_path)
+    remove_derived(glove_path)
+    return EmbeddingStore.load(glove_path)
+
+
+def build_store(glove_path: str, vocab_size: Optional[int] = None, precision: str = "float32",
+                workers: Optional[int] = None) -> EmbeddingStore:
+    """
+    Build the binary store for ``glove_path`` and return it memory-mapped.
+
+    Prefers the legacy pickle cache when one is present (it is faster to read
+    than the text file), otherwise parses the GloVe text file in parallel.
+    """
+    legacy_cache = glove_path + LEGACY_CACHE_SUFFIX
+    if os.path.exists(legacy_cache) and vocab_size is None:
+        read_legacy_cache(legacy_cache).save(glove_path)
+    else:
+        parse_glove_parallel(glove_path, vocab_size=vocab_size, workers=workers)
+
+    return EmbeddingStore.load(glove_path, precision=precision)
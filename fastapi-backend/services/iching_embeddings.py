@@ -1,185 +1,205 @@
 import numpy as np
-from typing import List, Dict, Tuple
+from functools import lru_cache
+from typing import Callable, List, Dict, Optional, Tuple
 import os
-import pickle
-from tqdm import tqdm
+from services.embedding_store import EmbeddingStore, LEGACY_CACHE_SUFFIX, check_precision, store_exists
+from services.glove_parser import build_store
+from services.metrics import metrics
+from services.query_cache import QueryCache, normalize_query
+from services.subword import DEFAULT_BUCKETS, SubwordTable
+
+# 64 I Ching hexagrams with their names, keywords and Unicode characters
+HEXAGRAMS = [
+    # 1-8
+    (1, "Creative", "creative", "䷀"), (2, "Receptive", "receptive", "䷁"), 
+    (3, "Difficulty at the Beginning", "difficulty", "䷂"), (4, "Youthful Folly", "youthful", "䷃"),
+    (5, "Waiting", "waiting", "䷄"), (6, "Conflict", "conflict", "䷅"),
+    (7, "The Army", "army", "䷆"), (8, "Holding Together", "holding", "䷇"),
+    # 9-16
+    (9, "Small Taming", "small", "䷈"), (10, "Treading", "treading", "䷉"),
+    (11, "Peace", "peace", "䷊"), (12, "Standstill", "standstill", "䷋"),
+    (13, "Fellowship", "fellowship", "䷌"), (14, "Great Possession", "possession", "䷍"),
+    (15, "Modesty", "modesty", "䷎"), (16, "Enthusiasm", "enthusiasm", "䷏"),
+    # 17-24
+    (17, "Following", "following", "䷐"), (18, "Work on the Decayed", "work", "䷑"),
+    (19, "Approach", "approach", "䷒"), (20, "Contemplation", "contemplation", "䷓"),
+    (21, "Biting Through", "biting", "䷔"), (22, "Grace", "grace", "䷕"),
+    (23, "Splitting Apart", "splitting", "䷖"), (24, "Return", "return", "䷗"),
+    # 25-32
+    (25, "Innocence", "innocence", "䷘"), (26, "Great Taming", "taming", "䷙"),
+    (27, "Nourishment", "nourishment", "䷚"), (28, "Great Preponderance", "preponderance", "䷛"),
+    (29, "The Abysmal", "abysmal", "䷜"), (30, "The Clinging", "clinging", "䷝"),
+    (31, "Influence", "influence", "䷞"), (32, "Duration", "duration", "䷟"),
+    # 33-40
+    (33, "Retreat", "retreat", "䷠"), (34, "Great Power", "power", "䷡"),
+    (35, "Progress", "progress", "䷢"), (36, "Darkening of the Light", "darkening", "䷣"),
+    (37, "The Family", "family", "䷤"), (38, "Opposition", "opposition", "䷥"),
+    (39, "Obstruction", "obstruction", "䷦"), (40, "Deliverance", "deliverance", "䷧"),
+    # 41-48
+    (41, "Decrease", "decrease", "䷨"), (42, "Increase", "increase", "䷩"),
+    (43, "Breakthrough", "breakthrough", "䷪"), (44, "Coming to Meet", "meeting", "䷫"),
+    (45, "Gathering Together", "gathering", "䷬"), (46, "Pushing Upward", "pushing", "䷭"),
+    (47, "Exhaustion", "exhaustion", "䷮"), (48, "The Well", "well", "䷯"),
+    # 49-56
+    (49, "Revolution", "revolution", "䷰"), (50, "The Cauldron", "cauldron", "䷱"),
+    (51, "The Arousing", "arousing", "䷲"), (52, "Keeping Still", "keeping", "䷳"),
+    (53, "Development", "development", "䷴"), (54, "The Marrying Maiden", "marrying", "䷵"),
+    (55, "Abundance", "abundance", "䷶"), (56, "The Wanderer", "wanderer", "䷷"),
+    # 57-64
+    (57, "The Gentle", "gentle", "䷸"), (58, "The Joyous", "joyous", "䷹"),
+    (59, "Dispersion", "dispersion", "䷺"), (60, "Limitation", "limitation", "䷻"),
+    (61, "Inner Truth", "truth", "䷼"), (62, "Small Exceeding", "small_exceeding", "䷽"),
+    (63, "After Completion", "completion", "䷾"), (64, "Before Completion", "incompletion", "䷿")
+]
+
+# Extended keywords for each hexagram to capture more semantic meaning
+HEXAGRAM_KEYWORDS = {
+    1: ["creative", "heaven", "strong", "initiating", "yang", "father"],
+    2: ["receptive", "earth", "yielding", "responsive", "yin", "mother"],
+    3: ["difficulty", "beginning", "sprouting", "initial", "struggle"],
+    4: ["youthful", "folly", "inexperience", "learning", "student"],
+    5: ["waiting", "patience", "nourishment", "rain", "delay"],
+    6: ["conflict", "opposition", "litigation", "arguing", "dispute"],
+    7: ["army", "collective", "discipline", "organization", "leadership"],
+    8: ["holding", "together", "unity", "alliance", "cooperation"],
+    9: ["small", "taming", "restraint", "gentle", "accumulation"],
+    10: ["treading", "conduct", "careful", "tiger", "danger"],
+    11: ["peace", "harmony", "prosperity", "communication", "balance"],
+    12: ["standstill", "stagnation", "obstruction", "blocked", "separation"],
+    13: ["fellowship", "community", "people", "harmony", "cooperation"],
+    14: ["possession", "great", "wealth", "abundance", "sovereignty"],
+    15: ["modesty", "humility", "equalizing", "mountain", "earth"],
+    16: ["enthusiasm", "thunder", "movement", "inspiration", "music"],
+    17: ["following", "adapting", "flexibility", "influence", "leadership"],
+    18: ["work", "decay", "corruption", "restoration", "repair"],
+    19: ["approach", "nearing", "advance", "spring", "growth"],
+    20: ["contemplation", "viewing", "observation", "wind", "example"],
+    21: ["biting", "through", "justice", "punishment", "clarity"],
+    22: ["grace", "beauty", "form", "ornament", "mountain"],
+    23: ["splitting", "apart", "decay", "mountain", "stripping"],
+    24: ["return", "turning", "renewal", "winter", "solstice"],
+    25: ["innocence", "unexpected", "natural", "spontaneous", "heaven"],
+    26: ["great", "taming", "restraint", "potential", "mountain"],
+    27: ["nourishment", "jaws", "nutrition", "caring", "mountain"],
+    28: ["preponderance", "great", "excess", "critical", "pressure"],
+    29: ["abysmal", "water", "danger", "pit", "flowing"],
+    30: ["clinging", "fire", "clarity", "dependence", "light"],
+    31: ["influence", "wooing", "attraction", "stimulation", "lake"],
+    32: ["duration", "perseverance", "endurance", "marriage", "thunder"],
+    33: ["retreat", "withdrawal", "yielding", "mountain", "heaven"],
+    34: ["power", "great", "strength", "vigor", "thunder"],
+    35: ["progress", "advancing", "prosperity", "sunrise", "fire"],
+    36: ["darkening", "light", "injury", "hiding", "adversity"],
+    37: ["family", "clan", "home", "relationships", "wind"],
+    38: ["opposition", "contradiction", "misunderstanding", "fire", "lake"],
+    39: ["obstruction", "difficulty", "impediment", "water", "mountain"],
+    40: ["deliverance", "release", "liberation", "thunder", "rain"],
+    41: ["decrease", "loss", "restraint", "mountain", "lake"],
+    42: ["increase", "benefit", "augmenting", "wind", "thunder"],
+    43: ["breakthrough", "determination", "resolution", "lake", "heaven"],
+    44: ["meeting", "encounter", "temptation", "heaven", "wind"],
+    45: ["gathering", "assembly", "accumulation", "lake", "earth"],
+    46: ["pushing", "ascending", "growth", "earth", "wood"],
+    47: ["exhaustion", "oppression", "adversity", "lake", "water"],
+    48: ["well", "source", "unchanging", "water", "wood"],
+    49: ["revolution", "molting", "change", "lake", "fire"],
+    50: ["cauldron", "vessel", "nourishment", "fire", "wood"],
+    51: ["arousing", "shock", "thunder", "movement", "earthquake"],
+    52: ["keeping", "still", "meditation", "mountain", "rest"],
+    53: ["development", "gradual", "progress", "wind", "mountain"],
+    54: ["marrying", "maiden", "subordinate", "thunder", "lake"],
+    55: ["abundance", "fullness", "peak", "thunder", "fire"],
+    56: ["wanderer", "traveler", "stranger", "fire", "mountain"],
+    57: ["gentle", "penetrating", "wind", "influence", "wood"],
+    58: ["joyous", "lake", "pleasure", "satisfaction", "marsh"],
+    59: ["dispersion", "dissolution", "scattering", "wind", "water"],
+    60: ["limitation", "restraint", "articulation", "water", "lake"],
+    61: ["truth", "inner", "sincerity", "wind", "lake"],
+    62: ["small", "exceeding", "preponderance", "thunder", "mountain"],
+    63: ["completion", "after", "equilibrium", "water", "fire"],
+    64: ["incompletion", "before", "transition", "fire", "water"]
+}
 
 class ICHingEmbeddingService:
-    def __init__(self, glove_path="./glove/glove.6B.300d.txt"):
+    def __init__(self, glove_path="./glove/glove.6B.300d.txt", precision=None,
+                 progress: Optional[Callable[[str], None]] = None):
+        # Optional callback told which loading stage is starting
+        report = progress or (lambda stage: None)
+        
         # Initialize with 64 I Ching hexagrams with their names and Unicode characters
-        self.hexagrams = [
-            # 1-8
-            (1, "Creative", "creative", "䷀"), (2, "Receptive", "receptive", "䷁"), 
-            (3, "Difficulty at the Beginning", "difficulty", "䷂"), (4, "Youthful Folly", "youthful", "䷃"),
-            (5, "Waiting", "waiting", "䷄"), (6, "Conflict", "conflict", "䷅"),
-            (7, "The Army", "army", "䷆"), (8, "Holding Together", "holding", "䷇"),
-            # 9-16
-            (9, "Small Taming", "small", "䷈"), (10, "Treading", "treading", "䷉"),
-            (11, "Peace", "peace", "䷊"), (12, "Standstill", "standstill", "䷋"),
-            (13, "Fellowship", "fellowship", "䷌"), (14, "Great Possession", "possession", "䷍"),
-            (15, "Modesty", "modesty", "䷎"), (16, "Enthusiasm", "enthusiasm", "䷏"),
-            # 17-24
-            (17, "Following", "following", "䷐"), (18, "Work on the Decayed", "work", "䷑"),
-            (19, "Approach", "approach", "䷒"), (20, "Contemplation", "contemplation", "䷓"),
-            (21, "Biting Through", "biting", "䷔"), (22, "Grace", "grace", "䷕"),
-            (23, "Splitting Apart", "splitting", "䷖"), (24, "Return", "return", "䷗"),
-            # 25-32
-            (25, "Innocence", "innocence", "䷘"), (26, "Great Taming", "taming", "䷙"),
-            (27, "Nourishment", "nourishment", "䷚"), (28, "Great Preponderance", "preponderance", "䷛"),
-            (29, "The Abysmal", "abysmal", "䷜"), (30, "The Clinging", "clinging", "䷝"),
-            (31, "Influence", "influence", "䷞"), (32, "Duration", "duration", "䷟"),
-            # 33-40
-            (33, "Retreat", "retreat", "䷠"), (34, "Great Power", "power", "䷡"),
-            (35, "Progress", "progress", "䷢"), (36, "Darkening of the Light", "darkening", "䷣"),
-            (37, "The Family", "family", "䷤"), (38, "Opposition", "opposition", "䷥"),
-            (39, "Obstruction", "obstruction", "䷦"), (40, "Deliverance", "deliverance", "䷧"),
-            # 41-48
-            (41, "Decrease", "decrease", "䷨"), (42, "Increase", "increase", "䷩"),
-            (43, "Breakthrough", "breakthrough", "䷪"), (44, "Coming to Meet", "meeting", "䷫"),
-            (45, "Gathering Together", "gathering", "䷬"), (46, "Pushing Upward", "pushing", "䷭"),
-            (47, "Exhaustion", "exhaustion", "䷮"), (48, "The Well", "well", "䷯"),
-            # 49-56
-            (49, "Revolution", "revolution", "䷰"), (50, "The Cauldron", "cauldron", "䷱"),
-            (51, "The Arousing", "arousing", "䷲"), (52, "Keeping Still", "keeping", "䷳"),
-            (53, "Development", "development", "䷴"), (54, "The Marrying Maiden", "marrying", "䷵"),
-            (55, "Abundance", "abundance", "䷶"), (56, "The Wanderer", "wanderer", "䷷"),
-            # 57-64
-            (57, "The Gentle", "gentle", "䷸"), (58, "The Joyous", "joyous", "䷹"),
-            (59, "Dispersion", "dispersion", "䷺"), (60, "Limitation", "limitation", "䷻"),
-            (61, "Inner Truth", "truth", "䷼"), (62, "Small Exceeding", "small_exceeding", "䷽"),
-            (63, "After Completion", "completion", "䷾"), (64, "Before Completion", "incompletion", "䷿")
-        ]
+        self.hexagrams = HEXAGRAMS
         
         # Create lookup dictionaries
         self.hexagram_lookup = {hex_data[2]: (hex_data[0], hex_data[1], hex_data[3]) for hex_data in self.hexagrams}
         
+        # Vector dimension (300 unless the embedding file says otherwise)
+        self.vector_dim = 300
+        
+        # Storage precision of the embedding table: float32, float16 or int8
+        self.precision = check_precision(precision or os.getenv("EMBEDDING_PRECISION", "float32"))
+        
         # Load GloVe embeddings
+        report("loading_embeddings")
         self.glove_embeddings = self._load_glove_embeddings(glove_path)
+        if len(self.glove_embeddings):
+            self.vector_dim = self.glove_embeddings.vector_dim
+        
+        # Hashed character n-gram buckets for deterministic OOV vectors
+        report("loading_subword_table")
+        self.subword_table = self._load_subword_table(glove_path)
+        self._oov_vector = lru_cache(maxsize=int(os.getenv("OOV_CACHE_SIZE", "10000")))(self.subword_table.vector)
+        
+        # LRU cache of process_query results, keyed by normalized query text
+        self.query_cache = QueryCache(
+            max_entries=int(os.getenv("QUERY_CACHE_SIZE", "1024")),
+            max_bytes=int(os.getenv("QUERY_CACHE_MAX_BYTES", str(16 * 1024 * 1024))),
+        )
         
         # Initialize hexagram vectors using GloVe
+        report("building_hexagram_vectors")
         self.hexagram_vectors = self._initialize_hexagram_vectors()
         
-        # Default vector dimension
-        self.vector_dim = 300
+    def _load_glove_embeddings(self, glove_path: str) -> EmbeddingStore:
+        """Load pre-trained GloVe embeddings as a memory-mapped matrix"""
+        # Fast path: binary store already built, open it without reading the matrix
+        if store_exists(glove_path):
+            print(f"Loading GloVe embedding store ({self.precision})...")
+            return EmbeddingStore.load(glove_path, precision=self.precision)
         
-    def _load_glove_embeddings(self, glove_path: str) -> Dict[str, np.ndarray]:
-        """Load pre-trained GloVe embeddings"""
-        cache_path = glove_path + ".cache.pkl"
-        
-        # Check if we have a cached version
-        if os.path.exists(cache_path):
-            print("Loading cached GloVe embeddings...")
-            with open(cache_path, 'rb') as f:
-                return pickle.load(f)
-        
-        # Check if GloVe file exists
-        if not os.path.exists(glove_path):
-            print(f"GloVe file not found at {glove_path}. Using random embeddings as fallback.")
-            return {}
-        
-        print("Loading GloVe embeddings from file...")
-        embeddings = {}
-        
-        with open(glove_path, 'r', encoding='utf-8') as f:
-            for line in tqdm(f, desc="Loading GloVe"):
-                values = line.split()
-                word = values[0]
-                vector = np.array(values[1:], dtype='float32')
-                embeddings[word] = vector
-        
-        # Cache the embeddings
-        print("Caching GloVe embeddings...")
-        with open(cache_path, 'wb') as f:
-            pickle.dump(embeddings, f)
-        
-        return embeddings
+        # Check if GloVe file (or a legacy pickle cache of it) exists
+        if not os.path.exists(glove_path) and not os.path.exists(glove_path + LEGACY_CACHE_SUFFIX):
+            print(f"GloVe file not found at {glove_path}. Using hashed fallback vectors.")
+            return EmbeddingStore.empty(self.vector_dim)
+        
+        # One-off conversion from the legacy pickle cache or the text file
+        print("Building GloVe embedding store...")
+        return build_store(glove_path, precision=self.precision)
+    
+    def _load_subword_table(self, glove_path: str) -> SubwordTable:
+        """Load (or build once) the n-gram bucket table used for OOV words"""
+        if len(self.glove_embeddings) == 0:
+            return SubwordTable.empty(self.vector_dim)
+        buckets = int(os.getenv("SUBWORD_BUCKETS", DEFAULT_BUCKETS))
+        return SubwordTable.load_or_build(glove_path, self.glove_embeddings, buckets=buckets)
     
     def _get_word_vector(self, word: str) -> np.ndarray:
-        """Get GloVe vector for a word, with fallback for OOV words"""
+        """Get GloVe vector for a word (dequantized to float32), with fallback for OOV words"""
         word_lower = word.lower()
         
         if word_lower in self.glove_embeddings:
             return self.glove_embeddings[word_lower]
         
-        # For out-of-vocabulary words, use average of character-level embeddings
-        # or random initialization
-        return np.random.randn(self.vector_dim) * 0.1
+        # For out-of-vocabulary words, average the word's character n-gram
+        # bucket vectors (deterministic, cached per word)
+        return self._oov_vector(word_lower)
     
     def _initialize_hexagram_vectors(self) -> Dict[int, np.ndarray]:
         """Initialize hexagram vectors using GloVe embeddings"""
         vectors = {}
         
-        # Extended keywords for each hexagram to capture more semantic meaning
-        hexagram_keywords = {
-            1: ["creative", "heaven", "strong", "initiating", "yang", "father"],
-            2: ["receptive", "earth", "yielding", "responsive", "yin", "mother"],
-            3: ["difficulty", "beginning", "sprouting", "initial", "struggle"],
-            4: ["youthful", "folly", "inexperience", "learning", "student"],
-            5: ["waiting", "patience", "nourishment", "rain", "delay"],
-            6: ["conflict", "opposition", "litigation", "arguing", "dispute"],
-            7: ["army", "collective", "discipline", "organization", "leadership"],
-            8: ["holding", "together", "unity", "alliance", "cooperation"],
-            9: ["small", "taming", "restraint", "gentle", "accumulation"],
-            10: ["treading", "conduct", "careful", "tiger", "danger"],
-            11: ["peace", "harmony", "prosperity", "communication", "balance"],
-            12: ["standstill", "stagnation", "obstruction", "blocked", "separation"],
-            13: ["fellowship", "community", "people", "harmony", "cooperation"],
-            14: ["possession", "great", "wealth", "abundance", "sovereignty"],
-            15: ["modesty", "humility", "equalizing", "mountain", "earth"],
-            16: ["enthusiasm", "thunder", "movement", "inspiration", "music"],
-            17: ["following", "adapting", "flexibility", "influence", "leadership"],
-            18: ["work", "decay", "corruption", "restoration", "repair"],
-            19: ["approach", "nearing", "advance", "spring", "growth"],
-            20: ["contemplation", "viewing", "observation", "wind", "example"],
-            21: ["biting", "through", "justice", "punishment", "clarity"],
-            22: ["grace", "beauty", "form", "ornament", "mountain"],
-            23: ["splitting", "apart", "decay", "mountain", "stripping"],
-            24: ["return", "turning", "renewal", "winter", "solstice"],
-            25: ["innocence", "unexpected", "natural", "spontaneous", "heaven"],
-            26: ["great", "taming", "restraint", "potential", "mountain"],
-            27: ["nourishment", "jaws", "nutrition", "caring", "mountain"],
-            28: ["preponderance", "great", "excess", "critical", "pressure"],
-            29: ["abysmal", "water", "danger", "pit", "flowing"],
-            30: ["clinging", "fire", "clarity", "dependence", "light"],
-            31: ["influence", "wooing", "attraction", "stimulation", "lake"],
-            32: ["duration", "perseverance", "endurance", "marriage", "thunder"],
-            33: ["retreat", "withdrawal", "yielding", "mountain", "heaven"],
-            34: ["power", "great", "strength", "vigor", "thunder"],
-            35: ["progress", "advancing", "prosperity", "sunrise", "fire"],
-            36: ["darkening", "light", "injury", "hiding", "adversity"],
-            37: ["family", "clan", "home", "relationships", "wind"],
-            38: ["opposition", "contradiction", "misunderstanding", "fire", "lake"],
-            39: ["obstruction", "difficulty", "impediment", "water", "mountain"],
-            40: ["deliverance", "release", "liberation", "thunder", "rain"],
-            41: ["decrease", "loss", "restraint", "mountain", "lake"],
-            42: ["increase", "benefit", "augmenting", "wind", "thunder"],
-            43: ["breakthrough", "determination", "resolution", "lake", "heaven"],
-            44: ["meeting", "encounter", "temptation", "heaven", "wind"],
-            45: ["gathering", "assembly", "accumulation", "lake", "earth"],
-            46: ["pushing", "ascending", "growth", "earth", "wood"],
-            47: ["exhaustion", "oppression", "adversity", "lake", "water"],
-            48: ["well", "source", "unchanging", "water", "wood"],
-            49: ["revolution", "molting", "change", "lake", "fire"],
-            50: ["cauldron", "vessel", "nourishment", "fire", "wood"],
-            51: ["arousing", "shock", "thunder", "movement", "earthquake"],
-            52: ["keeping", "still", "meditation", "mountain", "rest"],
-            53: ["development", "gradual", "progress", "wind", "mountain"],
-            54: ["marrying", "maiden", "subordinate", "thunder", "lake"],
-            55: ["abundance", "fullness", "peak", "thunder", "fire"],
-            56: ["wanderer", "traveler", "stranger", "fire", "mountain"],
-            57: ["gentle", "penetrating", "wind", "influence", "wood"],
-            58: ["joyous", "lake", "pleasure", "satisfaction", "marsh"],
-            59: ["dispersion", "dissolution", "scattering", "wind", "water"],
-            60: ["limitation", "restraint", "articulation", "water", "lake"],
-            61: ["truth", "inner", "sincerity", "wind", "lake"],
-            62: ["small", "exceeding", "preponderance", "thunder", "mountain"],
-            63: ["completion", "after", "equilibrium", "water", "fire"],
-            64: ["incompletion", "before", "transition", "fire", "water"]
-        }
-        
         for hex_id, hex_name, hex_key, hex_unicode in self.hexagrams:
             # Get keywords for this hexagram
-            keywords = hexagram_keywords.get(hex_id, [hex_key])
+            keywords = HEXAGRAM_KEYWORDS.get(hex_id, [hex_key])
             
             # Get vectors for all keywords
             keyword_vectors = []
@@ -194,82 +214,197 @@ class ICHingEmbeddingService:
                 vectors[hex_id] = np.mean(keyword_vectors, axis=0)
             else:
                 vectors[hex_id] = np.random.randn(self.vector_dim) * 0.1
-                
+        
+        self._build_hexagram_matrix(vectors)
         return vectors
     
+    def _build_hexagram_matrix(self, vectors: Dict[int, np.ndarray]):
+        """
+        Stack the hexagram vectors into one pre-normalized matrix with
+        parallel metadata arrays, so scoring is a single matrix-vector product
+        """
+        rows = []
+        for hex_vector in vectors.values():
+            hex_norm = np.linalg.norm(hex_vector)
+            rows.append(hex_vector / hex_norm if hex_norm > 0 else hex_vector)
+        
+        metadata = {hex_data[0]: hex_data for hex_data in self.hexagrams}
+        self.hexagram_ids = np.array(list(vectors.keys()))
+        self.hexagram_names = [metadata[hex_id][1] for hex_id in vectors]
+        self.hexagram_unicodes = [metadata[hex_id][3] for hex_id in vectors]
+        # Normalized in each vector's own dtype (as the per-query loop did), then held as float64
+        self.hexagram_matrix = np.ascontiguousarray(np.stack(rows), dtype=np.float64)
+    
+    def rebuild_hexagram_vectors(self):
+        """Recompute hexagram vectors and invalidate cached query results"""
+        self.hexagram_vectors = self._initialize_hexagram_vectors()
+        self.query_cache.clear()
+    
     def process_query(self, query: str) -> Tuple[List[float], List[Dict]]:
         """
         Process a query string using GloVe embeddings and return both 
         the average vector embedding and the calculated hexagram set
         """
-        # Tokenize query
-        words = query.lower().split()
+        metrics.inc("queries_total")
+        if not self.query_cache.enabled:
+            return self._compute_query(query)
+        
+        key = normalize_query(query)
+        cached = self.query_cache.get(key)
+        if cached is not None:
+            return cached
         
-        # Get vectors for each word
-        word_vectors = []
-        for word in words:
-            vector = self._get_word_vector(word)
-            word_vectors.append(vector)
+        query_vector, hexagram_set = self._compute_query(key)
+        self.query_cache.put(key, query_vector, hexagram_set)
+        return query_vector, hexagram_set
+    
+    def process_queries(self, queries: List[str]) -> List[Tuple[List[float], List[Dict]]]:
+        """
+        Batch version of ``process_query``: results in input order. Cache
+        misses are embedded into one matrix and scored against all hexagrams
+        with a single matrix-matrix product.
+        """
+        metrics.inc("queries_total", len(queries))
+        keys = [normalize_query(query) for query in queries]
+        results = {}
+        if self.query_cache.enabled:
+            for key in dict.fromkeys(keys):
+                cached = self.query_cache.get(key)
+                if cached is not None:
+                    results[key] = cached
+        
+        missing = [key for key in dict.fromkeys(keys) if key not in results]
+        if missing:
+            with metrics.time("batch_embed"):
+                query_matrix = self._embed_batch([key.split() for key in missing])
+            with metrics.time("batch_hexagram_scoring"):
+                hexagram_sets = self._calculate_hexagram_sets(query_matrix)
+            for key, query_vector, hexagram_set in zip(missing, query_matrix, hexagram_sets):
+                results[key] = (query_vector.tolist(), hexagram_set)
+                self.query_cache.put(key, *results[key])
+        
+        # Duplicates in the batch get their own copies
+        output = []
+        handed_out = set()
+        for key in keys:
+            query_vector, hexagram_set = results[key]
+            if key in handed_out:
+                query_vector, hexagram_set = list(query_vector), [dict(h) for h in hexagram_set]
+            handed_out.add(key)
+            output.append((query_vector, hexagram_set))
+        return output
+    
+    def _compute_query(self, query: str) -> Tuple[List[float], List[Dict]]:
+        """Uncached body of ``process_query``"""
+        # Tokenize query into vocabulary row ids (-1 for out-of-vocabulary words)
+        with metrics.time("tokenize"):
+            words = query.lower().split()
+            token_ids = self.glove_embeddings.lookup_ids(words)
         
         # Calculate query vector as average of word vectors
-        if word_vectors:
-            query_vector = np.mean(word_vectors, axis=0)
-        else:
-            query_vector = np.zeros(self.vector_dim)
+        with metrics.time("embed"):
+            query_vector = self._embed_tokens(words, token_ids)
         
         # Calculate hexagram set based on vector similarity
         hexagram_set = self._calculate_hexagram_set(query_vector)
         
         return query_vector.tolist(), hexagram_set
     
+    def _embed_tokens(self, words: List[str], token_ids: np.ndarray) -> np.ndarray:
+        """Average the word vectors for a token id array: one gather plus one reduction"""
+        if token_ids.size == 0:
+            return np.zeros(self.vector_dim)
+        
+        known = token_ids[token_ids >= 0]
+        total = self.glove_embeddings.gather(known).sum(axis=0, dtype=np.float64)
+        metrics.inc("tokens_total", token_ids.size)
+        
+        # Out-of-vocabulary words fall back to their subword vectors
+        if known.size < token_ids.size:
+            metrics.inc("oov_tokens_total", token_ids.size - known.size)
+            for word, token_id in zip(words, token_ids):
+                if token_id < 0:
+                    total += self._oov_vector(word)
+        
+        return total / token_ids.size
+    
+    def _embed_batch(self, tokenized: List[List[str]]) -> np.ndarray:
+        """Query vectors for many token lists: one gather for all tokens, one segmented sum"""
+        lengths = np.array([len(words) for words in tokenized])
+        all_words = [word for words in tokenized for word in words]
+        token_ids = self.glove_embeddings.lookup_ids(all_words)
+        segments = np.repeat(np.arange(len(tokenized)), lengths)
+        
+        totals = np.zeros((len(tokenized), self.vector_dim))
+        known = token_ids >= 0
+        known_counts = np.bincount(segments[known], minlength=len(tokenized))
+        metrics.inc("tokens_total", token_ids.size)
+        metrics.inc("oov_tokens_total", token_ids.size - int(known_counts.sum()))
+        if known.any():
+            gathered = self.glove_embeddings.gather(token_ids[known]).astype(np.float64)
+            starts = np.concatenate([[0], np.cumsum(known_counts)[:-1]])
+            non_empty = known_counts > 0
+            totals[non_empty] = np.add.reduceat(gathered, starts[non_empty], axis=0)
+        
+        # Out-of-vocabulary words fall back to their subword vectors
+        for position in np.flatnonzero(~known):
+            totals[segments[position]] += self._oov_vector(all_words[position])
+        
+        return totals / np.maximum(lengths, 1)[:, None]
+    
+    def _calculate_hexagram_sets(self, query_matrix: np.ndarray, top_k: int = 6) -> List[List[Dict]]:
+        """Batch version of ``_calculate_hexagram_set``: one matrix-matrix product"""
+        norms = np.linalg.norm(query_matrix, axis=1, keepdims=True)
+        normalized = np.divide(query_matrix, norms, out=query_matrix.copy(), where=norms > 0)
+        scores = normalized @ self.hexagram_matrix.T
+        return [self._hexagram_set_from_scores(row, top_k) for row in scores]
+    
     def _calculate_hexagram_set(self, query_vector: np.ndarray, top_k: int = 6) -> List[Dict]:
         """
         Calculate the most relevant hexagrams based on cosine similarity
         Returns top K hexagrams with their similarity scores
         """
-        similarities = []
+        with metrics.time("hexagram_scoring"):
+            # Normalize query vector
+            query_norm = np.linalg.norm(query_vector)
+            if query_norm > 0:
+                query_vector = query_vector / query_norm
+            
+            # Cosine similarity with every hexagram at once (rows are pre-normalized)
+            return self._hexagram_set_from_scores(self.hexagram_matrix @ query_vector, top_k)
+    
+    def _hexagram_set_from_scores(self, scores: np.ndarray, top_k: int) -> List[Dict]:
+        """Top K hexagrams for one row of cosine similarities, with softmax-normalized scores"""
+        top = self._top_k_indices(scores, top_k)
         
-        # Normalize query vector
-        query_norm = np.linalg.norm(query_vector)
-        if query_norm > 0:
-            query_vector = query_vector / query_norm
+        # Apply softmax-like transformation for better score distribution
+        top_scores = scores[top]
+        exp_scores = np.exp(top_scores * 2)  # Scale factor for better distribution
+        normalized_scores = exp_scores / np.sum(exp_scores)
         
-        # Calculate cosine similarity with each hexagram
-        for hex_id, hex_vector in self.hexagram_vectors.items():
-            # Normalize hexagram vector
-            hex_norm = np.linalg.norm(hex_vector)
-            if hex_norm > 0:
-                hex_vector_norm = hex_vector / hex_norm
-            else:
-                hex_vector_norm = hex_vector
-            
-            # Cosine similarity (already normalized)
-            similarity = np.dot(query_vector, hex_vector_norm)
-            
-            # Get hexagram info
-            hex_data = next(h for h in self.hexagrams if h[0] == hex_id)
-            hex_name = hex_data[1]
-            hex_unicode = hex_data[3]
-            
-            similarities.append({
-                "hexagram_id": hex_id,
-                "hexagram_name": hex_name,
-                "hexagram_unicode": hex_unicode,
-                "score": float(similarity)
-            })
-        
-        # Sort by similarity score and return top K
-        similarities.sort(key=lambda x: x["score"], reverse=True)
-        
-        # Normalize scores to 0-1 range (they should already be close due to cosine similarity)
-        # But ensure they're in proper range
-        if similarities:
-            # Apply softmax-like transformation for better score distribution
-            scores = np.array([s["score"] for s in similarities[:top_k]])
-            exp_scores = np.exp(scores * 2)  # Scale factor for better distribution
-            normalized_scores = exp_scores / np.sum(exp_scores)
-            
-            for i, score in enumerate(normalized_scores):
-                similarities[i]["score"] = float(score)
+        return [
+            {
+                "hexagram_id": int(self.hexagram_ids[i]),
+                "hexagram_name": self.hexagram_names[i],
+                "hexagram_unicode": self.hexagram_unicodes[i],
+                "score": float(score)
+            }
+            for i, score in zip(top, normalized_scores)
+        ]
+    
+    @staticmethod
+    def _top_k_indices(scores: np.ndarray, top_k: int) -> np.ndarray:
+        """
+        Indices of the top_k scores, highest first, ties in hexagram order
+        (the same result as a stable descending sort, without sorting all 64)
+        """
+        if top_k <= 0:
+            return np.array([], dtype=np.intp)
+        if top_k >= scores.size:
+            return np.lexsort((np.arange(scores.size), -scores))
         
-        return similarities[:top_k]
\ No newline at end of file
+        partition = np.argpartition(-scores, top_k - 1)[:top_k]
+        # Keep every score tied with the k-th so ties resolve by index
+        candidates = np.flatnonzero(scores >= scores[partition].min())
+        order = np.lexsort((candidates, -scores[candidates]))
+        return candidates[order][:top_k]
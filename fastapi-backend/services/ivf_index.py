@@ -0,0 +1,208 @@
+import os
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+import numpy as np
+
+from services.vector_index import HEXAGRAMS_PER_ROW, QueryVectorIndex, hexagram_ids
+
+# Inverted-file (IVF) index for approximate similar-query search. Stored
+# vectors are clustered around ``n_lists`` centroids with spherical k-means;
+# a search scores the centroids, then scans only the ``nprobe`` closest lists.
+# With nprobe equal to n_lists the search is exact.
+DEFAULT_NPROBE = 8
+TRAIN_SAMPLE_ROWS = 100000
+TRAIN_ITERATIONS = 10
+ASSIGN_BATCH_ROWS = 8192
+INDEX_FILES = ("centroids", "vectors", "ids", "hexagrams", "offsets")
+
+
+def index_paths(index_dir: str) -> dict:
+    return {name: os.path.join(index_dir, f"ivf.{name}.npy") for name in INDEX_FILES}
+
+
+def default_list_count(n_rows: int) -> int:
+    """About 4 * sqrt(n) lists, the usual starting point for IVF"""
+    return int(max(1, min(65536, 4 * np.sqrt(max(n_rows, 1)))))
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return np.divide(vectors, norms, out=np.zeros_like(vectors), where=norms > 0)
+
+
+def assign_lists(vectors: np.ndarray, centroids: np.ndarray, batch_rows: int = ASSIGN_BATCH_ROWS) -> np.ndarray:
+    """Index of the most similar centroid for each (normalized) row"""
+    assignments = np.empty(len(vectors), dtype=np.int64)
+    for start in range(0, len(vectors), batch_rows):
+        batch = vectors[start:start + batch_rows]
+        assignments[start:start + len(batch)] = np.argmax(batch @ centroids.T, axis=1)
+    return assignments
+
+
+def train_centroids(sample: np.ndarray, n_lists: int, iterations: int = TRAIN_ITERATIONS,
+                    seed: int = 0) -> np.ndarray:
+    """Spherical k-means over normalized rows; empty lists are re-seeded from random rows"""
+    rng = np.random.default_rng(seed)
+    n_lists = min(n_lists, len(sample))
+    centroids = sample[rng.choice(len(sample), n_lists, replace=False)].copy()
+    for _ in range(iterations):
+        assignments = assign_lists(sample, centroids)
+        # Group rows by list and sum each group with one reduceat
+        order = np.argsort(assignments, kind="stable")
+        lists, first = np.unique(assignments[order], return_index=True)
+        sums = np.zeros_like(centroids)
+        sums[lists] = np.add.reduceat(sample[order], first, axis=0)
+        empty = np.setdiff1d(np.arange(n_lists), lists)
+        sums[empty] = sample[rng.choice(len(sample), len(empty), replace=False)]
+        centroids = _normalize(sums)
+    return centroids
+
+
+class IVFIndex:
+    """
+    Inverted-file index over stored query vectors.
+
+    Each list is a QueryVectorIndex, so appends and searches within a list
+    behave exactly like the flat index, hexagram filter included; new rows go
+    to their nearest centroid. ``max_id`` is the largest id held, so rows
+    inserted after an offline build can be caught up from the database at
+    startup.
+    """
+
+    def __init__(self, centroids: np.ndarray, nprobe: int = DEFAULT_NPROBE):
+        self.centroids = np.ascontiguousarray(centroids, dtype=np.float32)
+        self.n_lists, self.vector_dim = self.centroids.shape
+        self.nprobe = nprobe
+        self.lists = [QueryVectorIndex(self.vector_dim, capacity=1) for _ in range(self.n_lists)]
+        self.skipped = 0
+
+    def __len__(self) -> int:
+        return sum(len(inverted_list) for inverted_list in self.lists)
+
+    @property
+    def nbytes(self) -> int:
+        return self.centroids.nbytes + sum(inverted_list.nbytes for inverted_list in self.lists)
+
+    @property
+    def max_id(self) -> int:
+        return max((inverted_list.max_id for inverted_list in self.lists), default=0)
+
+    @classmethod
+    def build(cls, ids: np.ndarray, vectors: np.ndarray, hexagrams: Optional[np.ndarray] = None,
+              n_lists: Optional[int] = None, sample_rows: int = TRAIN_SAMPLE_ROWS,
+              iterations: int = TRAIN_ITERATIONS, nprobe: int = DEFAULT_NPROBE, seed: int = 0) -> "IVFIndex":
+        """Train centroids on a sample of ``vectors`` and assign every row (and its (rows, 6) hexagram ids) to a list"""
+        vectors = _normalize(vectors)
+        ids = np.asarray(ids, dtype=np.int64)
+        if hexagrams is None:
+            hexagrams = np.zeros((len(ids), HEXAGRAMS_PER_ROW), dtype=np.uint8)
+        if len(ids) == 0:
+            raise ValueError("Cannot build an IVF index from an empty queries table")
+        n_lists = n_lists or default_list_count(len(ids))
+        rng = np.random.default_rng(seed)
+        sample = vectors if len(vectors) <= sample_rows else vectors[rng.choice(len(vectors), sample_rows, replace=False)]
+
+        index = cls(train_centroids(sample, n_lists, iterations, seed), nprobe=nprobe)
+        index._add_grouped(ids, vectors, np.asarray(hexagrams, dtype=np.uint8), assign_lists(vectors, index.centroids))
+        return index
+
+    def _add_grouped(self, ids: np.ndarray, normalized: np.ndarray, hexagrams: np.ndarray, assignments: np.ndarray):
+        order = np.argsort(assignments, kind="stable")
+        lists, first = np.unique(assignments[order], return_index=True)
+        for list_id, rows in zip(lists, np.split(order, first[1:])):
+            self.lists[list_id].add_normalized(ids[rows], normalized[rows], hexagrams[rows])
+
+    def add(self, query_id: int, vector: Sequence[float], hexagram_set: Optional[Sequence[Dict]] = None):
+        self.add_many([query_id], [vector], [hexagram_set])
+
+    def add_many(self, ids: Sequence[int], vectors: Iterable[Sequence[float]],
+                 hexagram_sets: Optional[Iterable[Optional[Sequence[Dict]]]] = None):
+        """Append rows to their nearest lists; vectors of the wrong dimension are counted in ``skipped``"""
+        if hexagram_sets is None:
+            hexagram_sets = [None] * len(ids)
+        kept_ids, kept_vectors, kept_hexagrams = [], [], []
+        for query_id, vector, hexagram_set in zip(ids, vectors, hexagram_sets):
+            if len(vector) != self.vector_dim:
+                self.skipped += 1
+                continue
+            kept_ids.append(query_id)
+            kept_vectors.append(vector)
+            row = hexagram_ids(hexagram_set)
+            kept_hexagrams.append(row + [0] * (HEXAGRAMS_PER_ROW - len(row)))
+        if not kept_ids:
+            return
+        normalized = _normalize(kept_vectors)
+        self._add_grouped(np.asarray(kept_ids, dtype=np.int64), normalized,
+                          np.array(kept_hexagrams, dtype=np.uint8), assign_lists(normalized, self.centroids))
+
+    def load(self, rows: Iterable[Tuple], batch_rows: int = 10000):
+        """Append (id, vector) or (id, vector, hexagram_set) rows from an iterator, e.g. a streaming DB query"""
+        ids, vectors, hexagram_sets = [], [], []
+        for row in rows:
+            ids.append(row[0])
+            vectors.append(row[1])
+            hexagram_sets.append(row[2] if len(row) > 2 else None)
+            if len(ids) >= batch_rows:
+                self.add_many(ids, vectors, hexagram_sets)
+                ids, vectors, hexagram_sets = [], [], []
+        self.add_many(ids, vectors, hexagram_sets)
+
+    def search(self, vector: Sequence[float], limit: int, nprobe: Optional[int] = None,
+               query_hexagrams: Sequence[int] = (), min_shared: int = 0,
+               required_hexagrams: Sequence[int] = ()) -> List[Tuple[int, float]]:
+        """
+        (id, cosine similarity) of the ``limit`` most similar rows in the ``nprobe``
+        closest lists; the hexagram filter is applied within each probed list.
+        """
+        query = _normalize(np.asarray(vector, dtype=np.float32).reshape(1, -1))[0]
+        nprobe = min(max(nprobe or self.nprobe, 1), self.n_lists)
+        centroid_scores = self.centroids @ query
+        if nprobe < self.n_lists:
+            probed = np.argpartition(-centroid_scores, nprobe - 1)[:nprobe]
+        else:
+            probed = np.arange(self.n_lists)
+
+        matches = [
+            match
+            for list_id in probed
+            for match in self.lists[list_id].search_normalized(query, limit, query_hexagrams, min_shared,
+                                                               required_hexagrams)
+        ]
+        # Best score first, ties by id (insertion order), matching the flat index
+        matches.sort(key=lambda match: (-match[1], match[0]))
+        return matches[:limit]
+
+    def save(self, index_dir: str):
+        """Write centroids and lists (concatenated, with offsets) as .npy files"""
+        os.makedirs(index_dir, exist_ok=True)
+        snapshots = [inverted_list.snapshot() for inverted_list in self.lists]
+        arrays = {
+            "hexagrams": np.concatenate([
+                inverted_list.hexagram_snapshot()[:len(ids)] for inverted_list, (_, ids) in zip(self.lists, snapshots)
+            ]),
+            "centroids": self.centroids,
+            "vectors": np.concatenate([vectors for vectors, _ in snapshots]),
+            "ids": np.concatenate([ids for _, ids in snapshots]),
+            "offsets": np.concatenate([[0], np.cumsum([len(ids) for _, ids in snapshots])]).astype(np.int64),
+        }
+        for name, path in index_paths(index_dir).items():
+            with open(path + ".tmp", "wb") as f:
+                np.save(f, arrays[name])
+            os.replace(path + ".tmp", path)
+
+    @staticmethod
+    def exists(index_dir: str) -> bool:
+        return all(os.path.exists(path) for path in index_paths(index_dir).values())
+
+    @classmethod
+    def load_files(cls, index_dir: str, nprobe: int = DEFAULT_NPROBE) -> "IVFIndex":
+        paths = index_paths(index_dir)
+        vectors = np.load(paths["vectors"], mmap_mode="r")
+        ids = np.load(paths["ids"])
+        hexagrams = np.load(paths["hexagrams"])
+        offsets = np.load(paths["offsets"])
+        index = cls(np.load(paths["centroids"]), nprobe=nprobe)
+        for list_id, (start, stop) in enumerate(zip(offsets, offsets[1:])):
+            index.lists[list_id] = QueryVectorIndex(index.vector_dim, capacity=stop - start)
+            index.lists[list_id].add_normalized(ids[start:stop], vectors[start:stop], hexagrams[start:stop])
+        return index
@@ -0,0 +1,168 @@
+import bisect
+import os
+import threading
+import time
+from collections import deque
+from typing import Callable, Dict, List, Optional, Tuple
+
+# In-process metrics for the query pipeline, rendered in the Prometheus text
+# format by GET /metrics. Recording only appends to a deque (atomic, no lock);
+# samples are folded into the histograms in batches, and at scrape time.
+# METRICS_ENABLED=0 turns it off.
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "1") not in ("0", "false", "no")
+
+# Stage latency bucket upper bounds, in seconds (50 µs to 10 s)
+LATENCY_BUCKETS = (0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01,
+                   0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+PREFIX = "iching_"
+
+# Pending samples are folded into the histograms once this many have queued
+FOLD_SAMPLES = 4096
+
+COUNTERS = {
+    "queries_total": "Queries embedded and scored (cache hits included)",
+    "tokens_total": "Tokens embedded",
+    "oov_tokens_total": "Tokens missing from the embedding vocabulary",
+    "similar_rows_scanned_total": "Stored query vectors scored by similar search",
+}
+
+
+def _number(value: float) -> str:
+    return str(value) if isinstance(value, int) else f"{value:.9g}"
+
+
+class _Histogram:
+    __slots__ = ("buckets", "sum", "count")
+
+    def __init__(self, size: int):
+        self.buckets = [0] * size
+        self.sum = 0.0
+        self.count = 0
+
+
+class _Timer:
+    __slots__ = ("metrics", "stage", "start")
+
+    def __init__(self, metrics: "Metrics", stage: str):
+        self.metrics = metrics
+        self.stage = stage
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        samples = self.metrics._samples
+        samples.append((self.stage, time.perf_counter() - self.start))
+        if len(samples) > FOLD_SAMPLES:
+            self.metrics._fold()
+        return False
+
+
+class _NullTimer:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_TIMER = _NullTimer()
+
+
+class Metrics:
+    """
+    Per-stage latency histograms, counters and callback gauges.
+
+    ``with metrics.time("stage"):`` records a duration, ``inc`` adds to a
+    counter from ``COUNTERS`` and ``gauge`` registers a function read at
+    scrape time (so gauges cost nothing on the request path).
+    """
+
+    def __init__(self, enabled: bool = METRICS_ENABLED, buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        self.enabled = enabled
+        self.bounds = list(buckets)
+        self._stages: Dict[str, _Histogram] = {}
+        self._counters: Dict[str, float] = {name: 0 for name in COUNTERS}
+        self._gauges: Dict[str, Tuple[str, Callable[[], Optional[float]]]] = {}
+        # (stage, seconds) samples and (counter, amount) increments not folded in yet
+        self._samples = deque()
+        self._increments = deque()
+        self._lock = threading.Lock()
+
+    def time(self, stage: str):
+        return _Timer(self, stage) if self.enabled else _NULL_TIMER
+
+    def observe(self, stage: str, seconds: float):
+        if self.enabled:
+            self._samples.append((stage, seconds))
+            if len(self._samples) > FOLD_SAMPLES:
+                self._fold()
+
+    def inc(self, name: str, amount: float = 1):
+        if self.enabled:
+            self._increments.append((name, amount))
+            if len(self._increments) > FOLD_SAMPLES:
+                self._fold()
+
+    def _fold(self):
+        """Move pending samples into the histograms and counters"""
+        with self._lock:
+            # popleft() is atomic, so samples appended meanwhile are never lost
+            for _ in range(len(self._increments)):
+                name, amount = self._increments.popleft()
+                self._counters[name] += amount
+            for _ in range(len(self._samples)):
+                stage, seconds = self._samples.popleft()
+                histogram = self._stages.get(stage)
+                if histogram is None:
+                    histogram = self._stages[stage] = _Histogram(len(self.bounds) + 1)
+                histogram.buckets[bisect.bisect_left(self.bounds, seconds)] += 1
+                histogram.sum += seconds
+                histogram.count += 1
+
+    def gauge(self, name: str, help_text: str, read: Callable[[], Optional[float]]):
+        """Register (or replace) a gauge; ``read`` returns its value, or None to leave it out"""
+        self._gauges[name] = (help_text, read)
+
+    def render(self) -> str:
+        """All metrics in the Prometheus text exposition format (version 0.0.4)"""
+        self._fold()
+        with self._lock:
+            stages = {stage: (list(h.buckets), h.sum, h.count) for stage, h in self._stages.items()}
+            counters = dict(self._counters)
+
+        lines: List[str] = [
+            f"# HELP {PREFIX}stage_seconds Time spent in each query pipeline stage",
+            f"# TYPE {PREFIX}stage_seconds histogram",
+        ]
+        for stage in sorted(stages):
+            buckets, total, count = stages[stage]
+            cumulative = 0
+            for bound, bucket in zip(self.bounds, buckets):
+                cumulative += bucket
+                lines.append(f'{PREFIX}stage_seconds_bucket{{stage="{stage}",le="{bound:g}"}} {cumulative}')
+            lines.append(f'{PREFIX}stage_seconds_bucket{{stage="{stage}",le="+Inf"}} {count}')
+            lines.append(f'{PREFIX}stage_seconds_sum{{stage="{stage}"}} {total:.9g}')
+            lines.append(f'{PREFIX}stage_seconds_count{{stage="{stage}"}} {count}')
+
+        for name, help_text in COUNTERS.items():
+            lines.append(f"# HELP {PREFIX}{name} {help_text}")
+            lines.append(f"# TYPE {PREFIX}{name} counter")
+            lines.append(f"{PREFIX}{name} {_number(counters[name])}")
+
+        for name, (help_text, read) in sorted(self._gauges.items()):
+            value = read()
+            if value is None:
+                continue
+            lines.append(f"# HELP {PREFIX}{name} {help_text}")
+            lines.append(f"# TYPE {PREFIX}{name} gauge")
+            lines.append(f"{PREFIX}{name} {_number(value)}")
+        return "\n".join(lines) + "\n"
+
+
+# Process-wide registry
+metrics = Metrics()
@@ -0,0 +1,94 @@
+import sys
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+
+
+def normalize_query(query: str) -> str:
+    """Cache key: the query as the service tokenizes it (lower-cased, whitespace-collapsed)"""
+    return " ".join(query.lower().split())
+
+
+def _hexagram_set_bytes(hexagram_set: List[Dict]) -> int:
+    return sum(
+        sys.getsizeof(entry) + sum(sys.getsizeof(value) for value in entry.values())
+        for entry in hexagram_set
+    )
+
+
+class QueryCache:
+    """
+    Thread-safe LRU cache of ``process_query`` results.
+
+    Bounded both by entry count and by an estimate of the bytes held; the
+    least recently used entries are evicted when either limit is exceeded.
+    A ``max_entries`` of 0 disables caching.
+    """
+
+    def __init__(self, max_entries: int = 1024, max_bytes: int = 16 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.bytes = 0
+        self._entries: "OrderedDict[str, Tuple[np.ndarray, List[Dict], int]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0 and self.max_bytes > 0
+
+    def get(self, key: str) -> Optional[Tuple[List[float], List[Dict]]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+        vector, hexagram_set, _ = entry
+        # Hand out copies so callers can't alter the cached result
+        return vector.tolist(), [dict(h) for h in hexagram_set]
+
+    def put(self, key: str, query_vector: List[float], hexagram_set: List[Dict]):
+        if not self.enabled:
+            return
+        vector = np.asarray(query_vector, dtype=np.float64)
+        stored_set = [dict(h) for h in hexagram_set]
+        size = sys.getsizeof(key) + vector.nbytes + _hexagram_set_bytes(stored_set)
+        if size > self.max_bytes:
+            return
+
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self.bytes -= previous[2]
+            self._entries[key] = (vector, stored_set, size)
+            self.bytes += size
+            while len(self._entries) > self.max_entries or self.bytes > self.max_bytes:
+                _, (_, _, evicted_size) = self._entries.popitem(last=False)
+                self.bytes -= evicted_size
+                self.evictions += 1
+
+    def clear(self):
+        """Drop all entries (e.g. after hexagram vectors are rebuilt); counters are kept"""
+        with self._lock:
+            self._entries.clear()
+            self.bytes = 0
+
+    def stats(self) -> Dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "enabled": self.enabled,
+                "entries": len(self._entries),
+                "bytes": self.bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
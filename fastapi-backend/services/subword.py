@@ -0,0 +1,113 @@
+import os
+import zlib
+from typing import List, Optional
+import numpy as np
+from tqdm import tqdm
+
+from services.embedding_store import EmbeddingStore, store_paths
+
+# Deterministic vectors for out-of-vocabulary words, fastText style: a word's
+# character n-grams are hashed into a fixed number of buckets, and each bucket
+# holds the mean GloVe vector of the in-vocabulary words that contain it.
+# crc32 is used instead of hash() so buckets agree across processes/restarts.
+DEFAULT_BUCKETS = 32768
+DEFAULT_VOCAB_LIMIT = 100000
+MIN_N = 3
+MAX_N = 5
+BUILD_CHUNK_WORDS = 2000
+
+
+def subword_table_path(glove_path: str, buckets: int) -> str:
+    return f"{glove_path}.subwords.{buckets}.npy"
+
+
+def char_ngrams(word: str, min_n: int = MIN_N, max_n: int = MAX_N) -> List[str]:
+    """Character n-grams of ``<word>``, the angle brackets marking word boundaries"""
+    marked = f"<{word}>"
+    return [
+        marked[i:i + n]
+        for n in range(min_n, max_n + 1)
+        for i in range(len(marked) - n + 1)
+    ]
+
+
+def ngram_buckets(word: str, buckets: int) -> np.ndarray:
+    """Bucket ids of the word's character n-grams"""
+    marked = f"<{word}>"
+    if marked.isascii():
+        # Byte slices of an ASCII word are its character n-grams, without re-encoding each one
+        data = marked.encode("ascii")
+        hashes = [
+            zlib.crc32(data[i:i + n])
+            for n in range(MIN_N, MAX_N + 1)
+            for i in range(len(data) - n + 1)
+        ]
+    else:
+        hashes = [zlib.crc32(gram.encode("utf-8")) for gram in char_ngrams(word)]
+    return np.array(hashes, dtype=np.int64) % buckets
+
+
+def build_subword_table(store: EmbeddingStore, buckets: int = DEFAULT_BUCKETS,
+                        vocab_limit: Optional[int] = DEFAULT_VOCAB_LIMIT) -> np.ndarray:
+    """Mean word vector per n-gram bucket over the first ``vocab_limit`` words"""
+    n_words = len(store) if vocab_limit is None else min(len(store), vocab_limit)
+    sums = np.zeros((buckets, store.vector_dim), dtype=np.float64)
+    counts = np.zeros(buckets, dtype=np.int64)
+
+    for start in tqdm(range(0, n_words, BUILD_CHUNK_WORDS), desc="Building subword table"):
+        stop = min(start + BUILD_CHUNK_WORDS, n_words)
+        per_word = [ngram_buckets(word, buckets) for word in store.words[start:stop]]
+        rows = np.repeat(np.arange(start, stop), [len(b) for b in per_word])
+        bucket_ids = np.concatenate(per_word)
+
+        # Group by bucket and add each group with one reduceat
+        order = np.argsort(bucket_ids, kind="stable")
+        bucket_ids = bucket_ids[order]
+        unique, first = np.unique(bucket_ids, return_index=True)
+        sums[unique] += np.add.reduceat(store.gather(rows[order]), first, axis=0)
+        counts[unique] += np.diff(np.append(first, len(bucket_ids)))
+
+    filled = counts > 0
+    sums[filled] /= counts[filled, None]
+    return sums.astype(np.float32)
+
+
+class SubwordTable:
+    """Fixed-size table of n-gram bucket vectors used to embed OOV words"""
+
+    def __init__(self, table: np.ndarray):
+        self.table = table
+        self.buckets, self.vector_dim = table.shape
+        self.filled = np.abs(table).sum(axis=1) > 0
+
+    @classmethod
+    def load_or_build(cls, glove_path: str, store: EmbeddingStore, buckets: int = DEFAULT_BUCKETS,
+                      vocab_limit: Optional[int] = DEFAULT_VOCAB_LIMIT) -> "SubwordTable":
+        """Open the cached table for ``glove_path``, building it on first use"""
+        path = subword_table_path(glove_path, buckets)
+        if not os.path.exists(path):
+            # Always derive buckets from the float32 matrix, whatever precision is served
+            source = EmbeddingStore.load(glove_path) if os.path.exists(store_paths(glove_path)[0]) else store
+            table = build_subword_table(source, buckets, vocab_limit)
+            with open(path + ".tmp", "wb") as f:
+                np.save(f, table)
+            os.replace(path + ".tmp", path)
+        return cls(np.load(path, mmap_mode="r"))
+
+    @classmethod
+    def empty(cls, vector_dim: int = 300) -> "SubwordTable":
+        return cls(np.zeros((1, vector_dim), dtype=np.float32))
+
+    def vector(self, word: str) -> np.ndarray:
+        """
+        Mean of the word's filled n-gram buckets. Words sharing no n-gram with
+        the vocabulary get a small pseudo-random vector seeded by the word, so
+        the result is still the same on every call, worker and restart.
+        """
+        bucket_ids = ngram_buckets(word, self.buckets)
+        bucket_ids = bucket_ids[self.filled[bucket_ids]]
+        if bucket_ids.size:
+            return np.add.reduce(self.table[bucket_ids], axis=0) / np.float32(bucket_ids.size)
+
+        rng = np.random.default_rng(zlib.crc32(word.encode("utf-8")))
+        return (rng.standard_normal(self.vector_dim) * 0.1).astype(np.float32)
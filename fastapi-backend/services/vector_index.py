@@ -0,0 +1,227 @@
+import threading
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+import numpy as np
+
+from services.metrics import metrics
+
+INITIAL_CAPACITY = 1024
+LOAD_BATCH_ROWS = 10000
+HEXAGRAMS_PER_ROW = 6
+HEXAGRAM_COUNT = 64
+# Candidate sets above 1/GATHER_FRACTION of the rows are scored with a full pass
+GATHER_FRACTION = 4
+
+
+def hexagram_ids(hexagram_set: Optional[Iterable[Dict]]) -> List[int]:
+    """Hexagram ids of a stored ``hexagram_set`` (list of {"hexagram_id", ...} dicts)"""
+    return [int(entry["hexagram_id"]) for entry in hexagram_set or []][:HEXAGRAMS_PER_ROW]
+
+
+class QueryVectorIndex:
+    """
+    In-memory matrix of all stored query vectors for similar-query search.
+
+    Rows are L2-normalized float32 in one contiguous array (grown by doubling)
+    with a parallel id array, so a search is one matrix-vector product plus
+    ``argpartition``. Appends happen under a lock and only write past the
+    current size, so searches can run on a snapshot without locking.
+
+    Each row's hexagram ids are kept too, with an inverted index from
+    hexagram id to row positions, so a search can score only the rows that
+    share hexagrams with the query or contain given hexagrams.
+    """
+
+    def __init__(self, vector_dim: int = 300, capacity: int = INITIAL_CAPACITY):
+        self.vector_dim = vector_dim
+        capacity = max(capacity, 1)
+        self._vectors = np.zeros((capacity, vector_dim), dtype=np.float32)
+        self._ids = np.zeros(capacity, dtype=np.int64)
+        # Hexagram ids per row, 0 where a row has fewer than six
+        self._hexagrams = np.zeros((capacity, HEXAGRAMS_PER_ROW), dtype=np.uint8)
+        # Inverted index: hexagram id -> positions of the rows containing it
+        self._postings = [np.zeros(0, dtype=np.int64) for _ in range(HEXAGRAM_COUNT + 1)]
+        self._posting_sizes = np.zeros(HEXAGRAM_COUNT + 1, dtype=np.int64)
+        self.size = 0
+        self.skipped = 0
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return self.size
+
+    @property
+    def nbytes(self) -> int:
+        return (self._vectors.nbytes + self._ids.nbytes + self._hexagrams.nbytes
+                + sum(postings.nbytes for postings in self._postings))
+
+    @property
+    def max_id(self) -> int:
+        with self._lock:
+            return int(self._ids[:self.size].max()) if self.size else 0
+
+    def snapshot(self) -> Tuple[np.ndarray, np.ndarray]:
+        """Views of the (normalized vectors, ids) currently held"""
+        with self._lock:
+            return self._vectors[:self.size], self._ids[:self.size]
+
+    def hexagram_snapshot(self) -> np.ndarray:
+        """View of the (rows, 6) hexagram ids currently held, aligned with ``snapshot``"""
+        with self._lock:
+            return self._hexagrams[:self.size]
+
+    def _normalize(self, vectors: np.ndarray) -> np.ndarray:
+        vectors = np.asarray(vectors, dtype=np.float32).reshape(-1, self.vector_dim)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return np.divide(vectors, norms, out=np.zeros_like(vectors), where=norms > 0)
+
+    def add(self, query_id: int, vector: Sequence[float], hexagram_set: Optional[Sequence[Dict]] = None):
+        self.add_many([query_id], [vector], [hexagram_set])
+
+    def add_many(self, ids: Sequence[int], vectors: Iterable[Sequence[float]],
+                 hexagram_sets: Optional[Iterable[Optional[Sequence[Dict]]]] = None):
+        """Append rows; vectors of the wrong dimension are counted in ``skipped``"""
+        self.add_normalized(*self._filter_dims(ids, vectors, hexagram_sets))
+
+    def _filter_dims(self, ids, vectors, hexagram_sets=None) -> Tuple[List[int], np.ndarray, np.ndarray]:
+        if hexagram_sets is None:
+            hexagram_sets = [None] * len(ids)
+        kept_ids, kept_vectors, kept_hexagrams = [], [], []
+        for query_id, vector, hexagram_set in zip(ids, vectors, hexagram_sets):
+            if len(vector) != self.vector_dim:
+                self.skipped += 1
+                continue
+            kept_ids.append(query_id)
+            kept_vectors.append(vector)
+            row = hexagram_ids(hexagram_set)
+            kept_hexagrams.append(row + [0] * (HEXAGRAMS_PER_ROW - len(row)))
+        if not kept_ids:
+            return [], np.zeros((0, self.vector_dim), dtype=np.float32), np.zeros((0, HEXAGRAMS_PER_ROW), dtype=np.uint8)
+        return kept_ids, self._normalize(kept_vectors), np.array(kept_hexagrams, dtype=np.uint8)
+
+    def add_normalized(self, ids: Sequence[int], normalized: np.ndarray, hexagrams: Optional[np.ndarray] = None):
+        """Append rows that are already L2-normalized float32, with optional (rows, 6) hexagram ids"""
+        if len(ids) == 0:
+            return
+        if hexagrams is None:
+            hexagrams = np.zeros((len(ids), HEXAGRAMS_PER_ROW), dtype=np.uint8)
+        with self._lock:
+            needed = self.size + len(ids)
+            if needed > len(self._ids):
+                capacity = max(needed, 2 * len(self._ids))
+                vectors_grown = np.zeros((capacity, self.vector_dim), dtype=np.float32)
+                ids_grown = np.zeros(capacity, dtype=np.int64)
+                hexagrams_grown = np.zeros((capacity, HEXAGRAMS_PER_ROW), dtype=np.uint8)
+                vectors_grown[:self.size] = self._vectors[:self.size]
+                ids_grown[:self.size] = self._ids[:self.size]
+                hexagrams_grown[:self.size] = self._hexagrams[:self.size]
+                self._vectors, self._ids, self._hexagrams = vectors_grown, ids_grown, hexagrams_grown
+            self._vectors[self.size:needed] = normalized
+            self._ids[self.size:needed] = ids
+            self._hexagrams[self.size:needed] = hexagrams
+            self._add_postings(np.asarray(hexagrams, dtype=np.uint8), self.size)
+            self.size = needed
+
+    def _add_postings(self, hexagrams: np.ndarray, first_position: int):
+        # Group (hexagram, position) pairs by hexagram and append each group to its postings
+        rows, columns = np.nonzero(hexagrams)
+        if rows.size == 0:
+            return
+        keys = hexagrams[rows, columns].astype(np.int64)
+        order = np.argsort(keys, kind="stable")
+        keys, positions = keys[order], rows[order] + first_position
+        unique, first = np.unique(keys, return_index=True)
+        for hexagram, group in zip(unique, np.split(positions, first[1:])):
+            size = self._posting_sizes[hexagram]
+            postings = self._postings[hexagram]
+            if size + len(group) > len(postings):
+                grown = np.zeros(max(size + len(group), 2 * len(postings), 16), dtype=np.int64)
+                grown[:size] = postings[:size]
+                self._postings[hexagram] = postings = grown
+            postings[size:size + len(group)] = group
+            self._posting_sizes[hexagram] = size + len(group)
+
+    def load(self, rows: Iterable[Tuple], batch_rows: int = LOAD_BATCH_ROWS):
+        """Append (id, vector) or (id, vector, hexagram_set) rows from an iterator, e.g. a streaming DB query"""
+        ids, vectors, hexagram_sets = [], [], []
+        for row in rows:
+            ids.append(row[0])
+            vectors.append(row[1])
+            hexagram_sets.append(row[2] if len(row) > 2 else None)
+            if len(ids) >= batch_rows:
+                self.add_many(ids, vectors, hexagram_sets)
+                ids, vectors, hexagram_sets = [], [], []
+        self.add_many(ids, vectors, hexagram_sets)
+
+    def candidates(self, size: int, query_hexagrams: Sequence[int] = (), min_shared: int = 0,
+                   required_hexagrams: Sequence[int] = ()) -> Optional[np.ndarray]:
+        """
+        Positions (below ``size``) sharing at least ``min_shared`` of ``query_hexagrams``
+        and containing every id in ``required_hexagrams``; None when nothing filters.
+        """
+        query_hexagrams = sorted(set(query_hexagrams))
+        required_hexagrams = sorted(set(required_hexagrams))
+        with self._lock:
+            postings = {
+                hexagram: self._postings[hexagram][:self._posting_sizes[hexagram]]
+                for hexagram in query_hexagrams + required_hexagrams
+                if 0 < hexagram <= HEXAGRAM_COUNT
+            }
+
+        def counts(hexagrams):
+            # Each row holds a hexagram at most once, so one pass per posting list counts matches
+            shared = np.zeros(size, dtype=np.uint8)
+            for hexagram in hexagrams:
+                positions = postings.get(hexagram, np.zeros(0, dtype=np.int64))
+                shared[positions[positions < size]] += 1
+            return shared
+
+        keep = None
+        if min_shared > 0:
+            keep = counts(query_hexagrams) >= min_shared
+        if required_hexagrams:
+            required = counts(required_hexagrams) == len(required_hexagrams)
+            keep = required if keep is None else keep & required
+        return None if keep is None else np.flatnonzero(keep)
+
+    def search(self, vector: Sequence[float], limit: int, nprobe: Optional[int] = None,
+               query_hexagrams: Sequence[int] = (), min_shared: int = 0,
+               required_hexagrams: Sequence[int] = ()) -> List[Tuple[int, float]]:
+        """
+        (id, cosine similarity) of the ``limit`` most similar rows, best first.
+
+        Always exact (nprobe is ignored). With ``min_shared`` or
+        ``required_hexagrams`` only rows passing the hexagram filter are scored.
+        """
+        return self.search_normalized(self._normalize(vector)[0], limit, query_hexagrams, min_shared,
+                                      required_hexagrams)
+
+    def search_normalized(self, query: np.ndarray, limit: int, query_hexagrams: Sequence[int] = (),
+                          min_shared: int = 0, required_hexagrams: Sequence[int] = ()) -> List[Tuple[int, float]]:
+        matrix, ids = self.snapshot()
+        size = len(ids)
+        if size == 0 or limit <= 0:
+            return []
+
+        positions = self.candidates(size, query_hexagrams, min_shared, required_hexagrams)
+        if positions is None:
+            scores = matrix @ query
+            metrics.inc("similar_rows_scanned_total", size)
+        elif positions.size * GATHER_FRACTION < size:
+            # Few candidates: copy out and score only those rows
+            scores, ids = matrix[positions] @ query, ids[positions]
+            metrics.inc("similar_rows_scanned_total", positions.size)
+        else:
+            # Many candidates: one pass over every row is cheaper than copying them out
+            scores, ids = (matrix @ query)[positions], ids[positions]
+            metrics.inc("similar_rows_scanned_total", size)
+        size = len(ids)
+        if size == 0:
+            return []
+
+        if limit < size:
+            partition = np.argpartition(-scores, limit - 1)[:limit]
+            # Keep every score tied with the last one so ties resolve by insertion order
+            top = np.flatnonzero(scores >= scores[partition].min())
+        else:
+            top = np.arange(size)
+        top = top[np.lexsort((top, -scores[top]))][:limit]
+        return [(int(ids[i]), float(scores[i])) for i in top]
@@ -0,0 +1,110 @@
+import threading
+import time
+import traceback
+from typing import Callable, Dict, Optional
+
+from services.iching_embeddings import ICHingEmbeddingService
+
+
+class EmbeddingWarmup:
+    """
+    Builds the ``ICHingEmbeddingService`` on a background thread.
+
+    The web server can accept connections immediately; request handlers ask
+    ``service`` for the model and get ``None`` until loading has finished.
+    A failed load is retried ``retries`` times, ``retry_delay`` seconds later
+    and twice as long after each further failure (at most ``max_retry_delay``),
+    before the status becomes "failed" for good.
+    """
+
+    def __init__(self, factory: Callable[..., ICHingEmbeddingService], retries: int = 3,
+                 retry_delay: float = 2.0, max_retry_delay: float = 60.0):
+        self.factory = factory
+        self.retries = max(0, retries)
+        self.retry_delay = retry_delay
+        self.max_retry_delay = max_retry_delay
+        self.service: Optional[ICHingEmbeddingService] = None
+        self.status = "pending"
+        self.stage: Optional[str] = None
+        self.error: Optional[str] = None
+        self.attempts = 0
+        self.created_at = time.monotonic()
+        self.started_at: Optional[float] = None
+        self.ready_at: Optional[float] = None
+        self.retry_at: Optional[float] = None
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    @property
+    def ready(self) -> bool:
+        return self.service is not None
+
+    @property
+    def failed(self) -> bool:
+        """True once every attempt has failed"""
+        return self.status == "failed"
+
+    def retry_in(self) -> Optional[float]:
+        """Seconds until the next attempt while waiting to retry, else None"""
+        if self.retry_at is None:
+            return None
+        return max(0.0, self.retry_at - time.monotonic())
+
+    def start(self):
+        """Start loading in a daemon thread (no-op if already started)"""
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self.run, name="embedding-warmup", daemon=True)
+            self._thread.start()
+
+    def run(self):
+        """Load the service on the calling thread, retrying failed attempts"""
+        self.started_at = time.monotonic()
+        delay = self.retry_delay
+        while True:
+            self.status = "loading"
+            self.attempts += 1
+            try:
+                service = self.factory(progress=self._set_stage)
+                break
+            except Exception:
+                self.error = traceback.format_exc(limit=3)
+            if self.attempts > self.retries:
+                self.status = "failed"
+                print(f"Embedding warm-up failed after {self.attempts} attempts:\n{self.error}")
+                return
+            self.status = "retrying"
+            self.stage = None
+            self.retry_at = time.monotonic() + delay
+            print(f"Embedding warm-up failed (attempt {self.attempts}), retrying in {delay:g}s:\n{self.error}")
+            time.sleep(delay)
+            self.retry_at = None
+            delay = min(delay * 2, self.max_retry_delay)
+        self.stage = None
+        self.error = None
+        self.ready_at = time.monotonic()
+        self.service = service
+        self.status = "ready"
+        print(f"Embedding service ready after {self.ready_at - self.started_at:.2f}s")
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        if self._thread is not None:
+            self._thread.join(timeout)
+        return self.ready
+
+    def _set_stage(self, stage: str):
+        self.stage = stage
+
+    def snapshot(self) -> Dict:
+        """Readiness report for the API"""
+        now = time.monotonic()
+        report = {"status": self.status, "stage": self.stage, "attempts": self.attempts}
+        if self.started_at is not None:
+            report["loading_seconds"] = round((self.ready_at or now) - self.started_at, 3)
+        if self.error:
+            report["error"] = self.error.strip().splitlines()[-1]
+        retry_in = self.retry_in()
+        if retry_in is not None:
+            report["retry_in_seconds"] = round(retry_in, 3)
+        return report
@@ -10,4 +10,8 @@ pip3 install -r requirements.txt
 echo "Checking for GloVe embeddings..."
 python3 download_glove.py
 
+# Build the memory-mapped embedding store so the API starts quickly
+echo "Building GloVe embedding store..."
+python3 convert_glove.py
+
 echo "Setup complete!"
\ No newline at end of file
@@ -0,0 +1,78 @@
+import os
+import sys
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+# Modules are imported from fastapi-backend/ as the app does; database.py
+# must not pick up a DATABASE_URL from .env, so tests build their own engines
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ["DATABASE_URL"] = "sqlite://"
+
+
+@pytest.fixture
+def engine(tmp_path):
+    """A fresh SQLite file database with the app's tables"""
+    import models
+    from database import Base
+
+    engine = create_engine(f"sqlite:///{tmp_path / 'test.db'}", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=engine)
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def session_factory(engine):
+    return sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+
+@pytest.fixture
+def db(session_factory):
+    session = session_factory()
+    yield session
+    session.close()
+
+
+@pytest.fixture
+def client(db):
+    """TestClient for main.app reading and writing through ``db``"""
+    from fastapi.testclient import TestClient
+    import main
+    from database import get_db
+
+    main.app.dependency_overrides[get_db] = lambda: db
+    # No context manager: the lifespan (embedding warm-up) is not needed to read queries
+    yield TestClient(main.app)
+    main.app.dependency_overrides.clear()
+
+
+@pytest.fixture(scope="session")
+def glove_path(tmp_path_factory):
+    """A small synthetic GloVe file (50-d) whose vocabulary includes every hexagram keyword"""
+    from benchmarks.synthetic import write_synthetic_glove
+    from services.iching_embeddings import HEXAGRAM_KEYWORDS
+
+    keywords = [word for words in HEXAGRAM_KEYWORDS.values() for word in words]
+    return write_synthetic_glove(str(tmp_path_factory.mktemp("glove") / "glove.txt"), vocab_size=2000, dim=50,
+                                 extra_words=keywords)
+
+
+@pytest.fixture
+def embedding_service(glove_path):
+    """A fresh ICHingEmbeddingService (empty query cache) over the synthetic GloVe file"""
+    from services.iching_embeddings import ICHingEmbeddingService
+
+    return ICHingEmbeddingService(glove_path)
+
+
+def make_query(text="question", vector_dim=300, hexagram_ids=(1, 2, 3, 4, 5, 6), **columns):
+    """An unsaved Query row with a constant vector and a descending-score hexagram set"""
+    import models
+
+    hexagram_set = [
+        {"hexagram_id": hexagram_id, "hexagram_name": "name", "hexagram_unicode": "?", "score": 0.5 - 0.05 * rank}
+        for rank, hexagram_id in enumerate(hexagram_ids)
+    ]
+    return models.Query(query=text, query_vector=[0.1] * vector_dim, hexagram_set=hexagram_set, **columns)
@@ -0,0 +1,63 @@
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.pool import NullPool
+
+QUESTIONS = ["peace and harmony", "how do I begin a new venture", "conflict at work", "patience"]
+
+
+@pytest.fixture
+def async_client(engine, session_factory, client, monkeypatch, embedding_service):
+    """TestClient for async_main.app on the same database file as ``client`` (main.app)"""
+    import async_main
+    import main
+    from async_database import get_async_db
+    from services.vector_index import QueryVectorIndex
+
+    # NullPool: no connection outlives the TestClient's event loop
+    async_engine = create_async_engine(f"sqlite+aiosqlite:///{engine.url.database}", poolclass=NullPool)
+    sessions = async_sessionmaker(async_engine, expire_on_commit=False)
+
+    async def get_test_db():
+        async with sessions() as db:
+            yield db
+
+    async_main.app.dependency_overrides[get_async_db] = get_test_db
+    monkeypatch.setattr(main.embedding_warmup, "service", embedding_service)
+    monkeypatch.setattr(main, "query_index", QueryVectorIndex(vector_dim=embedding_service.vector_dim))
+    monkeypatch.setattr("export.SessionLocal", session_factory)
+    yield TestClient(async_main.app)
+    async_main.app.dependency_overrides.clear()
+
+
+def test_async_routes_match_the_sync_app(async_client, client):
+    created = async_client.post("/queries/", json={"query": QUESTIONS[0]})
+    batch = async_client.post("/queries/batch", json={"queries": [{"query": question} for question in QUESTIONS[1:]]})
+    assert created.status_code == batch.status_code == 200
+    assert [item["id"] for item in [created.json()] + batch.json()] == [1, 2, 3, 4]
+
+    # Both apps read the same rows back the same way
+    for path, params in (("/queries/", {"limit": 2}), ("/queries/", {"order": "desc", "fields": "id,query"}),
+                         ("/queries/3", {}), ("/queries/search/similar", {"query": "harmony", "limit": 3}),
+                         ("/queries/search/similar", {"query": "work", "min_shared_hexagrams": 2}),
+                         ("/hexagrams/stats", {}), ("/hexagrams/stats", {"period": "month", "series": True})):
+        async_response, sync_response = async_client.get(path, params=params), client.get(path, params=params)
+        assert async_response.status_code == sync_response.status_code == 200, path
+        assert async_response.json() == sync_response.json(), (path, params)
+        assert async_response.headers.get("Link") == sync_response.headers.get("Link")
+    assert created.json() == client.get("/queries/1").json()
+    assert batch.json() == [client.get(f"/queries/{query_id}").json() for query_id in (2, 3, 4)]
+
+    assert async_client.get("/queries/99").status_code == 404
+    assert async_client.get("/queries/", params={"cursor": "nope"}).status_code == 400
+
+
+def test_shared_routes(async_client):
+    async_client.post("/queries/", json={"query": QUESTIONS[0]})
+
+    assert len(async_client.get("/hexagrams/").json()) == 64
+    assert async_client.get("/ready").status_code == 200
+    assert async_client.get("/cache/queries").json()["entries"] == 1
+    assert "iching_queries_total" in async_client.get("/metrics").text
+    export = async_client.get("/queries/export").text.splitlines()
+    assert len(export) == 1 and QUESTIONS[0] in export[0]
@@ -0,0 +1,63 @@
+import pytest
+
+import models
+
+QUESTIONS = ["Peace and harmony", "how do I begin a new venture", "peace  AND harmony", "zyxquorble water fire",
+             "how do I begin a new venture", "patience"]
+
+
+@pytest.fixture
+def reference(glove_path):
+    """A second service: per-query results computed independently of the one under test"""
+    from services.iching_embeddings import ICHingEmbeddingService
+
+    return ICHingEmbeddingService(glove_path)
+
+
+def assert_same_result(result, expected):
+    (vector, hexagram_set), (expected_vector, expected_set) = result, expected
+    assert vector == pytest.approx(expected_vector, abs=1e-5)
+    assert [h["hexagram_id"] for h in hexagram_set] == [h["hexagram_id"] for h in expected_set]
+    assert [h["score"] for h in hexagram_set] == pytest.approx([h["score"] for h in expected_set], abs=1e-5)
+
+
+def test_process_queries_matches_process_query(embedding_service, reference):
+    embedding_service.process_query("patience")  # one cached, the rest embedded together
+    results = embedding_service.process_queries(QUESTIONS)
+
+    assert len(results) == len(QUESTIONS)
+    for question, result in zip(QUESTIONS, results):
+        assert_same_result(result, reference.process_query(question))
+
+    # Duplicates (after normalization) are equal but not shared
+    assert results[0] == results[2] and results[1] == results[4]
+    results[2][0][0] = results[2][1][0]["score"] = 99.0
+    assert results[0][0][0] != 99.0 and results[0][1][0]["score"] != 99.0
+
+
+def test_batch_endpoint(client, db, monkeypatch, embedding_service, reference):
+    import main
+    from services.vector_index import QueryVectorIndex
+
+    main.app.dependency_overrides[main.get_embedding_service] = lambda: embedding_service
+    monkeypatch.setattr(main, "query_index", QueryVectorIndex(vector_dim=embedding_service.vector_dim))
+
+    response = client.post("/queries/batch", json={"queries": [{"query": question} for question in QUESTIONS]})
+    assert response.status_code == 200
+    items = response.json()
+
+    # One stored row per input, duplicates included, returned in input order
+    assert [item["query"] for item in items] == QUESTIONS
+    assert [item["id"] for item in items] == list(range(1, len(QUESTIONS) + 1))
+    assert all(item["created_at"] for item in items)
+    assert db.query(models.Query).count() == len(QUESTIONS) and len(main.query_index) == len(QUESTIONS)
+    for question, item in zip(QUESTIONS, items):
+        assert_same_result((item["query_vector"], item["hexagram_set"]), reference.process_query(question))
+
+
+def test_batch_size_is_bounded(client, embedding_service):
+    import main
+
+    main.app.dependency_overrides[main.get_embedding_service] = lambda: embedding_service
+    assert client.post("/queries/batch", json={"queries": []}).status_code == 422
+    assert client.post("/queries/batch", json={"queries": [{"query": "q"}] * 1001}).status_code == 422
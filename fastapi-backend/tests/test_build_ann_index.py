@@ -0,0 +1,31 @@
+from build_ann_index import read_vectors, stored_vector_dim
+from conftest import make_query
+
+
+def test_read_vectors_uses_the_stored_dimension(db):
+    db.add_all([make_query("old", vector_dim=300), make_query("a", vector_dim=50), make_query("b", vector_dim=50)])
+    db.commit()
+
+    assert stored_vector_dim(db) == 50
+    ids, vectors, hexagrams = read_vectors(db)
+
+    assert ids.tolist() == [2, 3]
+    assert vectors.shape == (2, 50)
+    assert hexagrams[0].tolist()[:6] == [1, 2, 3, 4, 5, 6]
+
+
+def test_read_vectors_with_explicit_dimension(db):
+    db.add_all([make_query("old", vector_dim=300), make_query("new", vector_dim=50)])
+    db.commit()
+
+    ids, vectors, _ = read_vectors(db, vector_dim=300)
+
+    assert ids.tolist() == [1]
+    assert vectors.shape == (1, 300)
+
+
+def test_read_vectors_on_empty_table(db):
+    ids, vectors, _ = read_vectors(db)
+
+    assert len(ids) == 0
+    assert vectors.shape == (0, 300)
@@ -0,0 +1,67 @@
+import numpy as np
+import pytest
+
+from services.embedding_store import EmbeddingStore, dequantize, quantize, quantized_paths, write_quantized
+
+QUESTIONS = ["peace and harmony", "how do I begin a new venture", "conflict with a friend", "patience before success"]
+
+
+@pytest.fixture
+def vectors():
+    rows = np.random.default_rng(0).standard_normal((500, 50)).astype(np.float32) * 0.4
+    rows[7] = 0.0  # an all-zero row has scale 0
+    return rows
+
+
+def test_float16_round_trip(vectors):
+    data, scales = quantize(vectors, "float16")
+    assert data.dtype == np.float16 and scales is None
+
+    restored = dequantize(data, scales)
+    assert restored.dtype == np.float32
+    # Half precision keeps 11 significant bits
+    assert np.all(np.abs(restored - vectors) <= np.abs(vectors) * 2.0 ** -11)
+
+
+def test_int8_round_trip(vectors):
+    data, scales = quantize(vectors, "int8")
+    assert data.dtype == np.int8 and scales.shape == (500,)
+
+    restored = dequantize(data, scales)
+    # Each value is off by at most half a step, and a step is 1/127 of the row's largest value
+    row_max = np.abs(vectors).max(axis=1)
+    assert np.all(np.abs(restored - vectors).max(axis=1) <= row_max / 254 * (1 + 1e-5))
+    np.testing.assert_array_equal(restored[7], 0.0)
+
+
+@pytest.mark.parametrize("precision", ["float16", "int8"])
+def test_write_quantized_matches_quantize(tmp_path, monkeypatch, vectors, precision):
+    monkeypatch.setattr("services.embedding_store.QUANTIZE_CHUNK_ROWS", 128)  # several chunks
+    glove_path = str(tmp_path / "glove.txt")
+    EmbeddingStore([f"w{i}" for i in range(500)], vectors).save(glove_path)
+
+    write_quantized(glove_path, precision)
+    data, scales = quantize(vectors, precision)
+    vectors_path, scales_path = quantized_paths(glove_path, precision)
+    np.testing.assert_array_equal(np.load(vectors_path), data)
+    if scales is not None:
+        np.testing.assert_array_equal(np.load(scales_path), scales)
+
+    store = EmbeddingStore.load(glove_path, precision)
+    assert store.precision == precision
+    np.testing.assert_array_equal(store["w3"], dequantize(data[3], None if scales is None else scales[3]))
+
+
+@pytest.mark.parametrize("precision", ["float16", "int8"])
+def test_hexagram_ranking_unchanged(glove_path, precision):
+    from services.iching_embeddings import ICHingEmbeddingService
+
+    full = ICHingEmbeddingService(glove_path, precision="float32")
+    reduced = ICHingEmbeddingService(glove_path, precision=precision)
+    assert reduced.glove_embeddings.precision == precision
+
+    for question in QUESTIONS:
+        full_vector, full_set = full.process_query(question)
+        vector, hexagram_set = reduced.process_query(question)
+        assert [h["hexagram_id"] for h in hexagram_set] == [h["hexagram_id"] for h in full_set]
+        assert vector == pytest.approx(full_vector, abs=0.01)
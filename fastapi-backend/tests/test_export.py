@@ -0,0 +1,84 @@
+import base64
+import csv
+import io
+import json
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytest
+
+from conftest import make_query
+from export import export_queries
+
+START = datetime(2025, 1, 1, 12, 0, 0)
+COUNT = 7
+
+
+@pytest.fixture
+def rows(db, session_factory, monkeypatch):
+    """COUNT stored queries a minute apart, with the export reading through the test database"""
+    monkeypatch.setattr("export.SessionLocal", session_factory)
+    # Commas, quotes and newlines in the text must survive both formats
+    queries = [make_query(f'q{i}, "quoted"\n', vector_dim=4, hexagram_ids=(i + 1, 64 - i),
+                          created_at=START + timedelta(minutes=i))
+               for i in range(COUNT)]
+    for i, query in enumerate(queries):
+        query.query_vector = [i, 0.5, -1.25, 2.0]
+    db.add_all(queries)
+    db.commit()
+    return queries
+
+
+def expected_row(query):
+    return {"id": query.id, "query": query.query, "hexagram_set": query.hexagram_set,
+            "created_at": query.created_at.isoformat()}
+
+
+def test_ndjson_export(client, rows):
+    response = client.get("/queries/export", params={"vector": "list"})
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-ndjson"
+    assert response.headers["X-Vector-Encoding"] == "list"
+
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert lines == [{**expected_row(query), "query_vector": np.asarray(query.query_vector).tolist()}
+                     for query in rows]
+
+
+def test_csv_export(client, rows):
+    response = client.get("/queries/export", params={"format": "csv", "vector": "base64"})
+    assert response.headers["content-type"].startswith("text/csv")
+    assert response.headers["X-Vector-Encoding"] == "base64 little-endian float32"
+
+    records = list(csv.DictReader(io.StringIO(response.text)))
+    assert list(records[0]) == ["id", "query", "hexagram_set", "created_at", "query_vector"]
+    assert len(records) == COUNT
+    for record, query in zip(records, rows):
+        vector = np.frombuffer(base64.b64decode(record.pop("query_vector")), dtype="<f4")
+        np.testing.assert_array_equal(vector, query.query_vector)
+        record["id"] = int(record["id"])
+        record["hexagram_set"] = json.loads(record["hexagram_set"])
+        assert record == expected_row(query)
+
+
+def test_date_range(client, rows):
+    params = {"start": (START + timedelta(minutes=2)).isoformat(), "end": (START + timedelta(minutes=5)).isoformat()}
+    lines = [json.loads(line) for line in client.get("/queries/export", params=params).text.splitlines()]
+    assert [line["id"] for line in lines] == [3, 4, 5]
+    assert "query_vector" not in lines[0]
+
+
+@pytest.mark.parametrize("export_format", ["ndjson", "csv"])
+def test_every_batch_is_streamed(rows, export_format):
+    chunks = list(export_queries(export_format, batch_rows=3))
+    assert len(chunks) == 3
+    body = b"".join(chunks).decode()
+    if export_format == "csv":
+        assert [int(record["id"]) for record in csv.DictReader(io.StringIO(body))] == list(range(1, COUNT + 1))
+    else:
+        assert [json.loads(line)["id"] for line in body.splitlines()] == list(range(1, COUNT + 1))
+
+
+def test_empty_csv_has_a_header(db, session_factory, monkeypatch):
+    monkeypatch.setattr("export.SessionLocal", session_factory)
+    assert b"".join(export_queries("csv")) == b"id,query,hexagram_set,created_at\n"
@@ -0,0 +1,59 @@
+import numpy as np
+import pytest
+
+from services.glove_parser import _count_lines, _parse_range, parse_glove_parallel
+
+# Real GloVe dumps have lines with doubled, trailing and tab separators
+GLOVE_TEXT = (
+    "the 0.1 0.2 0.3\n"
+    "of  0.4 0.5  0.6 \n"
+    "and 0.7\t0.8 0.9\r\n"
+    "\n"
+    "to -1 -2 -3\n"
+)
+EXPECTED_WORDS = ["the", "of", "and", "to"]
+EXPECTED = np.array([[0.1, 0.2, 0.3], [0.4, 0.5, 0.6], [0.7, 0.8, 0.9], [-1, -2, -3]], dtype=np.float32)
+
+
+def baseline_parse(path):
+    """The original line.split() loader"""
+    with open(path, encoding="utf-8") as f:
+        rows = [line.split() for line in f if line.strip()]
+    return [row[0] for row in rows], np.array([row[1:] for row in rows], dtype=np.float32)
+
+
+@pytest.fixture
+def glove_path(tmp_path):
+    path = tmp_path / "glove.txt"
+    path.write_bytes(GLOVE_TEXT.encode())
+    return str(path)
+
+
+def test_parse_range_accepts_irregular_whitespace(glove_path, tmp_path):
+    size = len(GLOVE_TEXT.encode())
+    assert _count_lines((glove_path, 0, size)) == len(EXPECTED_WORDS)
+    output = str(tmp_path / "out.npy")
+    np.lib.format.open_memmap(output, mode="w+", dtype=np.float32, shape=EXPECTED.shape)
+
+    words = _parse_range((glove_path, 0, size, output, 0))
+
+    assert words == EXPECTED_WORDS
+    np.testing.assert_array_equal(np.load(output), EXPECTED)
+
+
+def test_parallel_parse_matches_baseline_parser(glove_path):
+    store = parse_glove_parallel(glove_path, workers=1)
+
+    words, vectors = baseline_parse(glove_path)
+    assert store.words == words
+    np.testing.assert_array_equal(np.asarray(store.vectors), vectors)
+
+
+def test_parse_range_rejects_missing_values(tmp_path):
+    path = tmp_path / "glove.txt"
+    path.write_bytes(b"the 0.1 0.2 0.3\nof 0.4 0.5\n")
+    output = str(tmp_path / "out.npy")
+    np.lib.format.open_memmap(output, mode="w+", dtype=np.float32, shape=(2, 3))
+
+    with pytest.raises(ValueError, match="Malformed GloVe lines"):
+        _parse_range((str(path), 0, path.stat().st_size, output, 0))
@@ -0,0 +1,82 @@
+import threading
+
+import pytest
+from sqlalchemy import create_engine, func, select
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+import models
+from conftest import make_query
+from group_commit import GroupCommitWriter
+
+
+def stored_queries(session_factory):
+    with session_factory() as db:
+        return db.scalars(select(models.Query.query).order_by(models.Query.id)).all()
+
+
+@pytest.mark.parametrize("durability", ["commit", "flush"])
+def test_concurrent_submits(session_factory, durability):
+    committed = []
+    writer = GroupCommitWriter(session_factory, max_rows=8, max_delay_ms=20, durability=durability,
+                               on_commit=committed.extend)
+    writer.start()
+    futures = {}
+
+    def client(n):
+        for i in range(10):
+            text = f"client {n} row {i}"
+            futures[text] = writer.submit(make_query(text, vector_dim=4))
+
+    threads = [threading.Thread(target=client, args=(n,)) for n in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    rows = {text: future.result(timeout=10) for text, future in futures.items()}
+    writer.stop()
+
+    assert all(row.query == text and row.created_at is not None for text, row in rows.items())
+    assert len({row.id for row in rows.values()}) == 80
+    assert sorted(stored_queries(session_factory)) == sorted(rows)
+    assert len(committed) == 80
+    assert writer.rows == 80
+    with session_factory() as db:
+        # Each row counted into hexagram_stats once, in the transaction that stored it
+        assert db.scalar(select(func.sum(models.HexagramStat.top1_count))
+                         .where(models.HexagramStat.period == "day")) == 80
+
+
+def test_failing_row_fails_only_its_batch(session_factory):
+    writer = GroupCommitWriter(session_factory, max_rows=3)
+    # Queued before the thread starts, so batches are exactly [a, broken, b] and [c]
+    futures = [writer.submit(make_query(text, vector_dim=4)) for text in ("a", None, "b", "c")]
+    writer.start()
+    writer.stop()
+
+    for future in futures[:3]:
+        with pytest.raises(Exception, match="NOT NULL"):
+            future.result(timeout=10)
+    assert futures[3].result(timeout=10).query == "c"
+    assert stored_queries(session_factory) == ["c"]
+    assert writer.stats()["batches"] == 1
+
+
+def test_stop_drains_the_queue(session_factory):
+    writer = GroupCommitWriter(session_factory, max_rows=4, max_delay_ms=1000)
+    writer.start()
+    futures = [writer.submit(make_query(f"row {i}", vector_dim=4)) for i in range(10)]
+    writer.stop()
+
+    assert all(future.done() for future in futures)
+    assert [future.result().query for future in futures] == [f"row {i}" for i in range(10)]
+    assert stored_queries(session_factory) == [f"row {i}" for i in range(10)]
+
+
+def test_flush_durability_needs_a_pooled_engine():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    static = sessionmaker(bind=engine)
+    with pytest.raises(ValueError, match="StaticPool"):
+        GroupCommitWriter(static, durability="flush")
+    GroupCommitWriter(static, durability="commit")
+    engine.dispose()
@@ -0,0 +1,69 @@
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import select
+
+import models
+from conftest import make_query
+from hexagram_stats import read_stats, rebuild, record_queries
+
+START = datetime(2025, 1, 31, 20, 0, 0)  # a Friday
+
+
+def stat_rows(db):
+    stat = models.HexagramStat
+    return [tuple(row) for row in db.execute(
+        select(stat.period, stat.bucket_start, stat.hexagram_id, stat.top1_count, stat.top6_count, stat.score_sum)
+        .order_by(stat.period, stat.bucket_start, stat.hexagram_id))]
+
+
+def insert(db, queries):
+    """As the insert paths do: flush, count into hexagram_stats, commit"""
+    db.add_all(queries)
+    db.flush()
+    record_queries(db, queries)
+    db.commit()
+
+
+@pytest.fixture
+def stats_client(client, monkeypatch, embedding_service):
+    import main
+    from services.vector_index import QueryVectorIndex
+
+    main.app.dependency_overrides[main.get_embedding_service] = lambda: embedding_service
+    monkeypatch.setattr(main, "query_index", QueryVectorIndex(vector_dim=embedding_service.vector_dim))
+    return client
+
+
+def test_incremental_stats_equal_a_rebuild(db, stats_client):
+    # Rows over day, week and month boundaries, in several transactions, plus the API insert paths
+    for batch in range(4):
+        insert(db, [make_query(f"q{batch}-{i}", vector_dim=4,
+                               hexagram_ids=[(batch * 7 + i * 5 + k) % 64 + 1 for k in range(6)],
+                               created_at=START + timedelta(hours=30 * batch + i)) for i in range(5)])
+    insert(db, [make_query("empty set", vector_dim=4, hexagram_ids=())])
+    assert stats_client.post("/queries/", json={"query": "peace and harmony"}).status_code == 200
+    payload = {"queries": [{"query": "new venture"}, {"query": "patience"}] * 2}
+    assert stats_client.post("/queries/batch", json=payload).status_code == 200
+
+    incremental = stat_rows(db)
+    assert {period for period, *_ in incremental} == {"day", "week", "month"}
+    assert rebuild(db) == 26
+    rebuilt = stat_rows(db)
+    assert [row[:5] for row in rebuilt] == [row[:5] for row in incremental]
+    assert [row[5] for row in rebuilt] == pytest.approx([row[5] for row in incremental])
+
+
+def test_default_window_includes_new_rows(db, stats_client):
+    before = datetime.utcnow().replace(microsecond=0)
+    stats_client.post("/queries/batch", json={"queries": [{"query": "peace"}, {"query": "conflict"}]})
+    stats_client.post("/queries/", json={"query": "patience"})
+
+    # created_at is UTC from the app, on the same clock read_stats' default window uses
+    created = db.scalars(select(models.Query.created_at)).all()
+    assert all(before <= created_at <= datetime.utcnow() for created_at in created)
+    for period in ("day", "week", "month"):
+        report = read_stats(db, period)
+        assert report["start"] <= before.date() < report["end"]
+        assert sum(entry["top1_count"] for entry in report["hexagrams"]) == 3
+    assert sum(entry["top6_count"] for entry in stats_client.get("/hexagrams/stats").json()["hexagrams"]) == 18
@@ -0,0 +1,75 @@
+import numpy as np
+import pytest
+
+from services.ivf_index import IVFIndex
+
+DIM = 50
+
+
+def clustered_vectors(count, clusters=32, seed=0):
+    """Rows scattered around ``clusters`` random directions, as real query embeddings are"""
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((clusters, DIM))
+    return (centers[rng.integers(clusters, size=count)] + 0.6 * rng.standard_normal((count, DIM))).astype(np.float32)
+
+
+def exact_search(vectors, vector, limit):
+    """Brute-force (id, cosine) ranking; ids are 1-based row numbers"""
+    scores = vectors @ vector / (np.linalg.norm(vectors, axis=1) * np.linalg.norm(vector))
+    return [(int(i) + 1, float(scores[i])) for i in np.argsort(-scores, kind="stable")[:limit]]
+
+
+@pytest.fixture(scope="module")
+def vectors():
+    return clustered_vectors(3000)
+
+
+@pytest.fixture
+def index(vectors):
+    return IVFIndex.build(np.arange(1, len(vectors) + 1), vectors, n_lists=32, nprobe=4)
+
+
+def test_recall_at_fixed_nprobe(vectors, index):
+    queries = clustered_vectors(50, seed=1)
+    recall = np.mean([
+        len({query_id for query_id, _ in index.search(query, 10, nprobe=8)}
+            & {query_id for query_id, _ in exact_search(vectors, query, 10)}) / 10
+        for query in queries
+    ])
+    assert recall >= 0.9
+    # Probing every list is exact
+    for query in queries[:5]:
+        found = index.search(query, 10, nprobe=index.n_lists)
+        assert [query_id for query_id, _ in found] == [query_id for query_id, _ in exact_search(vectors, query, 10)]
+
+
+def test_add_many_makes_new_rows_searchable(index):
+    new_vectors = clustered_vectors(20, seed=2)
+    index.add_many(list(range(5001, 5021)), new_vectors.tolist(), [None] * 20)
+    assert len(index) == 3020 and index.max_id == 5020
+    for query_id, vector in zip(range(5001, 5021), new_vectors):
+        # The new row sits in its nearest list, which the nearest-centroid probe always scans
+        assert index.search(vector, 1, nprobe=1)[0][0] == query_id
+
+
+def test_save_and_load_files(tmp_path, vectors, index):
+    index.save(str(tmp_path))
+    assert IVFIndex.exists(str(tmp_path))
+    loaded = IVFIndex.load_files(str(tmp_path), nprobe=4)
+    assert len(loaded) == len(index) and loaded.max_id == index.max_id
+    query = clustered_vectors(1, seed=3)[0]
+    assert loaded.search(query, 10) == index.search(query, 10)
+
+
+def test_exact_search_matches_the_brute_force_ranking(monkeypatch, vectors, embedding_service):
+    import main
+
+    index = IVFIndex.build(np.arange(1, len(vectors) + 1), vectors, n_lists=32, nprobe=1)
+    monkeypatch.setattr(main, "query_index", index)
+
+    for question in ("peace and harmony", "how do I begin a new venture", "conflict at work"):
+        vector = np.asarray(embedding_service.process_query(question)[0])
+        expected = exact_search(vectors, vector, 10)
+        found = main.search_similar(embedding_service, question, 10, None, True, 0, None)
+        assert [query_id for query_id, _ in found] == [query_id for query_id, _ in expected]
+        assert [score for _, score in found] == pytest.approx([score for _, score in expected], abs=1e-5)
@@ -0,0 +1,84 @@
+import re
+
+import pytest
+
+from services.metrics import COUNTERS, LATENCY_BUCKETS, PREFIX, Metrics
+
+SAMPLE = re.compile(r'^(\w+)(\{[^}]*\})? (\S+)$')
+
+
+def samples(text):
+    """{name{labels}: value} for every sample line of a Prometheus text page"""
+    parsed = {}
+    for line in text.splitlines():
+        if line.startswith("#"):
+            continue
+        name, labels, value = SAMPLE.match(line).groups()
+        parsed[name + (labels or "")] = float(value)
+    return parsed
+
+
+def stage_count(parsed, stage):
+    return parsed.get(f'{PREFIX}stage_seconds_count{{stage="{stage}"}}', 0)
+
+
+@pytest.fixture
+def app_client(client, monkeypatch, embedding_service):
+    """The client with the embedding service loaded and an empty similar-search index"""
+    import main
+    from services.vector_index import QueryVectorIndex
+
+    monkeypatch.setattr(main.embedding_warmup, "service", embedding_service)
+    monkeypatch.setattr(main, "query_index", QueryVectorIndex(vector_dim=embedding_service.vector_dim))
+    return client
+
+
+def test_histogram_and_counters():
+    metrics = Metrics(enabled=True)
+    for seconds in (0.00001, 0.003, 0.003, 20.0):
+        metrics.observe("embed", seconds)
+    metrics.inc("tokens_total", 5)
+    metrics.inc("tokens_total")
+    parsed = samples(metrics.render())
+
+    buckets = [parsed[f'{PREFIX}stage_seconds_bucket{{stage="embed",le="{bound:g}"}}'] for bound in LATENCY_BUCKETS]
+    assert buckets == sorted(buckets) and buckets[0] == 1 and buckets[-1] == 3
+    assert parsed[f'{PREFIX}stage_seconds_bucket{{stage="embed",le="+Inf"}}'] == stage_count(parsed, "embed") == 4
+    assert parsed[f'{PREFIX}stage_seconds_sum{{stage="embed"}}'] == pytest.approx(20.00601)
+    assert parsed[f"{PREFIX}tokens_total"] == 6 and parsed[f"{PREFIX}queries_total"] == 0
+
+
+def test_disabled_metrics_record_nothing():
+    metrics = Metrics(enabled=False)
+    with metrics.time("embed"):
+        metrics.inc("queries_total")
+    parsed = samples(metrics.render())
+    assert stage_count(parsed, "embed") == 0 and parsed[f"{PREFIX}queries_total"] == 0
+
+
+def test_metrics_endpoint_changes_after_requests(app_client, embedding_service):
+    response = app_client.get("/metrics")
+    assert response.headers["content-type"] == "text/plain; version=0.0.4; charset=utf-8"
+    before = samples(response.text)
+    assert all(f"{PREFIX}{name}" in before for name in COUNTERS)
+    assert before[f"{PREFIX}embedding_vocab_size"] == len(embedding_service.glove_embeddings)
+    assert before[f"{PREFIX}embedding_bytes"] == embedding_service.glove_embeddings.nbytes
+    assert before[f"{PREFIX}subword_table_bytes"] > 0
+    assert before[f"{PREFIX}query_cache_bytes"] == 0 and before[f"{PREFIX}query_index_vectors"] == 0
+
+    assert app_client.post("/queries/", json={"query": "peace and zyxquorble"}).status_code == 200
+    assert app_client.get("/queries/search/similar", params={"query": "harmony"}).status_code == 200
+    after = samples(app_client.get("/metrics").text)
+
+    def increase(name):
+        return after[f"{PREFIX}{name}"] - before[f"{PREFIX}{name}"]
+
+    assert increase("queries_total") == 2
+    assert increase("tokens_total") == 4
+    assert increase("oov_tokens_total") >= 1
+    assert increase("similar_rows_scanned_total") == 1
+    for stage in ("tokenize", "embed", "hexagram_scoring", "db_commit", "similar_search", "db_fetch"):
+        assert stage_count(after, stage) > stage_count(before, stage), stage
+    assert after[f"{PREFIX}query_cache_bytes"] > 0
+    assert after[f"{PREFIX}query_index_vectors"] == 1
+    assert after[f"{PREFIX}query_index_bytes"] >= before[f"{PREFIX}query_index_bytes"] > 0
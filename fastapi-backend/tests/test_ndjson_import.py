@@ -0,0 +1,61 @@
+import json
+
+import pytest
+
+import models
+import ndjson_import
+from ndjson_import import import_chunk
+
+HEXAGRAM_SET = [{"hexagram_id": 1, "hexagram_name": "Creative", "hexagram_unicode": "䷀", "score": 1.0}]
+
+
+class FakeEmbeddingService:
+    def process_queries(self, texts):
+        return [([0.1, 0.2, 0.3], HEXAGRAM_SET) for _ in texts]
+
+
+@pytest.fixture(autouse=True)
+def test_sessions(monkeypatch, session_factory):
+    monkeypatch.setattr(ndjson_import, "SessionLocal", session_factory)
+
+
+def lines(*queries):
+    return [(number, json.dumps({"query": query}).encode()) for number, query in enumerate(queries, 1)]
+
+
+def test_import_chunk_stores_and_indexes_rows(db):
+    indexed = []
+
+    results = import_chunk(FakeEmbeddingService(), lambda ids, *_: indexed.extend(ids), lines("a", "b"))
+
+    assert [result["id"] for result in results] == [1, 2]
+    assert indexed == [1, 2]
+    assert db.query(models.Query).count() == 2
+
+
+def test_index_failure_still_reports_committed_rows(db, capsys):
+    def failing_index(*_):
+        raise RuntimeError("index is full")
+
+    results = import_chunk(FakeEmbeddingService(), failing_index, lines("a", "b"))
+
+    assert [result.get("id") for result in results] == [1, 2]
+    assert all("error" not in result for result in results)
+    assert db.query(models.Query).count() == 2
+    assert "Indexing 2 imported rows failed" in capsys.readouterr().out
+
+
+def test_database_failure_reports_every_valid_line(db, monkeypatch):
+    def failing_record(*_):
+        raise RuntimeError("disk full")
+
+    monkeypatch.setattr(ndjson_import, "record_queries", failing_record)
+    indexed = []
+
+    results = import_chunk(FakeEmbeddingService(), lambda ids, *_: indexed.extend(ids),
+                           lines("a") + [(2, b"{not json")])
+
+    assert results[0] == {"line": 1, "error": "database error: RuntimeError"}
+    assert "error" in results[1] and "database" not in results[1]["error"]
+    assert indexed == []
+    assert db.query(models.Query).count() == 0
@@ -0,0 +1,80 @@
+from datetime import datetime, timedelta
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+
+from conftest import make_query
+from pagination import InvalidCursor, decode_cursor, encode_cursor, get_queries_page
+
+START = datetime(2025, 1, 1, 12, 0, 0)
+
+
+def add_queries(db, created_at):
+    db.add_all([make_query(f"q{i}", vector_dim=4, created_at=moment) for i, moment in enumerate(created_at)])
+    db.commit()
+
+
+def all_pages(db, limit, order="asc"):
+    """Ids page by page, following the cursors to the end"""
+    pages, cursor = [], None
+    while True:
+        rows, cursor = get_queries_page(db, limit=limit, cursor=cursor, order=order)
+        pages.append([row.id for row in rows])
+        if cursor is None:
+            return pages
+
+
+def test_cursor_round_trip():
+    moment = datetime(2025, 3, 4, 5, 6, 7, 890123)
+    cursor = encode_cursor(moment, 42, "desc")
+    assert "=" not in cursor
+    assert decode_cursor(cursor) == (moment, 42, "desc")
+
+
+@pytest.mark.parametrize("cursor", ["not base64!", "bm90IGpzb24", encode_cursor(START, 1, "up"),
+                                    "WyIyMDI1LTAxLTAxIiwiMSIsImFzYyJd"])  # id given as a string
+def test_malformed_cursor(cursor):
+    with pytest.raises(InvalidCursor):
+        decode_cursor(cursor)
+
+
+def test_malformed_cursor_is_a_400(client):
+    response = client.get("/queries/", params={"cursor": "not-a-cursor"})
+    assert response.status_code == 400
+    assert response.json() == {"detail": "Invalid pagination cursor"}
+
+
+def test_pages_in_both_orders(db):
+    add_queries(db, [START + timedelta(minutes=i) for i in range(7)])
+    assert all_pages(db, 3) == [[1, 2, 3], [4, 5, 6], [7]]
+    assert all_pages(db, 3, order="desc") == [[7, 6, 5], [4, 3, 2], [1]]
+
+
+def test_ties_on_created_at_are_ordered_by_id(db):
+    # A page boundary inside a run of equal created_at neither repeats nor skips rows
+    add_queries(db, [START] * 5 + [START - timedelta(minutes=1)])
+    assert all_pages(db, 2) == [[6, 1], [2, 3], [4, 5]]
+    assert all_pages(db, 2, order="desc") == [[5, 4], [3, 2], [1, 6]]
+
+
+def test_cursor_keeps_its_direction(db):
+    add_queries(db, [START + timedelta(minutes=i) for i in range(4)])
+    _, cursor = get_queries_page(db, limit=2, order="desc")
+    rows, _ = get_queries_page(db, limit=2, cursor=cursor, order="asc")
+    assert [row.id for row in rows] == [2, 1]
+
+
+def test_link_header(client, db):
+    add_queries(db, [START + timedelta(minutes=i) for i in range(3)])
+    response = client.get("/queries/", params={"limit": 2, "order": "desc", "fields": "id"})
+    assert response.json() == [{"id": 3}, {"id": 2}]
+    cursor = response.headers["X-Next-Cursor"]
+    link = response.headers["Link"]
+    assert link.endswith('>; rel="next"')
+    next_url = urlparse(link[1:link.index(">")])
+    assert next_url.path == "/queries/"
+    assert parse_qs(next_url.query) == {"limit": ["2"], "fields": ["id"], "cursor": [cursor]}
+
+    last = client.get(f"{next_url.path}?{next_url.query}")
+    assert last.json() == [{"id": 1}]
+    assert "Link" not in last.headers and "X-Next-Cursor" not in last.headers
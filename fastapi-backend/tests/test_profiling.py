@@ -0,0 +1,116 @@
+import re
+import time
+
+import pytest
+from fastapi import APIRouter, FastAPI, HTTPException
+from fastapi.testclient import TestClient
+
+import profiling
+from profiling import ProfiledRoute, Profiler
+
+
+def busy_work(seconds=0.03):
+    """Pure-Python work long enough for the stack sampler to see"""
+    deadline = time.perf_counter() + seconds
+    total = 0
+    while time.perf_counter() < deadline:
+        total += sum(range(100))
+    return total
+
+
+@pytest.fixture
+def install(monkeypatch):
+    """Enable profiling with a fresh Profiler; returns (profiled app client, main app client)"""
+    import main
+
+    def install(token="", **options):
+        profiler = Profiler(enabled=True, **options)
+        for module in (profiling, main):
+            monkeypatch.setattr(module, "profiler", profiler)
+        monkeypatch.setattr(profiling, "PROFILE_TOKEN", token)
+
+        # Routes pick their handler when they are built, so build them with profiling on
+        router = APIRouter(route_class=ProfiledRoute)
+
+        @router.get("/work")
+        def work():
+            return {"total": busy_work()}
+
+        @router.get("/missing/{item_id}")
+        def missing(item_id: int):
+            raise HTTPException(status_code=404, detail="Item not found")
+
+        app = FastAPI()
+        app.include_router(router)
+        return profiler, TestClient(app), TestClient(main.app)
+    return install
+
+
+def test_only_opted_in_requests_are_profiled(install):
+    profiler, client, admin = install()
+    assert "X-Profile-Id" not in client.get("/work").headers
+
+    response = client.get("/work", headers={"X-Profile": "1"})
+    assert response.status_code == 200
+    [summary] = admin.get("/admin/profiles").json()
+    assert response.headers["X-Profile-Id"] == summary["id"]
+    assert summary["path"] == "/work" and summary["status_code"] == 200
+    assert summary["format"] == "pstats" and summary["trigger"] == "requested"
+
+    report = admin.get(f"/admin/profiles/{summary['id']}").text
+    assert "function calls" in report and "busy_work" in report
+
+
+def test_collapsed_report(install):
+    profiler, client, admin = install()
+    profile_id = client.get("/work", params={"profile": "collapsed"}).headers["X-Profile-Id"]
+
+    report = admin.get(f"/admin/profiles/{profile_id}").text
+    lines = report.splitlines()
+    assert lines and all(re.fullmatch(r"\S.* \d+", line) for line in lines)
+    assert any(line.startswith("work (") and "busy_work (" in line for line in lines)
+
+
+def test_http_exception_is_profiled_with_its_status(install):
+    profiler, client, admin = install()
+    response = client.get("/missing/7", headers={"X-Profile": "1"})
+
+    assert response.status_code == 404 and response.json() == {"detail": "Item not found"}
+    assert response.headers["X-Profile-Id"] == "1"
+    assert profiler.get("1")["status_code"] == 404
+
+    invalid = client.get("/missing/seven", headers={"X-Profile": "1"})
+    assert invalid.status_code == 422
+    assert profiler.get("2")["status_code"] == 422
+
+
+def test_token_is_required_to_opt_in_and_read(install):
+    profiler, client, admin = install(token="s3cret")
+    assert "X-Profile-Id" not in client.get("/work", headers={"X-Profile": "1"}).headers
+    assert "X-Profile-Id" not in client.get("/work", headers={"X-Profile": "1", "X-Profile-Token": "wrong"}).headers
+    assert client.get("/work", headers={"X-Profile": "1", "X-Profile-Token": "s3cret"}).headers["X-Profile-Id"] == "1"
+
+    assert admin.get("/admin/profiles").status_code == 403
+    assert admin.get("/admin/profiles/1", headers={"X-Profile-Token": "wrong"}).status_code == 403
+    assert len(admin.get("/admin/profiles", headers={"X-Profile-Token": "s3cret"}).json()) == 1
+
+
+def test_admin_endpoints_are_hidden_while_disabled(install):
+    profiler, client, admin = install()
+    profiler.enabled = False
+    assert admin.get("/admin/profiles").status_code == 404
+
+
+def test_rate_cap(install):
+    profiler, client, admin = install(max_per_minute=2)
+    profiled = ["X-Profile-Id" in client.get("/work", headers={"X-Profile": "1"}).headers for _ in range(4)]
+    assert profiled == [True, True, False, False]
+    assert profiler.skipped == 2 and len(profiler.reports) == 2
+
+
+def test_sampling(install, monkeypatch):
+    profiler, client, admin = install(sample_rate=0.5)
+    monkeypatch.setattr("profiling.random.random", iter([0.9, 0.1]).__next__)
+    assert "X-Profile-Id" not in client.get("/work").headers
+    assert client.get("/work").headers["X-Profile-Id"] == "1"
+    assert profiler.get("1")["trigger"] == "sampled"
@@ -0,0 +1,92 @@
+import sys
+
+from services.query_cache import QueryCache, normalize_query
+
+HEXAGRAM_SET = [{"hexagram_id": 1, "hexagram_name": "Creative", "hexagram_unicode": "䷀", "score": 0.5}]
+
+
+def entry_bytes(key, dim=4):
+    """What put() charges for one entry with a ``dim``-float vector"""
+    probe = QueryCache()
+    probe.put(key, [0.0] * dim, HEXAGRAM_SET)
+    return probe.bytes
+
+
+def test_evicts_least_recently_used_by_entry_count():
+    cache = QueryCache(max_entries=2)
+    cache.put("a", [1.0], HEXAGRAM_SET)
+    cache.put("b", [2.0], HEXAGRAM_SET)
+    assert cache.get("a") is not None  # "a" is now the most recently used
+    cache.put("c", [3.0], HEXAGRAM_SET)
+
+    assert cache.get("b") is None
+    assert cache.get("a")[0] == [1.0] and cache.get("c")[0] == [3.0]
+    assert cache.stats()["entries"] == 2 and cache.evictions == 1
+
+
+def test_evicts_by_byte_budget():
+    size = entry_bytes("k1")
+    cache = QueryCache(max_entries=100, max_bytes=2 * size + size // 2)
+    for key in ("k1", "k2", "k3"):
+        cache.put(key, [0.0] * 4, HEXAGRAM_SET)
+
+    assert cache.get("k1") is None
+    assert cache.get("k2") is not None and cache.get("k3") is not None
+    assert cache.bytes == 2 * size and cache.evictions == 1
+
+    # Replacing an entry frees its old size first
+    cache.put("k3", [1.0] * 4, HEXAGRAM_SET)
+    assert cache.bytes == 2 * size and cache.evictions == 1
+
+
+def test_entry_larger_than_the_budget_is_not_stored():
+    cache = QueryCache(max_bytes=entry_bytes("big", dim=1000) - 1)
+    cache.put("big", [0.0] * 1000, HEXAGRAM_SET)
+    assert cache.get("big") is None and cache.bytes == 0 and cache.evictions == 0
+
+
+def test_get_returns_copies():
+    cache = QueryCache()
+    vector, hexagram_set = [1.0, 2.0], [dict(HEXAGRAM_SET[0])]
+    cache.put("q", vector, hexagram_set)
+    vector[0] = hexagram_set[0]["score"] = -1.0  # the caller's own lists are not stored either
+
+    first_vector, first_set = cache.get("q")
+    first_vector[0] = 99.0
+    first_set[0]["score"] = 99.0
+    first_set.append({})
+
+    assert cache.get("q") == ([1.0, 2.0], HEXAGRAM_SET)
+
+
+def test_hit_and_miss_counters():
+    cache = QueryCache()
+    assert cache.get("q") is None
+    cache.put("q", [1.0], HEXAGRAM_SET)
+    cache.get("q")
+    cache.get("q")
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["entries"]) == (2, 1, 1)
+    assert stats["hit_rate"] == 2 / 3
+
+    cache.clear()
+    assert cache.stats()["entries"] == 0 and cache.bytes == 0 and cache.hits == 2
+
+
+def test_disabled_cache_stores_nothing():
+    cache = QueryCache(max_entries=0)
+    cache.put("q", [1.0], HEXAGRAM_SET)
+    assert not cache.enabled and cache.get("q") is None
+
+
+def test_cache_endpoint_counts_process_query_lookups(client, embedding_service):
+    import main
+
+    main.app.dependency_overrides[main.get_embedding_service] = lambda: embedding_service
+    first = embedding_service.process_query("Peace and  harmony")
+    assert embedding_service.process_query("peace AND harmony") == first
+    assert normalize_query("Peace and  harmony") == "peace and harmony"
+
+    stats = client.get("/cache/queries").json()
+    assert (stats["hits"], stats["misses"], stats["entries"]) == (1, 1, 1)
+    assert stats["bytes"] > sys.getsizeof("peace and harmony")
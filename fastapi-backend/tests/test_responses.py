@@ -0,0 +1,26 @@
+import pytest
+
+from conftest import make_query
+
+
+def test_openapi_documents_the_projection():
+    import main
+
+    schema = main.app.openapi()
+    for path, method in (("/queries/", "get"), ("/queries/", "post"), ("/queries/{query_id}", "get"),
+                         ("/queries/batch", "post")):
+        content = schema["paths"][path][method]["responses"]["200"]["content"]["application/json"]["schema"]
+        assert "QueryProjection" in str(content)
+    assert schema["components"]["schemas"]["QueryProjection"].get("required") is None
+
+
+def test_read_query_returns_only_the_requested_fields(client, db):
+    db.add(make_query("first", vector_dim=4))
+    db.commit()
+
+    full = client.get("/queries/1").json()
+    assert set(full) == {"id", "query", "query_vector", "hexagram_set", "created_at"}
+    assert full["query_vector"] == pytest.approx([0.1] * 4)
+
+    assert client.get("/queries/1", params={"fields": "id,query"}).json() == {"id": 1, "query": "first"}
+    assert "query_vector" not in client.get("/queries/1", params={"include_vector": "false"}).json()
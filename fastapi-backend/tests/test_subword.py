@@ -0,0 +1,46 @@
+import os
+import shutil
+import subprocess
+import sys
+
+import numpy as np
+
+from services.subword import DEFAULT_BUCKETS, ngram_buckets, subword_table_path
+
+UNSEEN = ["zyxquorble", "flibbertigibbetry", "ünsëen"]
+
+
+def oov_vectors(service):
+    assert not any(word in service.glove_embeddings for word in UNSEEN)
+    return [service._get_word_vector(word) for word in UNSEEN]
+
+
+def test_oov_vector_is_the_same_across_service_builds(tmp_path, glove_path):
+    from services.iching_embeddings import ICHingEmbeddingService
+
+    path = str(tmp_path / "glove.txt")
+    shutil.copy(glove_path, path)
+    first = oov_vectors(ICHingEmbeddingService(path))
+    table_path = subword_table_path(path, DEFAULT_BUCKETS)
+    assert os.path.exists(table_path)
+
+    # Built again from the same file: once opening the saved table, once rebuilding it
+    reopened = oov_vectors(ICHingEmbeddingService(path))
+    os.remove(table_path)
+    rebuilt = oov_vectors(ICHingEmbeddingService(path))
+    for vectors in (reopened, rebuilt):
+        for expected, vector in zip(first, vectors):
+            np.testing.assert_array_equal(vector, expected)
+    assert all(np.any(vector) for vector in first)
+
+
+def test_buckets_do_not_depend_on_the_hash_seed():
+    # Another interpreter with its own str hash seed picks the same buckets
+    script = "from services.subword import ngram_buckets; print(ngram_buckets(%r, 32768).tolist())" % UNSEEN[1]
+    outputs = {
+        subprocess.run([sys.executable, "-c", script], capture_output=True, text=True, check=True,
+                       cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                       env={**os.environ, "PYTHONHASHSEED": seed}).stdout
+        for seed in ("1", "2")
+    }
+    assert outputs == {f"{ngram_buckets(UNSEEN[1], 32768).tolist()}\n"}
@@ -0,0 +1,97 @@
+import numpy as np
+import pytest
+
+import models
+from conftest import make_query
+from services.vector_index import QueryVectorIndex
+
+DIM = 16
+
+
+def add_rows(db, count, seed=0):
+    """Store ``count`` queries with random vectors and random six-hexagram sets"""
+    rng = np.random.default_rng(seed)
+    rows = []
+    for i in range(count):
+        row = make_query(f"q{i}", hexagram_ids=rng.choice(np.arange(1, 65), size=6, replace=False).tolist())
+        row.query_vector = rng.standard_normal(DIM).tolist()
+        rows.append(row)
+    db.add_all(rows)
+    db.commit()
+
+
+def stored_rows(db):
+    return db.query(models.Query.id, models.Query.query_vector, models.Query.hexagram_set).order_by(models.Query.id)
+
+
+def brute_force(db, vector, limit, keep=lambda hexagrams: True):
+    """Top ``limit`` (id, cosine) over the DB rows whose hexagram ids pass ``keep``"""
+    scored = []
+    for query_id, query_vector, hexagram_set in stored_rows(db):
+        if keep({entry["hexagram_id"] for entry in hexagram_set}):
+            row = np.asarray(query_vector)
+            scored.append((query_id, float(row @ vector / (np.linalg.norm(row) * np.linalg.norm(vector)))))
+    return sorted(scored, key=lambda match: -match[1])[:limit]
+
+
+def assert_same_matches(found, expected):
+    assert [query_id for query_id, _ in found] == [query_id for query_id, _ in expected]
+    assert [score for _, score in found] == pytest.approx([score for _, score in expected], abs=1e-5)
+
+
+@pytest.fixture
+def index(db):
+    add_rows(db, 300)
+    index = QueryVectorIndex(vector_dim=DIM, capacity=4)
+    index.load(stored_rows(db).yield_per(50), batch_rows=64)
+    return index
+
+
+def test_matches_a_brute_force_scan(db, index):
+    assert len(index) == 300 and index.max_id == 300
+    rng = np.random.default_rng(1)
+    for _ in range(5):
+        vector = rng.standard_normal(DIM)
+        assert_same_matches(index.search(vector, 10), brute_force(db, vector, 10))
+    assert len(index.search(rng.standard_normal(DIM), 1000)) == 300
+
+
+def test_add_many_makes_new_rows_searchable(db, index):
+    add_rows(db, 50, seed=2)
+    new_rows = stored_rows(db).filter(models.Query.id > index.max_id).all()
+    index.add_many([row.id for row in new_rows], [row.query_vector for row in new_rows],
+                   [row.hexagram_set for row in new_rows])
+    assert len(index) == 350
+
+    # Each new row is its own nearest neighbour
+    for query_id, query_vector, _ in new_rows[:5]:
+        assert index.search(query_vector, 1)[0][0] == query_id
+    vector = np.random.default_rng(3).standard_normal(DIM)
+    assert_same_matches(index.search(vector, 20), brute_force(db, vector, 20))
+
+
+def test_wrong_dimension_is_skipped(index):
+    index.add_many([1000, 1001], [[1.0] * DIM, [1.0] * (DIM + 1)])
+    assert len(index) == 301 and index.skipped == 1
+
+
+# One required hexagram keeps ~6/64 of the rows (scored by gathering them);
+# sharing one of six keeps ~45% (scored with a full pass)
+@pytest.mark.parametrize("min_shared,required", [(1, ()), (2, ()), (0, (7,)), (0, (7, 19)), (1, (7,))])
+def test_hexagram_filters(db, index, min_shared, required):
+    query_hexagrams = [3, 7, 19, 25, 40, 64]
+    vector = np.random.default_rng(4).standard_normal(DIM)
+
+    def keep(hexagrams):
+        return len(hexagrams & set(query_hexagrams)) >= min_shared and hexagrams >= set(required)
+
+    expected = brute_force(db, vector, 15, keep)
+    assert expected
+    found = index.search(vector, 15, query_hexagrams=query_hexagrams, min_shared=min_shared,
+                         required_hexagrams=required)
+    assert_same_matches(found, expected)
+
+
+def test_filter_with_no_candidates(index):
+    assert index.search(np.ones(DIM), 10, min_shared=1) == []
+    assert index.search(np.ones(DIM), 10, required_hexagrams=[65]) == []
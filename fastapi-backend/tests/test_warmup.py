@@ -0,0 +1,83 @@
+import threading
+import time
+
+import pytest
+
+from services.warmup import EmbeddingWarmup
+
+
+class FlakyFactory:
+    """Fails the first ``failures`` calls, then returns a stand-in service"""
+
+    def __init__(self, failures):
+        self.failures = failures
+        self.calls = 0
+
+    def __call__(self, progress):
+        self.calls += 1
+        progress("loading_embeddings")
+        if self.calls <= self.failures:
+            raise OSError(f"embedding file unreadable (call {self.calls})")
+        return object()
+
+
+def test_failed_load_is_retried():
+    warmup = EmbeddingWarmup(FlakyFactory(failures=2), retries=3, retry_delay=0.01)
+    warmup.run()
+    assert warmup.ready and warmup.status == "ready"
+    assert warmup.attempts == 3
+    assert "error" not in warmup.snapshot()
+
+
+def test_failed_for_good_after_the_last_retry():
+    factory = FlakyFactory(failures=10)
+    warmup = EmbeddingWarmup(factory, retries=2, retry_delay=0.01)
+    warmup.run()
+    assert warmup.failed and not warmup.ready
+    assert factory.calls == 3
+    assert warmup.snapshot()["error"] == "OSError: embedding file unreadable (call 3)"
+
+
+def test_retrying_reports_the_next_attempt(monkeypatch):
+    sleeping, release = threading.Event(), threading.Event()
+    monkeypatch.setattr("services.warmup.time.sleep", lambda seconds: (sleeping.set(), release.wait(5)))
+    warmup = EmbeddingWarmup(FlakyFactory(failures=1), retry_delay=30)
+    warmup.start()
+    assert sleeping.wait(5)
+
+    report = warmup.snapshot()
+    assert report["status"] == "retrying" and report["attempts"] == 1 and report["stage"] is None
+    assert 29 < report["retry_in_seconds"] <= 30
+    release.set()
+    assert warmup.wait(5)
+
+
+@pytest.fixture
+def warmup(monkeypatch):
+    import main
+
+    def install(factory, **options):
+        warmup = EmbeddingWarmup(factory, **options)
+        monkeypatch.setattr(main, "embedding_warmup", warmup)
+        return warmup
+    return install
+
+
+def test_failed_warmup_is_a_500(client, warmup):
+    warmup(FlakyFactory(failures=10), retries=0).run()
+    ready = client.get("/ready")
+    assert ready.status_code == 500 and ready.json()["status"] == "failed"
+    assert "Retry-After" not in ready.headers
+
+    response = client.post("/queries/", json={"query": "question"})
+    assert response.status_code == 500
+    assert response.json() == {"detail": "Embedding model failed to load: OSError: embedding file unreadable (call 1)"}
+
+
+def test_warming_up_is_a_503_with_retry_after(client, warmup):
+    # Between attempts: Retry-After points past the next one, not at the default 5 s
+    pending = warmup(FlakyFactory(failures=0))
+    pending.status, pending.retry_at = "retrying", time.monotonic() + 42.5
+    for response in (client.get("/ready"), client.post("/queries/", json={"query": "question"})):
+        assert response.status_code == 503
+        assert response.headers["Retry-After"] == "43"